@@ -0,0 +1,315 @@
+"""
+离线基准测试：合成博客 + 注入延迟的桩客户端，测量端到端抓取性能
+
+用法：
+  python -m benchmarks.run --months 24 --items 20 --latency-ms 20 --output bench.json
+  python -m benchmarks.run --compare bench.json        # 与基线报告对比
+
+每个场景在独立子进程中运行（峰值内存互不影响），场景之间共享同一个临时数据目录：
+  startup      命令行抓取路径（main.py crawl）的冷启动导入耗时，超出 --import-budget-ms 时以非零状态退出
+  full         空目录全量抓取
+  noop         数据齐全时再次全量遍历（只走跳过路径）
+  incremental  最新月份发布新内容后的增量抓取
+  verify       完整性校验
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SCENARIOS = ("startup", "full", "noop", "incremental", "verify")
+STARTUP_RUNS = 5
+# 命令行抓取路径不应加载的模块（API 服务与日志的延迟导入）
+STARTUP_DEFERRED = ("fastapi", "starlette", "uvicorn", "loguru")
+
+# 在全新解释器中导入 `main.py crawl --once` 运行前需要的模块，输出耗时与已加载的延迟模块
+_STARTUP_PROBE = """
+import sys, time
+started = time.perf_counter()
+import main
+import src.cli, src.services.pipeline, src.utils.http_client
+elapsed = time.perf_counter() - started
+import json
+print(json.dumps({"seconds": elapsed, "eager": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Blog crawler offline benchmark")
+    parser.add_argument("--months", type=int, default=24, help="月份数 (default: 24)")
+    parser.add_argument("--items", type=int, default=20, help="每月内容数 (default: 20)")
+    parser.add_argument("--images", type=int, default=2, help="每篇正文图片数 (default: 2)")
+    parser.add_argument("--body-bytes", type=int, default=4000, help="正文大致字节数 (default: 4000)")
+    parser.add_argument("--publish", type=int, default=5, help="incremental 场景新发布的内容数 (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--import-budget-ms", type=float, default=600.0,
+                        help="startup 场景的导入耗时上限 (default: 600)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="API 平均延迟 (default: 20)")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="延迟抖动 (default: 5)")
+    parser.add_argument("--image-latency-ms", type=float, default=None, help="图片延迟 (默认同 API)")
+    parser.add_argument("--distribution", default="normal", choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--error-rate", type=float, default=0.0, help="单次请求失败概率 (default: 0)")
+    parser.add_argument("--server-concurrency", type=int, default=None, help="模拟服务端并发上限")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="只运行指定场景，可重复 (默认全部，按顺序)")
+    parser.add_argument("--data-dir", default=None, help="数据目录 (默认临时目录，结束后删除)")
+    parser.add_argument("--output", "-o", default=None, help="报告输出路径 (JSON)")
+    parser.add_argument("--compare", default=None, help="基线报告路径，输出与之的对比")
+    parser.add_argument("--worker", choices=SCENARIOS, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# ---- 子进程：运行单个场景 ----
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        # Windows 无 resource 模块
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    from src.services.pipeline import run_pipeline
+    from src.services.verification import Verifier
+
+    from benchmarks.stub_client import SyntheticHTTPClient
+    from benchmarks.synthetic import BlogSpec, SyntheticBlog
+
+    blog = SyntheticBlog(BlogSpec(
+        months=args.months,
+        items_per_month=args.items,
+        images_per_body=args.images,
+        body_bytes=args.body_bytes,
+        seed=args.seed,
+    ))
+    if args.worker == "incremental":
+        blog.publish(args.publish)
+    client = SyntheticHTTPClient(
+        blog,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        distribution=args.distribution,
+        error_rate=args.error_rate,
+        image_latency_ms=args.image_latency_ms,
+        max_concurrency=args.server_concurrency,
+        seed=args.seed,
+    )
+
+    latencies: List[float] = []
+
+    def on_item(key: str, result: Dict[str, Any], elapsed: float) -> None:
+        latencies.append(elapsed)
+
+    started = time.perf_counter()
+    if args.worker == "verify":
+        outcome = await asyncio.to_thread(Verifier().verify, True)
+        summary: Dict[str, Any] = {"ok": outcome["ok"], "items": outcome["items"].get("total_expected")}
+        items = summary["items"] or 0
+    else:
+        outcome = await run_pipeline(client, full=args.worker != "incremental", on_item=on_item)
+        content = (outcome.get("content") or {}).get("data") or {}
+        items = content.get("total_items", 0)
+        summary = {
+            "ok": outcome.get("success", False),
+            "stage": outcome.get("stage"),
+            "items": items,
+            "success": content.get("success_count", 0),
+            "skipped": content.get("skipped", 0),
+        }
+    elapsed = time.perf_counter() - started
+
+    return {
+        **summary,
+        "elapsed_seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": _ms(_percentile(latencies, 50)),
+            "p99": _ms(_percentile(latencies, 99)),
+            "max": _ms(max(latencies) if latencies else None),
+        },
+        "client": client.stats(),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _worker_main(args: argparse.Namespace) -> None:
+    # 进程内只输出警告以上日志，避免日志 I/O 干扰测量
+    from src.utils.logger import crawler_logger
+    crawler_logger.remove()
+    crawler_logger.add(sys.stderr, level="WARNING")
+
+    result = asyncio.run(_run_scenario(args))
+    print(json.dumps(result, ensure_ascii=False))
+
+
+# ---- 主进程：编排场景并生成报告 ----
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _measure_startup(data_dir: Path, budget_ms: float) -> Dict[str, Any]:
+    """取多次冷启动的最小值；同时检查导入没有创建数据目录、没有加载应延迟的模块"""
+    probe_dir = data_dir / "startup-probe"
+    env = {**os.environ, "BLOG_CRAWL_DATA_DIR": str(probe_dir), "PYTHONPATH": str(BASE_DIR)}
+    samples: List[float] = []
+    eager: List[str] = []
+    for _ in range(STARTUP_RUNS):
+        proc = subprocess.run(
+            [sys.executable, "-c", _STARTUP_PROBE % (STARTUP_DEFERRED,)],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            return {"ok": False, "error": f"启动探测退出码 {proc.returncode}"}
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(sample["seconds"])
+        eager = sample["eager"]
+
+    import_ms = round(min(samples) * 1000, 1)
+    created_dirs = probe_dir.exists()
+    return {
+        "ok": import_ms <= budget_ms and not eager and not created_dirs,
+        "elapsed_seconds": round(min(samples), 3),
+        "import_ms": import_ms,
+        "import_ms_median": round(sorted(samples)[len(samples) // 2] * 1000, 1),
+        "budget_ms": budget_ms,
+        "eager_modules": eager,
+        "created_dirs": created_dirs,
+    }
+
+
+def _spawn(scenario: str, argv: List[str], data_dir: Path) -> Dict[str, Any]:
+    env = {**os.environ, "BLOG_CRAWL_DATA_DIR": str(data_dir), "PYTHONPATH": str(BASE_DIR)}
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", *argv, "--worker", scenario],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        return {"ok": False, "error": f"场景 {scenario} 退出码 {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    lines = [f"对比基线 {baseline.get('commit') or '-'} → {report.get('commit') or '-'}"]
+    for name, current in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if name == "startup":
+            lines.append(_delta_line(name, "import_ms", before.get("import_ms"), current.get("import_ms")))
+            continue
+        for field in ("elapsed_seconds", "items_per_second", "peak_rss_mb"):
+            lines.append(_delta_line(name, field, before.get(field), current.get(field)))
+        for field in ("p50", "p99"):
+            lines.append(_delta_line(name, f"latency_{field}_ms", (before.get("latency_ms") or {}).get(field),
+                                     (current.get("latency_ms") or {}).get(field)))
+    return lines
+
+
+def _delta_line(scenario: str, field: str, before: Optional[float], after: Optional[float]) -> str:
+    if before is None or after is None:
+        return f"  {scenario:<12} {field:<18} {before} → {after}"
+    change = (after - before) / before * 100 if before else 0.0
+    return f"  {scenario:<12} {field:<18} {before} → {after} ({change:+.1f}%)"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.worker:
+        _worker_main(args)
+        return
+
+    argv = [a for a in (argv if argv is not None else sys.argv[1:])]
+    passthrough = _strip_options(argv, ("--scenario", "--output", "-o", "--compare", "--data-dir"))
+    scenarios = args.scenario or list(SCENARIOS)
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="blog-bench-"))
+
+    report: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "params": {k: v for k, v in vars(args).items() if k not in ("worker", "scenario", "output", "compare", "data_dir")},
+        "scenarios": {},
+    }
+    try:
+        for scenario in scenarios:
+            if scenario == "startup":
+                result = _measure_startup(data_dir, args.import_budget_ms)
+                report["scenarios"][scenario] = result
+                print(f"{scenario:<12} import={result.get('import_ms')}ms  budget={result.get('budget_ms')}ms  "
+                      f"eager={result.get('eager_modules')}  created_dirs={result.get('created_dirs')}", file=sys.stderr)
+                continue
+            result = _spawn(scenario, passthrough, data_dir)
+            report["scenarios"][scenario] = result
+            print(f"{scenario:<12} {result.get('elapsed_seconds')}s  "
+                  f"{result.get('items_per_second')} items/s  "
+                  f"p50={(result.get('latency_ms') or {}).get('p50')}ms  "
+                  f"p99={(result.get('latency_ms') or {}).get('p99')}ms  "
+                  f"rss={result.get('peak_rss_mb')}MB", file=sys.stderr)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\n".join(_compare(report, baseline)), file=sys.stderr)
+
+    startup = report["scenarios"].get("startup")
+    if startup is not None and not startup.get("ok"):
+        print("启动检查未通过：导入耗时超出预算、加载了应延迟的模块或创建了数据目录", file=sys.stderr)
+        sys.exit(1)
+
+
+def _strip_options(argv: List[str], names: tuple) -> List[str]:
+    """去掉只对主进程有意义的选项（含取值）"""
+    result: List[str] = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in names:
+            skip = "=" not in arg
+            continue
+        result.append(arg)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+注入延迟与错误的 HTTP 桩：以 SyntheticBlog 为数据源，实现 AbstractHTTPClient 协议
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.utils.http_client import NOT_MODIFIED
+
+from benchmarks.synthetic import SyntheticBlog
+
+
+class SyntheticHTTPError(Exception):
+    """按 error_rate 注入的请求失败"""
+
+
+class SyntheticHTTPClient:
+    """按指定延迟分布响应的桩客户端
+
+    distribution:
+      fixed      固定 latency_ms
+      uniform    latency_ms ± jitter_ms 均匀分布
+      normal     均值 latency_ms、标准差 jitter_ms（截断到 0）
+      lognormal  中位数 latency_ms、sigma = jitter_ms / latency_ms，模拟长尾
+    error_rate 为单次请求失败概率（API 请求抛出异常，图片下载返回 False）；
+    max_concurrency 模拟服务端并发上限，超出的请求排队等待。
+    """
+
+    def __init__(
+        self,
+        blog: SyntheticBlog,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 5.0,
+        distribution: str = "normal",
+        error_rate: float = 0.0,
+        image_latency_ms: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        seed: int = 0,
+    ):
+        if distribution not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"未知延迟分布: {distribution}")
+        self.blog = blog
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.image_latency_ms = image_latency_ms if image_latency_ms is not None else latency_ms
+        self._rng = random.Random(seed)
+        self._server_slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._etags: Dict[str, str] = {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def __aenter__(self) -> "SyntheticHTTPClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+    async def get(self, url: str, conditional: bool = False, **kwargs) -> Any:
+        kind, payload, etag = self._route(url)
+        await self._respond(kind, self.latency_ms)
+        if conditional and etag is not None:
+            if self._etags.get(url) == etag:
+                self.not_modified += 1
+                return NOT_MODIFIED
+            self._etags[url] = etag
+        return payload
+
+    async def post(self, url: str, data: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        await self._respond("post", self.latency_ms)
+        return {"ok": True}
+
+    async def download_file(self, url: str, save_path: str) -> bool:
+        try:
+            await self._respond("image", self.image_latency_ms)
+        except SyntheticHTTPError:
+            return False
+        content = self.blog.image_bytes(url)
+        path = Path(save_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        self.bytes_sent += len(content)
+        return True
+
+    async def content_length(self, url: str) -> Optional[int]:
+        try:
+            await self._respond("image", self.image_latency_ms)
+        except SyntheticHTTPError:
+            return None
+        return len(self.blog.image_bytes(url))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+    def _route(self, url: str):
+        """返回 (请求类别, 响应数据, ETag)"""
+        parsed = urlparse(url)
+        path = parsed.path.rstrip("/")
+        if path.endswith("/classify"):
+            month = parse_qs(parsed.query).get("month")
+            if month:
+                listing = self.blog.month_listing(month[0])
+                return "month", listing, f'"{month[0]}-{len(listing)}"'
+            data = self.blog.classify()
+            return "classify", data, '"%s"' % hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        parts = path.split("/")
+        item_type, item_id = parts[-2], int(parts[-1])
+        try:
+            detail = self.blog.detail(item_type, item_id)
+        except KeyError:
+            return "detail", {}, None
+        return "detail", detail, f'"{item_type}-{item_id}-{self.blog.version(item_type, item_id)}"'
+
+    async def _respond(self, kind: str, latency_ms: float) -> None:
+        self.requests[kind] += 1
+        if self._server_slots is not None:
+            await self._server_slots.acquire()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self._sample_latency(latency_ms) / 1000)
+        finally:
+            self.in_flight -= 1
+            if self._server_slots is not None:
+                self._server_slots.release()
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors[kind] += 1
+            raise SyntheticHTTPError(f"注入错误: {kind}")
+
+    def _sample_latency(self, latency_ms: float) -> float:
+        if self.distribution == "fixed" or latency_ms <= 0:
+            return max(0.0, latency_ms)
+        if self.distribution == "uniform":
+            return max(0.0, self._rng.uniform(latency_ms - self.jitter_ms, latency_ms + self.jitter_ms))
+        if self.distribution == "normal":
+            return max(0.0, self._rng.gauss(latency_ms, self.jitter_ms))
+        sigma = self.jitter_ms / latency_ms if latency_ms else 0.0
+        return self._rng.lognormvariate(math.log(latency_ms), sigma)
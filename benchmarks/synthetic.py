@@ -0,0 +1,123 @@
+"""
+合成博客：按指定规模生成分类统计、月份列表与文章/笔记详情
+
+生成结果只由 BlogSpec（含随机种子）决定，基准测试的各个子进程可以各自重建同一份数据。
+"""
+import hashlib
+import random
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+
+
+IMAGE_HOST = "https://cdn.nlark.com/yuque/0/bench"
+
+
+@dataclass
+class BlogSpec:
+    months: int = 24             # 月份数
+    items_per_month: int = 20    # 每月内容数
+    images_per_body: int = 2     # 每篇正文的图片数（第一张在同月内共享，用于覆盖跨文章去重）
+    body_bytes: int = 4000       # 正文大致字节数
+    article_ratio: float = 0.2   # 文章（其余为笔记）占比
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SyntheticBlog:
+    def __init__(self, spec: BlogSpec):
+        self.spec = spec
+        self._rng = random.Random(spec.seed)
+        self.months: List[str] = [self._month_name(i) for i in range(spec.months)]
+        self.listings: Dict[str, List[Dict[str, Any]]] = {}
+        # (type, id) -> (所属月份, 版本号)；版本号变化即 modified_time 变化
+        self.items: Dict[Tuple[str, int], Tuple[str, int]] = {}
+        self._next_id = 1
+        for month in self.months:
+            self.listings[month] = []
+            for _ in range(spec.items_per_month):
+                self._add_item(month)
+
+    @staticmethod
+    def _month_name(offset: int) -> str:
+        year, month = 2025, 8 - offset
+        while month <= 0:
+            month += 12
+            year -= 1
+        return f"{year:04d}-{month:02d}"
+
+    def _add_item(self, month: str) -> Tuple[str, int]:
+        item_type = "article" if self._rng.random() < self.spec.article_ratio else "section"
+        item_id = self._next_id
+        self._next_id += 1
+        day = 1 + (item_id % 28)
+        self.listings[month].insert(0, {
+            "type": item_type,
+            "id": item_id,
+            "title": f"{item_type} {item_id}",
+            "created_time": f"{month}-{day:02d}T08:00:00Z",
+        })
+        self.items[(item_type, item_id)] = (month, 1)
+        return item_type, item_id
+
+    # ---- 接口数据 ----
+
+    def classify(self) -> Dict[str, Dict[str, int]]:
+        data: Dict[str, Dict[str, int]] = {}
+        for month in self.months:
+            listing = self.listings[month]
+            articles = sum(1 for i in listing if i["type"] == "article")
+            data[month] = {"article": articles, "section": len(listing) - articles}
+        return data
+
+    def month_listing(self, month: str) -> List[Dict[str, Any]]:
+        return list(self.listings.get(month, []))
+
+    def detail(self, item_type: str, item_id: int) -> Dict[str, Any]:
+        month, version = self.items[(item_type, item_id)]
+        images = [f"![shared]({IMAGE_HOST}/{month}_shared.png?x-oss-process=image)"] if self.spec.images_per_body else []
+        images += [f"![img{n}]({IMAGE_HOST}/{item_id}_{n}.png)" for n in range(1, self.spec.images_per_body)]
+        filler = hashlib.sha256(f"{item_type}{item_id}{version}".encode()).hexdigest()
+        paragraph = f"{filler} " * max(1, self.spec.body_bytes // (len(filler) + 1) // max(1, len(images) + 1))
+        body = "\n\n".join([f"# {item_type} {item_id}", paragraph] + [f"{img}\n\n{paragraph}" for img in images])
+        data: Dict[str, Any] = {
+            "id": item_id,
+            "title": f"{item_type} {item_id}",
+            "body": body,
+            "view": 0,
+            "like": 0,
+            "collect": 0,
+            "comment": 0,
+            "created_time": f"{month}-01T08:00:00Z",
+            "modified_time": f"{month}-02T08:00:{version:02d}Z",
+            "author": 1,
+        }
+        if item_type == "article":
+            data.update({"category": "bench", "category_id": 1, "tags": [], "abstract": "", "cover": None,
+                         "is_recommend": False, "is_release": True})
+        else:
+            data.update({"note": "bench", "note_id": 1, "slug": f"s{item_id}"})
+        return data
+
+    def version(self, item_type: str, item_id: int) -> int:
+        return self.items[(item_type, item_id)][1]
+
+    @staticmethod
+    def image_bytes(url: str, size: int = 2048) -> bytes:
+        seed = hashlib.sha256(url.split("?")[0].encode()).digest()
+        return (seed * (size // len(seed) + 1))[:size]
+
+    # ---- 模拟更新 ----
+
+    def publish(self, count: int) -> List[Tuple[str, int]]:
+        """在最新月份发布 count 篇新内容"""
+        return [self._add_item(self.months[0]) for _ in range(count)]
+
+    def edit(self, count: int) -> List[Tuple[str, int]]:
+        """修改 count 篇已有内容（modified_time 变化）"""
+        keys = self._rng.sample(sorted(self.items), min(count, len(self.items)))
+        for key in keys:
+            month, version = self.items[key]
+            self.items[key] = (month, version + 1)
+        return keys
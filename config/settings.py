@@ -1,12 +1,13 @@
 """
 博客爬虫项目配置（UTF-8）
 """
+import os
 from pathlib import Path
 
 
-# 路径设置
+# 路径设置（BLOG_CRAWL_DATA_DIR 可将数据目录指向其他位置，如基准测试的临时目录）
 BASE_DIR = Path(__file__).parent.parent
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.environ.get("BLOG_CRAWL_DATA_DIR") or BASE_DIR / "data")
 IMAGES_DIR = DATA_DIR / "images"
 LOGS_DIR = BASE_DIR / "logs"
 
@@ -52,9 +53,48 @@ MONITOR_INTERVAL = 3600  # 监控默认间隔（秒）
 MONITOR_DEFAULT_INTERVAL = MONITOR_INTERVAL
 MONITOR_DEFAULT_OFFLINE = False
 MONITOR_CRAWL_ON_UPDATE_DEFAULT = True
+MONITOR_MIN_INTERVAL = 300          # 检测到变化后的轮询间隔（秒），之后逐步恢复到基础间隔
+MONITOR_MAX_INTERVAL = 6 * 3600     # 连续无变化时退避的间隔上限（秒）
+MONITOR_BACKOFF_FACTOR = 1.5        # 每次无变化后间隔的放大倍数（从最短间隔恢复时同样按此倍数）
+MONITOR_IDLE_POLLS = 3              # 在基础间隔上连续多少次无变化后开始退避
+MONITOR_JITTER = 0.1                # 每次触发时间的随机抖动比例（±，不累积）
+VERIFY_JOB_INTERVAL = 24 * 3600     # 定时校验任务的默认间隔（秒）
+HOT_MONTHS = 2                      # 热点刷新的最近月份数（新内容总是出现在最近的月份里）
+HOT_MONTHS_INTERVAL = 300           # 热点刷新任务的默认间隔（秒）
 
 REQUEST_TIMEOUT = 30  # 请求超时（秒）
-MAX_CONCURRENT_REQUESTS = 5  # 最大并发请求数
+MAX_CONCURRENT_REQUESTS = 5  # 最大并发请求数（博客 API）
+
+# 按主机划分的连接池：博客 API 与图片 CDN 各自独立的连接上限、并发额度、keepalive 与 DNS 缓存
+# concurrency 为起始并发，响应正常时按 AIMD 逐步升至 max_concurrency，遇 429/503 减半；
+# rate/burst 为令牌桶速率（请求/秒）与突发容量，None 表示不限速
+IMAGE_HOSTS = ("cdn.nlark.com", "yuque.com")  # 走图片连接池的主机（含子域名）
+HTTP_POOLS = {
+    "api": {
+        "concurrency": MAX_CONCURRENT_REQUESTS,
+        "max_concurrency": 20,
+        "limit": 20,
+        "keepalive_timeout": 30,
+        "ttl_dns_cache": 300,
+        "rate": 20.0,
+        "burst": 20,
+    },
+    "image": {
+        "concurrency": 16,
+        "max_concurrency": 64,
+        "limit": 64,
+        "keepalive_timeout": 60,
+        "ttl_dns_cache": 600,
+        "rate": None,
+        "burst": None,
+    },
+}
+
+# 重试：幂等请求遇到连接错误、超时、429 或 5xx 时按抖动指数退避重试（优先遵循 Retry-After）
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE = 0.5  # 秒
+HTTP_BACKOFF_MAX = 30    # 秒
+HTTP_RETRY_AFTER_MAX = 120  # 遵循 Retry-After 的上限（秒）：服务端要求等待更久时放弃重试、请求失败，连接池暂停也不超过该时长
 
 
 # 日志配置
@@ -66,17 +106,39 @@ LOG_BACKUP_COUNT = 5
 
 # 数据文件与目录
 CLASSIFY_FILE = DATA_DIR / "classify.json"
+CLASSIFY_STATE_FILE = DATA_DIR / "classify_state.json"  # 分类数据逐月摘要（变更检测）
 MONTH_DATA_DIR = DATA_DIR / "months"
 CONTENT_DATA_DIR = DATA_DIR / "content"
+HTTP_VALIDATORS_FILE = DATA_DIR / "http_validators.json"  # ETag / Last-Modified 记录
+CRAWL_INDEX_FILE = DATA_DIR / "crawl_index.sqlite3"  # 抓取状态索引
+CRAWL_JOURNAL_FILE = DATA_DIR / "crawl_journal.jsonl"  # 抓取日志（中断续跑）
+CRAWL_LEASES_FILE = DATA_DIR / "crawl_leases.sqlite3"  # 分片抓取租约账本
 
 
 # 抓取行为配置
-CONTENT_BATCH_SIZE = 10  # 内容抓取分批大小
+CONTENT_BATCH_SIZE = 10  # 内容抓取并发 worker 数（常驻 worker 从队列取任务）
 MIN_MARKDOWN_BYTES = 100  # 判定 markdown 有效的最小字节数
 MIN_META_BYTES = 10       # 判定 meta.json 有效的最小字节数
+VERIFY_WORKERS = 8        # 校验时并行扫描 markdown 的线程数
+
+# 文件写入：抓取 worker 提交到有界队列，由专用线程批量落盘
+WRITER_QUEUE_SIZE = 64    # 已提交未落盘的写入组上限，队列满时抓取 worker 等待
+WRITER_BATCH_SIZE = 32    # 写线程每批最多处理的写入组数
+JSON_COMPACT = False      # True 时月份/分类/元数据 JSON 不缩进（更小更快，但不便阅读）
+
+# 分片抓取（多进程 / 共享文件系统的多节点）
+SHARD_LEASE_TTL = 60        # 租约有效期（秒），分片进程每 1/3 有效期续约一次，崩溃后过期由其他分片重新领取
+SHARD_CLAIM_BATCH = 20      # 每次领取的内容项数
+SHARD_POLL_INTERVAL = 2.0   # 无可领取项但仍有其他分片持有租约时的轮询间隔（秒）
+SHARD_MAX_ATTEMPTS = 3      # 同一内容项租约过期（进程崩溃）的最多次数，超过后标记失败
+
+# 后台抓取任务
+JOB_HISTORY_LIMIT = 20     # 保留的已结束任务数
+JOB_EVENT_BUFFER = 1000    # 每个任务缓存的最近事件数（订阅方落后太多时先收到进度快照）
 
 
-# 确保目录存在
-for dir_path in [DATA_DIR, IMAGES_DIR, LOGS_DIR, MONTH_DATA_DIR, CONTENT_DATA_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+def ensure_dirs() -> None:
+    """创建数据与日志目录；导入配置不再创建目录，写入方在首次写入时各自创建，API 服务启动时调用本函数"""
+    for dir_path in [DATA_DIR, IMAGES_DIR, LOGS_DIR, MONTH_DATA_DIR, CONTENT_DATA_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
 
@@ -1,18 +1,29 @@
 """
-Cross-platform launcher for the FastAPI app.
+Cross-platform launcher for the FastAPI app and the headless command-line mode.
 
 Usage:
-  python main.py --host 127.0.0.1 --port 8000 --reload
+  python main.py --host 127.0.0.1 --port 8000 --reload            # API server
+  python main.py watch --once [--offline]                          # check classify for updates
+  python main.py crawl --once [--full] [--shards 4] [--offline]    # one pipeline run, no FastAPI/uvicorn
+  python main.py crawl --interval 3600                             # repeat until interrupted
+  python main.py crawl --hot --interval 300                        # poll only the latest HOT_MONTHS months for new posts
+  python main.py crawl-item article_12 section_5 [--force]         # keys as arguments or one per line on stdin
+  python main.py verify [--detail]
+  python main.py bench -- --months 24 --items 20                   # offline benchmark (benchmarks.run)
+  python main.py crawl --shard-worker 2 --shards 4                 # join the current sharded run from another node
+
+Subcommands write JSON lines to stdout (one result per line as it completes; logs go to stderr).
+Everything is imported lazily so that short-lived runs (cron, containers) only pay for what they use.
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import sys
 from pathlib import Path
 
-import uvicorn
-
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Blog Crawler API server")
     parser.add_argument("--host", default="127.0.0.1", help="Listen host (default: 127.0.0.1)")
     parser.add_argument("--port", "-p", type=int, default=8000, help="Listen port (default: 8000)")
@@ -23,11 +34,93 @@ def parse_args() -> argparse.Namespace:
         choices=["critical", "error", "warning", "info", "debug", "trace"],
         help="Logging level (default: info)",
     )
-    return parser.parse_args()
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    def add_repeat_options(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--once", action="store_true", help="Run a single pass and exit with its status")
+        command.add_argument("--interval", type=float, default=None,
+                             help="Seconds between passes when not --once (default: MONITOR_INTERVAL)")
+
+    def add_offline_option(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--offline", action="store_true", help="Use the local stub client instead of the network")
+
+    watch = commands.add_parser("watch", help="Check the classify endpoint for updates")
+    add_repeat_options(watch)
+    add_offline_option(watch)
+
+    crawl = commands.add_parser("crawl", help="Run the crawl pipeline without the API server")
+    add_repeat_options(crawl)
+    crawl.add_argument("--full", action="store_true", help="Walk all months instead of the incremental plan")
+    crawl.add_argument("--revalidate", action="store_true", help="Revalidate existing months/content with conditional requests")
+    crawl.add_argument("--refresh-stale", action="store_true", help="Re-download content whose modified_time changed")
+    crawl.add_argument("--resume", action="store_true", help="Continue an interrupted run from the crawl journal")
+    crawl.add_argument("--shards", type=int, default=1, help="Split the content stage across N worker processes")
+    crawl.add_argument("--hot", type=int, nargs="?", const=-1, default=0, metavar="N",
+                       help="Skip the classify check; refresh only the latest N months (default: HOT_MONTHS) and fetch new items")
+    add_offline_option(crawl)
+    # Internal: launched by the sharded runner, or by hand on other nodes sharing the data directory
+    crawl.add_argument("--shard-worker", type=int, default=None, help=argparse.SUPPRESS)
+    crawl.add_argument("--run-id", default=None, help=argparse.SUPPRESS)
+
+    crawl_item = commands.add_parser("crawl-item", help="Fetch specific items ({type}_{id}; '-' or none reads stdin)")
+    crawl_item.add_argument("keys", nargs="*", help="Item keys such as article_12 or section_5")
+    crawl_item.add_argument("--force", action="store_true", help="Re-download even if a complete local copy exists")
+    add_offline_option(crawl_item)
+
+    verify = commands.add_parser("verify", help="Verify local data files")
+    verify.add_argument("--detail", action="store_true", help="Emit one line per incomplete item")
+
+    bench = commands.add_parser("bench", help="Run the offline benchmark (arguments after -- go to benchmarks.run)")
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+async def run_command(args: argparse.Namespace) -> int:
+    from src import cli
+
+    return await cli.run(_command(cli, args))
+
+
+def _command(cli, args: argparse.Namespace):
+    if args.command == "watch":
+        return cli.watch(once=args.once, interval=args.interval, offline=args.offline)
+    if args.command == "crawl":
+        if args.shard_worker is not None:
+            return cli.shard_worker(args.shard_worker, args.shards, run_id=args.run_id, offline=args.offline)
+        return cli.crawl(
+            once=args.once,
+            interval=args.interval,
+            full=args.full,
+            revalidate=args.revalidate,
+            refresh_stale=args.refresh_stale,
+            resume=args.resume,
+            shards=args.shards,
+            hot_months=args.hot,
+            offline=args.offline,
+        )
+    if args.command == "crawl-item":
+        return cli.crawl_items(args.keys, force=args.force, offline=args.offline)
+    return cli.verify(detail=args.detail)
 
 
 def main() -> None:
     args = parse_args()
+    if args.command == "bench":
+        from benchmarks.run import main as bench_main
+
+        bench_main([a for a in args.bench_args if a != "--"])
+        return
+    if args.command is not None:
+        from src.cli import use_stderr_for_logs
+
+        use_stderr_for_logs()
+        try:
+            sys.exit(asyncio.run(run_command(args)))
+        except KeyboardInterrupt:
+            sys.exit(130)
+
+    import uvicorn
+
     # Using import string enables proper reload behavior
     app_path = "src.api.app:app"
     reload_dirs = [str(Path(__file__).parent)] if args.reload else None
@@ -44,4 +137,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
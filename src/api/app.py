@@ -1,18 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from config.settings import ensure_dirs
 from src.api.routers.watch import router as watch_router
 from src.api.routers.crawl import router as crawl_router
 from src.api.routers.verify import router as verify_router
 from src.api.routers.monitor import router as monitor_router
+from src.services.clients import client_registry
+from src.services.jobs import job_manager
+from src.services.monitor import monitor_manager
+from src.utils.metrics import registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时创建数据目录与共享 HTTP 客户端，关闭时先停止监控与后台任务再释放连接
+    ensure_dirs()
+    await client_registry.start()
+    try:
+        yield
+    finally:
+        await monitor_manager.stop()
+        await job_manager.shutdown()
+        await client_registry.close()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Blog Crawler API", version="1.0.0")
+    app = FastAPI(title="Blog Crawler API", version="1.0.0", lifespan=lifespan)
 
     @app.get("/health", tags=["system"], summary="健康检查")
     async def health():
         return {"status": "ok"}
 
+    @app.get("/metrics", tags=["system"], summary="Prometheus 指标", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     app.include_router(watch_router)
     app.include_router(crawl_router)
     app.include_router(verify_router)
@@ -1,22 +1,11 @@
-from typing import AsyncGenerator
+from fastapi import Query
 
-from fastapi import Depends, Query
-
-from src.utils.http_client import AsyncHTTPClient, LocalHTTPClient, AbstractHTTPClient
+from src.services.clients import client_registry
+from src.utils.http_client import AbstractHTTPClient
 
 
 async def get_http_client(
     offline: bool = Query(False, description="是否使用离线本地桩数据")
-) -> AsyncGenerator[AbstractHTTPClient, None]:
-    client: AbstractHTTPClient
-    if offline:
-        client = LocalHTTPClient()
-    else:
-        client = AsyncHTTPClient()
-
-    await client.__aenter__()
-    try:
-        yield client
-    finally:
-        await client.__aexit__(None, None, None)
-
+) -> AbstractHTTPClient:
+    # 复用应用生命周期内的共享客户端，不再每个请求新建/关闭 session
+    return await client_registry.get(offline)
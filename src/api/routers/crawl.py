@@ -1,52 +1,110 @@
-from pathlib import Path
+import asyncio
+import json
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from src.api.dependencies import get_http_client
-from src.crawler.classify_monitor import ClassifyMonitor
-from src.crawler.month_data_fetcher import MonthDataFetcher
-from src.crawler.content_fetcher import ContentFetcher
+from src.services.coordinator import crawl_coordinator
+from src.services.jobs import CrawlJob, job_manager
 from src.utils.http_client import AbstractHTTPClient
-from src.utils.models import ContentItem
+from src.utils.models import ContentItem, ItemRecord
 
 
 router = APIRouter(prefix="/crawl", tags=["crawl"])
 
+HEARTBEAT_SECONDS = 15.0
 
-@router.post("/run", summary="执行一次完整的爬取流程")
+
+@router.post("/run", summary="提交一次后台抓取任务（默认按分类月度计数差异增量抓取）")
 async def crawl_once(
+    full: bool = Query(False, description="处理全部月份与内容，而不是只处理有变化的部分"),
+    revalidate: bool = Query(False, description="对已存在的月份/内容发送条件请求（ETag/Last-Modified）重新校验"),
+    refresh_stale: bool = Query(False, description="比较本地与上游的 modified_time，只重新下载已修改的内容"),
+    resume: bool = Query(False, description="上次运行中断时按抓取日志从中断处继续"),
+    hot_months: int = Query(0, ge=0, description="大于 0 时不检查分类接口，只刷新最近 N 个月份并抓取新增内容"),
+    wait: bool = Query(False, description="等待任务结束后再返回（返回紧凑摘要）"),
     client: AbstractHTTPClient = Depends(get_http_client),
 ):
-    # 1. 分类监控
-    monitor = ClassifyMonitor()
-    monitor.http_client = client
-    classify_result = await monitor.crawl()
-    if not classify_result.success:
-        return {"success": False, "stage": "classify", "error": classify_result.error}
-
-    # 2. 月份列表 & 数据
-    month_fetcher = MonthDataFetcher()
-    month_fetcher.http_client = client
-    month_result = await month_fetcher.crawl()
-    if not month_result.success:
-        return {"success": False, "stage": "months", "error": month_result.error}
-
-    # 3. 内容详情
-    content_fetcher = ContentFetcher()
-    content_fetcher.http_client = client
-    content_result = await content_fetcher.crawl()
-    if not content_result.success:
-        return {"success": False, "stage": "content", "error": content_result.error}
-
-    return {
-        "success": True,
-        "classify": classify_result.model_dump(),
-        "months": month_result.model_dump(),
-        "content": content_result.model_dump(),
-    }
-
-
-@router.post("/item/{type}/{item_id}", summary="爬取单个内容详情（支持跳过已存在）")
+    job, attached = await job_manager.submit(
+        client, full=full, revalidate=revalidate, refresh_stale=refresh_stale, resume=resume, hot_months=hot_months
+    )
+    if wait and job.task is not None:
+        # asyncio.wait 不取消被等待的任务（客户端断开时后台任务继续），任务经 API 取消时也不抛出 CancelledError，
+        # 直接返回其状态（cancelled）
+        await asyncio.wait({job.task})
+        return {**job.to_dict(), "attached": attached}
+    return JSONResponse({**job.to_dict(), "attached": attached}, status_code=202)
+
+
+@router.get("/jobs", summary="最近的抓取任务")
+async def list_jobs():
+    return job_manager.list_jobs()
+
+
+@router.get("/jobs/{job_id}", summary="抓取任务状态与摘要")
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@router.delete("/jobs/{job_id}", summary="取消抓取任务")
+async def cancel_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/failures", summary="抓取任务的失败项（分页）")
+async def get_job_failures(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    job = _get_job(job_id)
+    return {"total": len(job.failures), "offset": offset, "limit": limit,
+            "items": job.failures[offset:offset + limit]}
+
+
+@router.get("/jobs/{job_id}/events", summary="抓取任务进度事件流（SSE 或 NDJSON）")
+async def stream_job_events(
+    job_id: str,
+    since: int = Query(0, ge=0, description="只返回序号大于 since 的事件"),
+    format: Optional[str] = Query(None, pattern="^(sse|ndjson)$", description="默认按 Accept 头选择"),
+    accept: Optional[str] = Header(None),
+    last_event_id: Optional[int] = Header(None),
+):
+    job = _get_job(job_id)
+    use_sse = format == "sse" or (format is None and "text/event-stream" in (accept or ""))
+    if use_sse and last_event_id is not None:
+        # EventSource 断线重连时从上次收到的事件继续
+        since = max(since, last_event_id)
+
+    async def sse():
+        async for event in job.events(since, heartbeat=HEARTBEAT_SECONDS):
+            if event["event"] == "heartbeat":
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    async def ndjson():
+        async for event in job.events(since, heartbeat=HEARTBEAT_SECONDS):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    if use_sse:
+        return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _get_job(job_id: str) -> CrawlJob:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@router.post("/item/{type}/{item_id}", summary="爬取单个内容详情（支持跳过已存在，优先于后台抓取获得并发额度）")
 async def crawl_single_item(
     type: str,
     item_id: int,
@@ -56,20 +114,8 @@ async def crawl_single_item(
     if type not in {"article", "section"}:
         raise HTTPException(status_code=400, detail="type must be 'article' or 'section'")
 
-    fetcher = ContentFetcher()
-    fetcher.http_client = client
-
     # 构造最小可用的内容项（标题仅用于返回展示）
     item = ContentItem(type=type, id=item_id, title=f"{type}-{item_id}", created_time="1970-01-01T00:00:00Z")
 
-    # 如强制，先删除本地已存在文件再拉取
-    if force:
-        md = Path(fetcher.content_data_dir / f"{type}_{item_id}.md")
-        meta = Path(fetcher.content_data_dir / f"{type}_{item_id}_meta.json")
-        for fp in (md, meta):
-            if fp.exists():
-                fp.unlink()
-
-    result = await fetcher._fetch_content_detail(item)
-    return result
-
+    # force 时忽略本地副本重新下载；文件以临时文件 + 重命名方式覆盖，同一内容正在抓取时等待其结果
+    return await crawl_coordinator.fetch_item(client, ItemRecord.from_model(item), force=force)
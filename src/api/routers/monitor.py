@@ -1,18 +1,34 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from config.settings import MONITOR_DEFAULT_INTERVAL
-from src.services.monitor import monitor_manager
+from config.settings import HOT_MONTHS, MONITOR_DEFAULT_INTERVAL
+from src.services.monitor import DEFAULT_JOB, monitor_manager
 
 
 class StartRequest(BaseModel):
     interval_seconds: int = Field(MONITOR_DEFAULT_INTERVAL, ge=1, description="监控间隔秒数")
     offline: bool = Field(False, description="是否使用离线样例数据")
     crawl_on_update: bool = Field(True, description="检测到更新时是否执行完整抓取")
+    adaptive: bool = Field(True, description="是否按有无变化自适应调整间隔")
+    hot_months: int = Field(HOT_MONTHS, ge=0, description="热点刷新任务 hot 刷新的最近月份数，0 表示不启用")
 
 
 class IntervalRequest(BaseModel):
     interval_seconds: int = Field(MONITOR_DEFAULT_INTERVAL, ge=1)
+    job: str = Field(DEFAULT_JOB, description="任务名")
+
+
+class JobRequest(BaseModel):
+    name: str = Field(..., min_length=1, description="任务名")
+    kind: Literal["pipeline", "classify", "verify", "hot_months"] = Field(..., description="任务类型")
+    interval_seconds: Optional[int] = Field(None, ge=1, description="基础间隔秒数（默认按任务类型）")
+    adaptive: Optional[bool] = Field(None, description="是否自适应（默认 verify 以外的任务自适应）")
+    offline: bool = Field(False, description="是否使用离线样例数据")
+    crawl_on_update: bool = Field(True, description="pipeline 任务检测到更新时是否抓取内容")
+    hot_months: Optional[int] = Field(None, ge=1, description="hot_months 任务刷新的最近月份数（默认 HOT_MONTHS）")
+    start_at: Optional[str] = Field(None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="第一次运行的本地时间 HH:MM")
 
 
 router = APIRouter(prefix="/monitor", tags=["monitor"])
@@ -29,6 +45,8 @@ async def start(req: StartRequest):
         interval_seconds=req.interval_seconds,
         offline=req.offline,
         crawl_on_update=req.crawl_on_update,
+        adaptive=req.adaptive,
+        hot_months=req.hot_months,
     )
 
 
@@ -39,5 +57,34 @@ async def stop():
 
 @router.post("/interval", summary="更新监控间隔")
 async def set_interval(req: IntervalRequest):
-    return await monitor_manager.set_interval(req.interval_seconds)
+    try:
+        return await monitor_manager.set_interval(req.interval_seconds, name=req.job)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="job not found")
+
+
+@router.get("/jobs", summary="列出监控任务及下一次运行时间")
+async def list_jobs():
+    return monitor_manager.status()["jobs"]
+
+
+@router.post("/jobs", summary="添加或替换监控任务")
+async def add_job(req: JobRequest):
+    return await monitor_manager.add_job(**req.model_dump())
+
+
+@router.post("/jobs/{name}/run", summary="立即运行一次监控任务")
+async def run_job(name: str):
+    try:
+        return await monitor_manager.run_job(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="job not found")
+
+
+@router.delete("/jobs/{name}", summary="删除监控任务")
+async def remove_job(name: str):
+    try:
+        return await monitor_manager.remove_job(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="job not found")
 
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Query
 
 from src.services.verification import Verifier
@@ -8,5 +10,5 @@ router = APIRouter(prefix="/verify", tags=["verify"])
 
 @router.get("", summary="校验本地数据文件（支持每篇内容明细）")
 async def verify_local(detail: bool = Query(False, description="是否返回每篇内容的明细问题列表")):
-    v = Verifier()
-    return v.verify(detail=detail)
+    # 校验涉及大量文件 I/O，放到线程中执行，避免阻塞事件循环
+    return await asyncio.to_thread(Verifier().verify, detail)
@@ -15,6 +15,8 @@ async def watch_updates(
     monitor = ClassifyMonitor()
     # 注入 DI 客户端
     monitor.http_client = client
+    # 只检测不保存：变化留给抓取流水线保存并按差异抓取
+    monitor.save = False
     result = await monitor.crawl()
     # pydantic v2
     return result.model_dump()
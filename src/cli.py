@@ -0,0 +1,240 @@
+"""
+命令行批处理模式（JSON lines）
+
+不启动 API 服务，直接调用分类监控、抓取流水线、内容抓取与校验器；每个结果完成后立即向标准输出写一行 JSON，
+不把结果攒成一个大字典，下游工具可以边读边处理，内存占用恒定。标准输出只有 JSON 行，日志改为输出到标准错误。
+
+每行都带 "event" 字段：
+  watch       classify（每次检查一行）
+  crawl       stage（阶段开始）/ item（每个内容一行）/ failure（月份失败）/ summary
+  crawl-item  item / summary
+  verify      issue（每个不完整的内容一行）/ summary
+"""
+import asyncio
+import json
+import os
+import sys
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+# 正在执行的命令；下游关闭管道时取消它
+_command_task: Optional["asyncio.Task[Any]"] = None
+
+
+def emit(event: str, **data: Any) -> None:
+    """输出一行 JSON 并立即刷新"""
+    try:
+        sys.stdout.write(json.dumps({"event": event, **data}, ensure_ascii=False, default=str) + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # 下游已关闭管道（如 `| head`）：之后的输出写入 /dev/null，并停止当前命令
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        if _command_task is not None:
+            _command_task.cancel()
+
+
+async def run(command: Awaitable[int]) -> int:
+    """执行一个子命令并返回退出码；因下游关闭管道而停止时返回 141（与 shell 的 SIGPIPE 约定一致）"""
+    global _command_task
+    _command_task = asyncio.current_task()
+    try:
+        return await command
+    except asyncio.CancelledError:
+        return 141
+
+
+def use_stderr_for_logs() -> None:
+    from src.utils.logger import set_console_stream
+
+    set_console_stream(sys.stderr)
+
+
+def _client(offline: bool, shares: int = 1):
+    from src.utils.http_client import AsyncHTTPClient, LocalHTTPClient
+
+    return LocalHTTPClient() if offline else AsyncHTTPClient(shares)
+
+
+def _item_event(key: str, result: Dict[str, Any], elapsed: float) -> None:
+    from src.crawler.content_fetcher import ContentFetcher
+
+    emit(
+        "item",
+        key=key,
+        outcome=ContentFetcher._outcome(result),
+        error=result.get("error"),
+        elapsed_ms=round(elapsed * 1000, 2),
+    )
+
+
+async def _repeat(once: bool, interval: Optional[float], run_pass: Callable[[], Awaitable[bool]]) -> int:
+    """once 时执行一次并以其结果作为退出码，否则每 interval 秒（默认 MONITOR_INTERVAL）执行一次直到中断"""
+    if once:
+        return 0 if await run_pass() else 1
+
+    from config.settings import MONITOR_INTERVAL
+    from src.services.scheduler import AdaptiveSchedule, Cadence
+
+    # 固定速率：以计划时间为基准，运行耗时不会让周期后移
+    schedule = AdaptiveSchedule(Cadence(interval=interval if interval is not None else MONITOR_INTERVAL, adaptive=False, jitter=0))
+    schedule.start()
+    while True:
+        await run_pass()
+        schedule.record(None)
+        await asyncio.sleep(schedule.seconds_until_due())
+
+
+# ---- watch ----
+
+async def watch(once: bool = False, interval: Optional[float] = None, offline: bool = False) -> int:
+    from src.crawler.classify_monitor import ClassifyMonitor
+
+    async with _client(offline) as client:
+        monitor = ClassifyMonitor()
+        monitor.http_client = client
+        # 只检测不保存：变化留给 crawl 保存并抓取，否则 crawl 的增量计划会看不到这些变化
+        monitor.save = False
+
+        async def check() -> bool:
+            result = await monitor.crawl()
+            data = result.data or {}
+            emit(
+                "classify",
+                success=result.success,
+                error=result.error,
+                updated=data.get("updated", False),
+                not_modified=data.get("not_modified", False),
+                delta=data.get("delta"),
+            )
+            return result.success
+
+        return await _repeat(once, interval, check)
+
+
+# ---- crawl ----
+
+async def crawl(
+    once: bool = False,
+    interval: Optional[float] = None,
+    full: bool = False,
+    revalidate: bool = False,
+    refresh_stale: bool = False,
+    resume: bool = False,
+    shards: int = 1,
+    hot_months: int = 0,
+    offline: bool = False,
+) -> int:
+    """hot_months 小于 0 时使用 HOT_MONTHS"""
+    from src.services.pipeline import compact_result, run_pipeline
+
+    if hot_months < 0:
+        from config.settings import HOT_MONTHS
+
+        hot_months = HOT_MONTHS
+
+    async with _client(offline) as client:
+        runner = None
+        if shards > 1:
+            from src.services.sharding import ShardedContentRunner
+
+            runner = ShardedContentRunner(client, shards, offline=offline)
+
+        async def run_pass() -> bool:
+            result = await run_pipeline(
+                client,
+                full=full,
+                revalidate=revalidate,
+                refresh_stale=refresh_stale,
+                resume=resume,
+                hot_months=hot_months,
+                on_item=_item_event,
+                on_stage=lambda stage, info: emit("stage", stage=stage, **info),
+                content_runner=runner,
+            )
+            summary, failures = compact_result(result)
+            for failure in failures:
+                # 本进程抓取的内容已逐项输出；分片进程中的内容项只能在结束后从账本汇总
+                if failure["kind"] != "item" or runner is not None:
+                    emit("failure", **failure)
+            emit("summary", **summary)
+            return bool(result.get("success"))
+
+        return await _repeat(once, interval, run_pass)
+
+
+async def shard_worker(shard: int, shards: int, run_id: Optional[str] = None, offline: bool = False) -> int:
+    from src.services.sharding import run_shard
+
+    # 分片进程均分各主机的并发额度与速率，合计与单进程抓取相同
+    async with _client(offline, shares=shards) as client:
+        summary = await run_shard(client, shard, shards, run_id=run_id)
+    emit("summary", **summary)
+    return 0 if summary.get("success") else 1
+
+
+# ---- crawl-item ----
+
+async def _read_keys(keys: List[str]) -> AsyncIterator[str]:
+    """命令行给出的 key；为空或为 "-" 时逐行读取标准输入"""
+    if keys and keys != ["-"]:
+        for key in keys:
+            yield key
+        return
+    while True:
+        line = await asyncio.to_thread(sys.stdin.readline)
+        if not line:
+            return
+        if line.strip():
+            yield line.strip()
+
+
+async def crawl_items(keys: List[str], force: bool = False, offline: bool = False) -> int:
+    """抓取指定内容项（"{type}_{id}"），按内容抓取的 worker 数并发"""
+    from src.crawler.content_fetcher import ContentFetcher
+    from src.utils.models import ItemRecord
+
+    invalid = 0
+
+    async def items() -> AsyncIterator[ItemRecord]:
+        nonlocal invalid
+        async for key in _read_keys(keys):
+            type_, _, id_ = key.rpartition("_")
+            if type_ not in ("article", "section") or not id_.isdigit():
+                invalid += 1
+                emit("item", key=key, outcome="failed", error="key 应为 article_<id> 或 section_<id>", elapsed_ms=0.0)
+                continue
+            # 标题与创建时间仅用于元数据展示，与 /crawl/item 相同
+            yield ItemRecord(type_, int(id_), f"{type_}-{id_}", "1970-01-01T00:00:00Z")
+
+    async with _client(offline) as client:
+        fetcher = ContentFetcher()
+        fetcher.http_client = client
+        fetcher.force = force
+        fetcher.on_result = _item_event
+        result = await fetcher.crawl(items=items())
+    data = result.data or {}
+    emit(
+        "summary",
+        success=result.success,
+        error=result.error,
+        **{k: v for k, v in data.items() if k != "failures"},
+        failed_count=len(data.get("failures") or {}),
+        invalid_count=invalid,
+    )
+    return 0 if result.success and not data.get("failures") and not invalid else 1
+
+
+# ---- verify ----
+
+async def verify(detail: bool = False) -> int:
+    from src.services.verification import Verifier
+
+    outcome = await asyncio.to_thread(Verifier().verify, detail)
+    items = outcome["items"]
+    for issue in items.pop("issues", []):
+        emit("issue", **issue)
+    months = outcome["months"]
+    # 月份文件列表只输出数量
+    outcome["months"] = {**{k: v for k, v in months.items() if k != "files"}, "file_count": len(months["files"])}
+    emit("summary", **outcome)
+    return 0 if outcome["ok"] else 1
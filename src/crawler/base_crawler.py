@@ -1,14 +1,15 @@
 """
 基础爬虫抽象层
 """
-import json
-import aiofiles
+import asyncio
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 
-from config.settings import API_BASE_URL
+from config.settings import API_BASE_URL, JSON_COMPACT
+from src.utils import json_codec
+from src.utils.file_writer import file_writer
 from src.utils.http_client import AsyncHTTPClient, AbstractHTTPClient
 from src.utils.models import CrawlResult
 from src.utils.logger import crawler_logger
@@ -45,9 +46,7 @@ class BaseCrawler(ABC):
     async def _save_json(self, data: Dict[str, Any], file_path: Path) -> bool:
         """保存数据为JSON文件"""
         try:
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+            await self._write_atomic(file_path, json_codec.dumps(data, indent=not JSON_COMPACT))
             crawler_logger.info(f"数据保存成功: {file_path}")
             return True
         except Exception as e:
@@ -57,23 +56,34 @@ class BaseCrawler(ABC):
     async def _save_markdown(self, content: str, file_path: Path) -> bool:
         """保存内容为Markdown文件"""
         try:
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                await f.write(content)
+            await self._write_atomic(file_path, content)
             crawler_logger.info(f"Markdown保存成功: {file_path}")
             return True
         except Exception as e:
             crawler_logger.error(f"Markdown保存失败: {file_path} - 错误: {e}")
             return False
 
+    async def _save_files(self, files: List[Tuple[Path, Union[str, bytes]]]) -> bool:
+        """成组保存多个文件：先全部写入临时文件，全部成功后再依次重命名"""
+        try:
+            await file_writer.write(files)
+            crawler_logger.info(f"文件保存成功: {', '.join(str(p) for p, _ in files)}")
+            return True
+        except Exception as e:
+            crawler_logger.error(f"文件保存失败: {', '.join(str(p) for p, _ in files)} - 错误: {e}")
+            return False
+
+    async def _write_atomic(self, file_path: Path, content: Union[str, bytes]) -> None:
+        """写入临时文件后重命名，避免中断时留下写了一半的文件（由后台写线程批量执行）"""
+        await file_writer.write([(file_path, content)])
+
     async def _load_json(self, file_path: Path) -> Optional[Dict[str, Any]]:
         """从JSON文件加载数据"""
         try:
             if not file_path.exists():
                 return None
-            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                return json.loads(content)
+            content = await asyncio.to_thread(file_path.read_bytes)
+            return json_codec.loads(content)
         except Exception as e:
             crawler_logger.error(f"数据加载失败: {file_path} - 错误: {e}")
             return None
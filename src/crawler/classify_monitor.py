@@ -1,11 +1,12 @@
 """
 分类接口监控
 """
-import hashlib
 from typing import Dict, Any, Optional
 
 from config.settings import CLASSIFY_URL, CLASSIFY_FILE
 from src.crawler.base_crawler import BaseCrawler
+from src.utils.classify_state import ClassifyChangeDetector, ClassifyDelta, classify_detector
+from src.utils.http_client import NOT_MODIFIED
 from src.utils.models import CrawlResult
 from src.utils.logger import crawler_logger
 
@@ -13,74 +14,70 @@ from src.utils.logger import crawler_logger
 class ClassifyMonitor(BaseCrawler):
     """分类接口监控器"""
 
-    def __init__(self):
+    def __init__(self, detector: Optional[ClassifyChangeDetector] = None):
         super().__init__()
         self.classify_url = CLASSIFY_URL
         self.classify_file = CLASSIFY_FILE
-        self.last_hash: Optional[str] = None
+        self.detector = detector or classify_detector
+        # 本次 crawl 相对上次保存的分类数据的逐月差异，供增量计划使用
+        self.delta: Optional[ClassifyDelta] = None
+        # 为 False 时只检测变化：不保存 classify.json、不提交快照，调用方可在下游阶段完成后
+        # 自行 save_data + detector.commit，否则变化留给之后的完整运行处理
+        self.save = True
 
     async def crawl(self) -> CrawlResult:
         """监控分类接口是否有更新"""
         try:
             crawler_logger.info("开始监控分类接口")
 
-            # 获取最新数据
-            data = await self.http_client.get(self.classify_url)
+            # 获取最新数据（条件请求，304 表示服务端数据无变化）
+            data = await self.http_client.get(self.classify_url, conditional=True)
+            not_modified = data is NOT_MODIFIED
+            if not_modified:
+                # 服务端未变化时与最近见到的数据对比（只检测未保存的变化也在其中）
+                data = self.detector.snapshot() or await self._load_json(self.classify_file)
+                if data:
+                    crawler_logger.info("分类数据未修改（304）")
+                else:
+                    # 本地文件缺失，退回完整请求
+                    not_modified = False
+                    data = await self.http_client.get(self.classify_url)
+
             if not data:
                 return self._create_result(False, error="获取分类数据失败")
 
-            # 计算数据哈希
-            current_hash = self._calculate_hash(data)
-
-            # 检查是否有变化
-            if await self._has_changed(current_hash):
-                # 保存新数据
-                success = await self._save_json(data, self.classify_file)
-                if success:
-                    self.last_hash = current_hash
-                    crawler_logger.info("分类数据已更新并保存")
-                    return self._create_result(True, data={"updated": True, "data": data})
-                else:
-                    return self._create_result(False, error="保存分类数据失败")
-            else:
-                crawler_logger.info("分类数据无变化")
-                return self._create_result(True, data={"updated": False, "data": data})
+            # 逐月对比摘要
+            self.delta = self.detector.diff(data)
+            result = {"updated": False, "not_modified": not_modified, "delta": self.delta.to_dict(), "data": data}
+            if self.delta.is_empty:
+                self.detector.observe(data, self.delta)
+                if not not_modified:
+                    crawler_logger.info("分类数据无变化")
+                return self._create_result(True, data=result)
+
+            summary = (
+                f"新增 {len(self.delta.months_added)} 个月份，"
+                f"变化 {len(self.delta.months_changed)} 个，删除 {len(self.delta.months_removed)} 个"
+            )
+            if not self.save:
+                self.detector.observe(data, self.delta)
+                crawler_logger.info(f"检测到分类数据变化（未保存）: {summary}")
+                return self._create_result(True, data={**result, "updated": True, "saved": False})
+
+            # 保存新数据，成功后再提交快照（保存失败时下次仍能检测到这些变化）
+            if not await self.save_data(data):
+                return self._create_result(False, error="保存分类数据失败")
+            self.detector.commit(data)
+            crawler_logger.info(f"分类数据已更新并保存: {summary}")
+            return self._create_result(True, data={**result, "updated": True})
 
         except Exception as e:
             crawler_logger.error(f"分类接口监控失败: {e}")
             return self._create_result(False, error=str(e))
 
-    def _calculate_hash(self, data: Dict[str, Any]) -> str:
-        """计算数据的哈希值"""
-        data_str = str(sorted(data.items()))
-        return hashlib.md5(data_str.encode()).hexdigest()
-
-    async def _has_changed(self, current_hash: str) -> bool:
-        """检查数据是否发生变化"""
-        if self.last_hash is None:
-            # 首次运行，尝试加载历史哈希；若无历史记录则视为变化
-            self.last_hash = await self._load_last_hash()
-            if self.last_hash is None:
-                return True
-            return current_hash != self.last_hash
-
-        return current_hash != self.last_hash
-
-    async def _load_last_hash(self) -> Optional[str]:
-        """从文件加载上次的哈希值"""
-        try:
-            if not self.classify_file.exists():
-                return None
-
-            # 读取现有数据计算哈希
-            existing_data = await self._load_json(self.classify_file)
-            if existing_data:
-                return self._calculate_hash(existing_data)
-
-        except Exception as e:
-            crawler_logger.warning(f"加载历史哈希失败: {e}")
-
-        return None
+    async def save_data(self, data: Dict[str, Any]) -> bool:
+        """只保存 classify.json，不提交快照（供下游阶段读取本地分类数据）"""
+        return await self._save_json(data, self.classify_file)
 
     async def get_classify_data(self) -> Optional[Dict[str, Any]]:
         """获取分类数据"""
@@ -2,77 +2,164 @@
 文章/笔记详情获取器
 """
 import asyncio
-import re
+import hashlib
+import os
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
-from urllib.parse import urlparse
-
-from config.settings import API_BASE_URL, CONTENT_DATA_DIR, IMAGES_DIR
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple, Union
+
+from config.settings import (
+    API_BASE_URL,
+    CONTENT_DATA_DIR,
+    IMAGES_DIR,
+    CONTENT_BATCH_SIZE,
+    MIN_MARKDOWN_BYTES,
+    MIN_META_BYTES,
+    JSON_COMPACT,
+)
 from src.crawler.base_crawler import BaseCrawler
-from src.utils.models import CrawlResult, ContentItem, ArticleDetail, SectionDetail
+from src.crawler.image_downloader import ImageDownloader
+from src.utils import json_codec
+from src.utils.crawl_index import get_crawl_index
+from src.utils.crawl_journal import CrawlJournal
+from src.utils.http_client import NOT_MODIFIED
+from src.utils.single_flight import SingleFlight
+from src.utils.models import CrawlResult, ItemRecord, ArticleDetail, SectionDetail
 from src.utils.logger import crawler_logger
+from src.utils.metrics import ITEMS, QUEUE_DEPTH, STAGE_DURATION, WORKERS_BUSY
+
+
+OUTCOMES = ("fetched", "refreshed", "skipped", "failed")
+
+
+def _list_sizes(directory: Path) -> Dict[str, int]:
+    """一次 scandir 列出目录中的文件及其字节数"""
+    sizes: Dict[str, int] = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    sizes[entry.name] = entry.stat().st_size
+    except FileNotFoundError:
+        pass
+    return sizes
 
 
 class ContentFetcher(BaseCrawler):
     """文章/笔记详情获取器"""
 
+    # (type, id) -> 进行中的抓取，进程内所有实例共享：后台任务与 /crawl/item 同时请求同一内容时只抓取一次；
+    # 强制重新下载的请求不复用普通抓取，等其结束后再重新下载
+    _inflight = SingleFlight("item")
+
     def __init__(self):
         super().__init__()
         self.content_data_dir = CONTENT_DATA_DIR
         self.images_dir = IMAGES_DIR
-
-    async def crawl(self) -> CrawlResult:
-        """获取所有内容的详情"""
+        self.worker_count = CONTENT_BATCH_SIZE
+        # 为 True 时对本地已完整的内容发送条件请求重新校验，而不是直接跳过
+        self.revalidate = False
+        # 为 True 时比较本地记录与上游的 modified_time，只重新下载过期的内容
+        self.freshness = False
+        # 为 True 时忽略本地已有副本，全部重新下载
+        self.force = False
+        # 月份列表中条目有变化的内容项（"{type}_{id}"）：与 freshness 相同，按 modified_time 判断是否重新下载
+        self.refresh_keys: Set[str] = set()
+        self.index = get_crawl_index()
+        # 注入抓取日志后逐项记录开始/提交，用于中断后续跑
+        self.journal: Optional[CrawlJournal] = None
+        # 每个内容处理完成后回调 (item_key, result, 耗时秒)，用于进度与统计
+        self.on_result: Optional[Callable[[str, Dict[str, Any], float], None]] = None
+        # crawl 开始时列出一次内容目录（文件名 -> 字节数），跳过前据此确认索引中的文件仍在磁盘上
+        self._listing: Optional[Dict[str, int]] = None
+
+    async def crawl(self, items: Optional[Union[Iterable[ItemRecord], AsyncIterable[ItemRecord]]] = None) -> CrawlResult:
+        """获取内容详情，items 为空时处理所有月份文件中的内容项；items 可为异步迭代器（如分片租约领取）"""
         try:
             crawler_logger.info("开始获取内容详情")
-
-            # 获取所有内容项
-            content_items = await self._get_all_content_items()
-            if not content_items:
-                return self._create_result(False, error="无法获取内容项列表")
-
-            crawler_logger.info(f"发现 {len(content_items)} 个内容项需要处理")
-
-            results = {}
-            success_count = 0
-            skipped_count = 0
-
-            # 并发获取所有内容的详情
-            tasks = []
-            for item in content_items:
-                task = self._fetch_content_detail(item)
-                tasks.append(task)
-
-            # 分批处理，避免并发过多
-            batch_size = 10
-            for i in range(0, len(tasks), batch_size):
-                batch_tasks = tasks[i:i + batch_size]
-                batch_items = content_items[i:i + batch_size]
-
-                crawler_logger.debug(f"处理批次 {i//batch_size + 1}: {len(batch_tasks)} 个任务")
-
-                batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-
-                for item, result in zip(batch_items, batch_results):
-                    item_key = f"{item.type}_{item.id}"
-                    if isinstance(result, Exception):
-                        crawler_logger.error(f"内容 {item_key} 获取失败: {result}")
-                        results[item_key] = {"success": False, "error": str(result)}
+            self._listing = await asyncio.to_thread(_list_sizes, self.content_data_dir)
+
+            # 逐项结果只计入计数，失败项单独记录错误，不保留每项的结果字典
+            outcomes: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+            failures: Dict[str, Optional[str]] = {}
+            total_count = 0
+
+            # 固定数量的常驻 worker 从有界队列取任务，月份文件按需读取后喂入队列
+            worker_count = max(1, int(self.worker_count))
+            queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count * 2)
+            started = time.perf_counter()
+
+            async def produce() -> None:
+                nonlocal total_count
+                seen = set()
+                try:
+                    if items is None:
+                        source = self._iter_content_items()
+                    elif hasattr(items, "__aiter__"):
+                        source = items
                     else:
-                        results[item_key] = result
-                        if result["success"]:
-                            success_count += 1
-                            if result.get("skipped", False):
-                                skipped_count += 1
+                        source = self._iter_given(items)
+                    async for item in source:
+                        item_key = item.key
+                        if item_key in seen:
+                            continue
+                        seen.add(item_key)
+                        total_count += 1
+                        await queue.put(item)
+                        QUEUE_DEPTH.set(queue.qsize())
+                finally:
+                    # 每个 worker 一个结束标记
+                    for _ in range(worker_count):
+                        await queue.put(None)
+
+            async def work() -> None:
+                while True:
+                    item = await queue.get()
+                    QUEUE_DEPTH.set(queue.qsize())
+                    if item is None:
+                        return
+                    item_key = item.key
+                    WORKERS_BUSY.inc()
+                    try:
+                        result = await self._fetch_journaled(item, item_key)
+                    finally:
+                        WORKERS_BUSY.dec()
+                    outcome = self._outcome(result)
+                    outcomes[outcome] += 1
+                    if outcome == "failed":
+                        failures[item_key] = result.get("error")
+
+            workers = [asyncio.create_task(work()) for _ in range(worker_count)]
+            try:
+                await produce()
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+            if total_count == 0 and items is None:
+                return self._create_result(False, error="无法获取内容项列表")
 
-            crawler_logger.info(f"内容详情获取完成: {success_count}/{len(content_items)} 成功，其中 {skipped_count} 个跳过下载")
+            elapsed = time.perf_counter() - started
+            rate = total_count / elapsed if elapsed > 0 else 0.0
+            success_count = total_count - outcomes["failed"]
+            crawler_logger.info(
+                f"内容详情获取完成: {success_count}/{total_count} 成功，其中 {outcomes['skipped']} 个跳过下载、"
+                f"{outcomes['refreshed']} 个过期重新下载，"
+                f"耗时 {elapsed:.2f}s（{rate:.1f} 条/秒，{worker_count} 个 worker）"
+            )
 
             return self._create_result(
                 True,
                 data={
-                    "total_items": len(content_items),
+                    "total_items": total_count,
                     "success_count": success_count,
-                    "results": results
+                    "skipped": outcomes["skipped"],
+                    "refreshed": outcomes["refreshed"],
+                    "elapsed_seconds": round(elapsed, 3),
+                    "items_per_second": round(rate, 2),
+                    "failures": failures,
                 }
             )
 
@@ -80,73 +167,139 @@ class ContentFetcher(BaseCrawler):
             crawler_logger.error(f"内容详情获取失败: {e}")
             return self._create_result(False, error=str(e))
 
-    async def _get_all_content_items(self) -> List[ContentItem]:
-        """获取所有内容项"""
-        from src.crawler.classify_monitor import ClassifyMonitor
+    async def _fetch_journaled(self, item: ItemRecord, item_key: str) -> Dict[str, Any]:
+        """抓取单个内容并写入抓取日志；续跑时跳过已提交的内容，强制重抓开始过但未提交的内容"""
+        journal = self.journal
+        if journal is not None and journal.run is not None and item_key in journal.run.committed:
+            result = {"success": True, "type": item.type, "id": item.id, "title": item.title,
+                      "skipped": True, "resumed": True}
+            ITEMS.inc(type=item.type, outcome="skipped")
+            if self.on_result is not None:
+                self.on_result(item_key, result, 0.0)
+            return result
+
+        force = self.force or (journal is not None and journal.run is not None and item_key in journal.run.pending)
+        if journal is not None:
+            journal.start(item_key)
+        started = time.perf_counter()
+        try:
+            result = await self._fetch_content_detail(item, force=force)
+        except Exception as e:
+            crawler_logger.error(f"内容 {item_key} 获取失败: {e}")
+            result = {"success": False, "error": str(e)}
+        if journal is not None:
+            if result["success"]:
+                journal.commit(item_key)
+            else:
+                journal.fail(item_key, result.get("error"))
+        ITEMS.inc(type=item.type, outcome=self._outcome(result))
+        if self.on_result is not None:
+            self.on_result(item_key, result, time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _outcome(result: Dict[str, Any]) -> str:
+        """fetched / refreshed / skipped / failed（OUTCOMES 之一）"""
+        if not result.get("success"):
+            return "failed"
+        if result.get("skipped"):
+            return "skipped"
+        return "refreshed" if result.get("refreshed") else "fetched"
+
+    @staticmethod
+    async def _iter_given(items: Iterable[Any]) -> AsyncIterator[Any]:
+        for item in items:
+            yield item
+
+    async def _iter_content_items(
+        self, months: Optional[Union[Iterable[str], AsyncIterable[str]]] = None
+    ) -> AsyncIterator[ItemRecord]:
+        """按月份逐个读取内容项（惰性产出）；months 为空时读取分类数据中的全部月份，也可为月份就绪时产出的异步迭代器"""
         from src.crawler.month_data_fetcher import MonthDataFetcher
 
-        items = []
-        classify_data = None
+        if months is None:
+            from src.crawler.classify_monitor import ClassifyMonitor
 
-        # 获取分类数据来确定月份
-        async with ClassifyMonitor() as monitor:
-            classify_data = await monitor.get_classify_data()
+            # 获取分类数据来确定月份（只读本地文件，无需 HTTP 客户端）
+            classify_data = await ClassifyMonitor().get_classify_data()
             if not classify_data:
                 crawler_logger.warning("未找到分类数据")
-                return items
-
-        crawler_logger.info(f"找到 {len(classify_data)} 个月份")
-
-        # 获取所有月份的数据
-        async with MonthDataFetcher() as fetcher:
-            for month in classify_data.keys():
-                month_data = await fetcher.get_month_data(month)
-                if month_data:
-                    for item_data in month_data:
-                        try:
-                            item = ContentItem(**item_data)
-                            items.append(item)
-                        except Exception as e:
-                            crawler_logger.warning(f"解析内容项失败: {item_data} - 错误: {e}")
-                else:
-                    crawler_logger.warning(f"月份 {month} 没有数据")
-
-        crawler_logger.info(f"总共找到 {len(items)} 个内容项")
-        return items
-
-    async def _fetch_content_detail(self, item: ContentItem) -> Dict[str, Any]:
-        """获取单个内容的详情"""
+                return
+            crawler_logger.info(f"找到 {len(classify_data)} 个月份")
+            months = list(classify_data.keys())
+
+        fetcher = MonthDataFetcher()
+        month_source = months if hasattr(months, "__aiter__") else self._iter_given(months)
+        async for month in month_source:
+            # 同一时间只持有一个月份的数据
+            month_data = await fetcher.get_month_data(month)
+            if not month_data:
+                crawler_logger.warning(f"月份 {month} 没有数据")
+                continue
+            for item_data in month_data:
+                try:
+                    yield ItemRecord.from_dict(item_data)
+                except Exception as e:
+                    crawler_logger.warning(f"解析内容项失败: {item_data} - 错误: {e}")
+
+    async def _fetch_content_detail(self, item: ItemRecord, force: bool = False) -> Dict[str, Any]:
+        """获取单个内容的详情，force=True 时忽略本地已有副本重新下载；同一内容正在抓取时等待其结果"""
+        return await self._inflight.do((item.type, item.id), lambda: self._fetch_and_save(item, force), fresh=force)
+
+    async def _fetch_and_save(self, item: ItemRecord, force: bool) -> Dict[str, Any]:
         try:
             markdown_file = self.content_data_dir / f"{item.type}_{item.id}.md"
             json_file = self.content_data_dir / f"{item.type}_{item.id}_meta.json"
 
-            # 检查本地文件是否已存在且有效
-            if markdown_file.exists() and json_file.exists():
-                # 检查文件大小是否合理
-                markdown_size = markdown_file.stat().st_size
-                json_size = json_file.stat().st_size
-
-                if markdown_size > 100 and json_size > 10:  # 合理的文件大小阈值
+            # 通过索引判断本地是否已完整；索引无记录时检查文件并回填（兼容旧数据）
+            state = self.index.get(item.type, item.id)
+            if state is None and self._backfill_index(item, markdown_file, json_file):
+                state = self.index.get(item.type, item.id)
+            if (
+                state is not None and state.is_complete and not force
+                and not (self._on_disk(markdown_file, state.md_size) and self._on_disk(json_file, state.meta_size))
+            ):
+                # 索引记录完整但文件已被删除或改动：丢弃记录并重新下载
+                crawler_logger.warning(f"内容 {item.type}/{item.id} 的本地文件缺失或大小不符，重新下载")
+                self.index.forget(item.type, item.id)
+                state = None
+            is_complete = state is not None and state.is_complete and not force
+            stored_modified = state.modified_time if state is not None else None
+            freshness = self.freshness or item.key in self.refresh_keys
+
+            if is_complete:
+                if freshness and item.modified_time and stored_modified:
+                    # 列表已提供 modified_time，无需请求即可判断是否过期
+                    if item.modified_time == stored_modified:
+                        return self._skipped_result(item, markdown_file, json_file, fresh=True)
+                elif not (self.revalidate or freshness):
                     crawler_logger.debug(f"内容 {item.type}/{item.id} 已存在，跳过下载")
-                    return {
-                        "success": True,
-                        "type": item.type,
-                        "id": item.id,
-                        "title": item.title,
-                        "markdown_file": str(markdown_file),
-                        "meta_file": str(json_file),
-                        "skipped": True,
-                        "image_download_results": []
-                    }
-
-            # 文件不存在或无效，重新下载
+                    return self._skipped_result(item, markdown_file, json_file)
+
+            # 文件不存在、无效或需要重新校验
             crawler_logger.debug(f"下载内容详情: {item.type}/{item.id}")
             url = f"{self.base_url}/{item.type}/{item.id}"
-            data = await self.http_client.get(url)
+            data = await self.http_client.get(url, conditional=True)
+
+            if data is NOT_MODIFIED:
+                if is_complete:
+                    crawler_logger.debug(f"内容 {item.type}/{item.id} 未修改（304）")
+                    return self._skipped_result(item, markdown_file, json_file, not_modified=True)
+                data = await self.http_client.get(url)
 
             if not data:
                 return {"success": False, "error": "获取数据为空"}
 
+            # 本地已有完整副本时，只有上游 modified_time 变化才重写
+            if is_complete and freshness:
+                upstream_modified = data.get("modified_time")
+                if upstream_modified and upstream_modified == stored_modified:
+                    crawler_logger.debug(f"内容 {item.type}/{item.id} 未过期，跳过重写")
+                    return self._skipped_result(item, markdown_file, json_file, fresh=True)
+                crawler_logger.info(
+                    f"内容 {item.type}/{item.id} 已更新: {stored_modified} -> {upstream_modified}"
+                )
+
             # 分离正文和其他数据
             body_content = data.get("body", "")
             meta_data = {k: v for k, v in data.items() if k != "body"}
@@ -154,13 +307,23 @@ class ContentFetcher(BaseCrawler):
             # 处理图片下载
             processed_body, image_results = await self._process_images(body_content)
 
-            # 保存正文为markdown文件
-            success_md = await self._save_markdown(processed_body, markdown_file)
-
-            # 保存元数据为json文件
-            success_json = await self._save_json(meta_data, json_file)
-
-            if success_md and success_json:
+            # 正文与元数据成对原子写入：都写好临时文件后再重命名
+            saved = await self._save_files([
+                (markdown_file, processed_body),
+                (json_file, json_codec.dumps(meta_data, indent=not JSON_COMPACT)),
+            ])
+
+            if saved:
+                self.index.record_item(
+                    item.type,
+                    item.id,
+                    title=data.get("title", item.title),
+                    modified_time=data.get("modified_time"),
+                    body_hash=hashlib.md5(body_content.encode()).hexdigest(),
+                    md_size=markdown_file.stat().st_size,
+                    meta_size=json_file.stat().st_size,
+                    images=[Path(r["local_path"]).name for r in image_results if r["success"] and r["local_path"]],
+                )
                 return {
                     "success": True,
                     "type": item.type,
@@ -169,7 +332,8 @@ class ContentFetcher(BaseCrawler):
                     "markdown_file": str(markdown_file),
                     "meta_file": str(json_file),
                     "image_download_results": image_results,
-                    "skipped": False
+                    "skipped": False,
+                    "refreshed": is_complete,
                 }
             else:
                 return {"success": False, "error": "保存文件失败"}
@@ -178,89 +342,56 @@ class ContentFetcher(BaseCrawler):
             crawler_logger.error(f"获取内容 {item.type}/{item.id} 详情失败: {e}")
             return {"success": False, "error": str(e)}
 
-    async def _process_images(self, body: str) -> Tuple[str, List[Dict[str, Any]]]:
-        """处理正文中的图片"""
-        if not body:
-            return body, []
-
-        # 匹配markdown中的图片链接
-        image_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        matches = re.findall(image_pattern, body)
-
-        if not matches:
-            return body, []
-
-        results = []
-        processed_body = body
-
-        for alt_text, image_url in matches:
-            if image_url.startswith('http'):
-                # 下载图片
-                local_path, success = await self._download_image(image_url)
-
-                if success and local_path:
-                    # 替换为本地路径
-                    relative_path = f"./images/{Path(local_path).name}"
-                    old_pattern = f'![{alt_text}]({image_url})'
-                    new_pattern = f'![{alt_text}]({relative_path})'
-                    processed_body = processed_body.replace(old_pattern, new_pattern)
-
-                results.append({
-                    "url": image_url,
-                    "local_path": local_path,
-                    "success": success
-                })
-
-        return processed_body, results
-
-    async def _download_image(self, url: str) -> Tuple[Optional[str], bool]:
-        """下载图片"""
+    def _on_disk(self, path: Path, size: int) -> bool:
+        """文件存在且大小与索引一致；不在目录列表中的（本次 crawl 开始后写入或未做列表）直接 stat"""
+        if self._listing is not None and self._listing.get(path.name) == size:
+            return True
         try:
-            # 清理URL，去掉查询参数
-            parsed_url = urlparse(url)
-            clean_url = parsed_url._replace(query='').geturl()
-
-            # 生成文件名
-            import hashlib
-            url_hash = hashlib.md5(clean_url.encode()).hexdigest()
-
-            # 更好地处理扩展名
-            ext = self._get_image_extension(clean_url)
-            filename = f"{url_hash}{ext}"
-            save_path = self.images_dir / filename
-
-            # 检查是否已存在
-            if save_path.exists():
-                crawler_logger.debug(f"图片已存在: {save_path}")
-                return str(save_path), True
-
-            # 下载图片
-            success = await self.http_client.download_file(url, str(save_path))
-
-            if success:
-                return str(save_path), True
-            else:
-                return None, False
-
+            return path.stat().st_size == size
+        except FileNotFoundError:
+            return False
+
+    def _backfill_index(self, item: ItemRecord, markdown_file: Path, json_file: Path) -> bool:
+        """索引中没有记录时按文件判断是否完整，完整则写入索引"""
+        if not (markdown_file.exists() and json_file.exists()):
+            return False
+        markdown_stat = markdown_file.stat()
+        json_size = json_file.stat().st_size
+        if not (markdown_stat.st_size > MIN_MARKDOWN_BYTES and json_size > MIN_META_BYTES):
+            return False
+
+        modified_time = None
+        try:
+            modified_time = json_codec.loads(json_file.read_bytes()).get("modified_time")
         except Exception as e:
-            crawler_logger.error(f"下载图片失败: {url} - 错误: {e}")
-            return None, False
-
-    def _get_image_extension(self, url: str) -> str:
-        """获取图片扩展名"""
-        # 从URL路径中提取扩展名
-        path = Path(urlparse(url).path)
-        ext = path.suffix.lower()
-
-        # 如果没有扩展名或扩展名不完整，尝试从Content-Type推断
-        if not ext or len(ext) < 3:
-            # 常见的图片扩展名
-            return '.png'
-
-        # 确保是有效的图片扩展名
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg']
-        if ext in valid_extensions:
-            return ext
-
-        # 如果不是标准扩展名，返回png
-        return '.png'
+            crawler_logger.warning(f"读取元数据失败: {json_file} - 错误: {e}")
+        self.index.record_item(
+            item.type,
+            item.id,
+            title=item.title,
+            modified_time=modified_time,
+            md_size=markdown_stat.st_size,
+            meta_size=json_size,
+            fetched_at=datetime.fromtimestamp(markdown_stat.st_mtime).isoformat(),
+        )
+        return True
+
+    def _skipped_result(self, item: ItemRecord, markdown_file: Path, json_file: Path, **extra: Any) -> Dict[str, Any]:
+        """构造跳过下载的结果"""
+        return {
+            "success": True,
+            "type": item.type,
+            "id": item.id,
+            "title": item.title,
+            "markdown_file": str(markdown_file),
+            "meta_file": str(json_file),
+            "skipped": True,
+            "image_download_results": [],
+            **extra,
+        }
+
+    async def _process_images(self, body: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """并发下载正文中的图片并替换为本地路径"""
+        downloader = ImageDownloader(self.images_dir, self.http_client)
+        with STAGE_DURATION.time(stage="images"):
+            return await downloader.process_body(body)
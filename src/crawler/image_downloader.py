@@ -0,0 +1,124 @@
+"""
+正文图片下载器
+"""
+import asyncio
+import hashlib
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.utils.http_client import AbstractHTTPClient
+from src.utils.image_store import ImageStore
+from src.utils.logger import crawler_logger
+from src.utils.metrics import IMAGES
+
+
+# 匹配markdown中的图片链接
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+
+VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'}
+
+
+class ImageDownloader:
+    """并发下载正文中的图片，并在同时进行的文章之间共享同一 URL 的下载；图片保存在内容寻址存储中"""
+
+    # URL（去掉查询参数）-> 进行中的下载任务，进程内所有实例共享
+    _inflight: Dict[str, "asyncio.Task[Tuple[Optional[str], bool]]"] = {}
+
+    def __init__(self, images_dir: Path, http_client: AbstractHTTPClient):
+        self.images_dir = images_dir
+        self.http_client = http_client
+        self.store = ImageStore(images_dir)
+
+    async def process_body(self, body: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """下载正文中的全部图片，并一次性将链接替换为本地路径"""
+        if not body:
+            return body, []
+
+        urls = list(dict.fromkeys(m.group(2) for m in IMAGE_PATTERN.finditer(body) if m.group(2).startswith('http')))
+        if not urls:
+            return body, []
+
+        outcomes = await asyncio.gather(*(self.download(url) for url in urls))
+
+        local_names: Dict[str, str] = {}
+        results: List[Dict[str, Any]] = []
+        for url, (local_path, success) in zip(urls, outcomes):
+            if success and local_path:
+                local_names[url] = Path(local_path).name
+            results.append({"url": url, "local_path": local_path, "success": success})
+
+        def replace(match: "re.Match[str]") -> str:
+            name = local_names.get(match.group(2))
+            if name is None:
+                return match.group(0)
+            return f'![{match.group(1)}](./images/{name})'
+
+        return IMAGE_PATTERN.sub(replace, body), results
+
+    async def download(self, url: str) -> Tuple[Optional[str], bool]:
+        """下载单张图片；已保存过的 URL 直接查索引，同一图片正在下载时等待已有任务而不是重复请求"""
+        try:
+            key = self.url_key(url)
+
+            path = await self.store.lookup(key)
+            if path is None:
+                # 旧版本按 URL 哈希命名的文件：与服务端大小一致时登记到索引后继续使用
+                legacy_path = self.images_dir / self.legacy_filename_for(url)
+                if legacy_path.exists():
+                    path = await self.store.adopt(key, legacy_path, await self.http_client.content_length(url))
+            if path is not None:
+                crawler_logger.debug(f"图片已存在: {path}")
+                IMAGES.inc(outcome="cached")
+                return str(path), True
+
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._download(url, key))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            else:
+                crawler_logger.debug(f"图片正在下载，等待已有任务: {url}")
+                IMAGES.inc(outcome="shared")
+            # shield：某篇文章被取消时不影响其他等待同一图片的文章
+            return await asyncio.shield(task)
+
+        except Exception as e:
+            crawler_logger.error(f"下载图片失败: {url} - 错误: {e}")
+            return None, False
+
+    async def _download(self, url: str, key: str) -> Tuple[Optional[str], bool]:
+        try:
+            path, duplicate = await self.store.store(
+                key, self.extension_for(key), lambda tmp_path: self.http_client.download_file(url, str(tmp_path))
+            )
+        except Exception as e:
+            crawler_logger.error(f"下载图片失败: {url} - 错误: {e}")
+            IMAGES.inc(outcome="failed")
+            return None, False
+        if path is None:
+            IMAGES.inc(outcome="failed")
+            return None, False
+        IMAGES.inc(outcome="deduplicated" if duplicate else "downloaded")
+        return str(path), True
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        """去掉查询参数后的 URL（图片处理参数不影响原图）"""
+        return urlparse(url)._replace(query='').geturl()
+
+    @classmethod
+    def legacy_filename_for(cls, url: str) -> str:
+        """旧版本的本地文件名：去掉查询参数后的 URL 的 MD5"""
+        clean_url = cls.url_key(url)
+        url_hash = hashlib.md5(clean_url.encode()).hexdigest()
+        return f"{url_hash}{cls.extension_for(clean_url)}"
+
+    @staticmethod
+    def extension_for(url: str) -> str:
+        """获取图片扩展名，无法识别时使用 .png"""
+        ext = Path(urlparse(url).path).suffix.lower()
+        if ext in VALID_EXTENSIONS:
+            return ext
+        return '.png'
@@ -3,43 +3,62 @@
 """
 import asyncio
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set
 
 from config.settings import API_BASE_URL, MONTH_DATA_DIR
 from src.crawler.base_crawler import BaseCrawler
-from src.utils.models import CrawlResult, ContentItem
+from src.utils.crawl_index import get_crawl_index
+from src.utils.http_client import NOT_MODIFIED
+from src.utils.single_flight import SingleFlight
+from src.utils.models import CrawlResult, ItemRecord
 from src.utils.logger import crawler_logger
 
 
 class MonthDataFetcher(BaseCrawler):
     """月份数据获取器"""
 
+    # month -> 进行中的抓取，进程内所有实例共享；要求重新请求的调用不复用普通抓取，等其结束后再请求
+    _inflight = SingleFlight("month")
+
     def __init__(self):
         super().__init__()
         self.month_data_dir = MONTH_DATA_DIR
+        # 为 True 时对已存在的月份发送条件请求重新校验，而不是直接跳过
+        self.revalidate = False
+        self.index = get_crawl_index()
+        # 每个月份处理完成后回调 (month, result)，用于在月份阶段结束前开始抓取已就绪月份的内容
+        self.on_month: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    async def crawl(self, months: Optional[List[str]] = None, refresh: Optional[Iterable[str]] = None) -> CrawlResult:
+        """获取月份数据
 
-    async def crawl(self) -> CrawlResult:
-        """获取所有月份的数据"""
+        months 为空时处理分类数据中的全部月份；refresh 中的月份即使本地已存在也重新请求。
+        """
         try:
             crawler_logger.info("开始获取月份数据")
 
-            # 获取分类数据来确定有哪些月份
-            classify_data = await self._get_classify_data()
-            if not classify_data:
-                return self._create_result(False, error="无法获取分类数据")
+            if months is None:
+                # 获取分类数据来确定有哪些月份
+                classify_data = await self._get_classify_data()
+                if not classify_data:
+                    return self._create_result(False, error="无法获取分类数据")
+                months = list(classify_data.keys())
 
-            months = list(classify_data.keys())
+            refresh_set: Set[str] = set(refresh or ())
             crawler_logger.info(f"发现 {len(months)} 个月份需要处理")
 
             results = {}
             success_count = 0
             skipped_count = 0
 
+            async def fetch(month: str) -> Dict[str, Any]:
+                result = await self._fetch_month_data(month, refresh=month in refresh_set)
+                if self.on_month is not None:
+                    self.on_month(month, result)
+                return result
+
             # 并发获取所有月份的数据
-            tasks = []
-            for month in months:
-                task = self._fetch_month_data(month)
-                tasks.append(task)
+            tasks = [fetch(month) for month in months]
 
             # 等待所有任务完成
             month_results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -74,34 +93,39 @@ class MonthDataFetcher(BaseCrawler):
         """获取分类数据"""
         from src.crawler.classify_monitor import ClassifyMonitor
 
-        async with ClassifyMonitor() as monitor:
-            return await monitor.get_classify_data()
+        # 只读本地文件，无需 HTTP 客户端
+        return await ClassifyMonitor().get_classify_data()
 
-    async def _fetch_month_data(self, month: str) -> Dict[str, Any]:
-        """获取指定月份的数据"""
+    async def _fetch_month_data(self, month: str, refresh: bool = False) -> Dict[str, Any]:
+        """获取指定月份的数据，结果中的 new_items / changed_items 为相对本地旧列表新增 / 条目有变化（如 modified_time）的内容项；
+        同一月份正在抓取时等待其结果"""
+        refresh = refresh or self.revalidate
+        return await self._inflight.do(month, lambda: self._fetch_and_save(month, refresh), fresh=refresh)
+
+    async def _fetch_and_save(self, month: str, refresh: bool) -> Dict[str, Any]:
         try:
             file_path = self.month_data_dir / f"{month}.json"
 
             # 检查本地文件是否已存在且有效
-            if file_path.exists():
-                # 尝试读取现有数据
-                existing_data = await self._load_json(file_path)
-                if existing_data and len(existing_data) > 0:
-                    crawler_logger.debug(f"月份 {month} 数据已存在，跳过下载")
-                    # 解析内容项
-                    content_items = self._parse_content_items(existing_data)
-                    return {
-                        "success": True,
-                        "month": month,
-                        "item_count": len(content_items),
-                        "items": content_items,
-                        "skipped": True
-                    }
-
-            # 文件不存在或无效，重新下载
+            existing_data = await self._load_json(file_path) if file_path.exists() else None
+            if existing_data and len(existing_data) > 0 and not refresh:
+                crawler_logger.debug(f"月份 {month} 数据已存在，跳过下载")
+                if not self.index.has_month(month):
+                    self.index.replace_month(month, existing_data)
+                return self._month_result(month, existing_data, skipped=True)
+
+            # 文件不存在或需要重新校验
             crawler_logger.debug(f"下载月份数据: {month}")
             url = f"{self.base_url}/classify/?month={month}"
-            data = await self.http_client.get(url)
+            data = await self.http_client.get(url, conditional=True)
+
+            if data is NOT_MODIFIED:
+                if existing_data:
+                    crawler_logger.debug(f"月份 {month} 数据未修改（304）")
+                    # 列表未变化，仍交出本地尚未完整抓取的内容项（如上次抓取失败的）
+                    known = {(i.get("type"), i.get("id")): i for i in existing_data if isinstance(i, dict)}
+                    return self._month_result(month, existing_data, skipped=True, known=known, not_modified=True)
+                data = await self.http_client.get(url)
 
             if not data:
                 return {"success": False, "error": "获取数据为空"}
@@ -110,15 +134,9 @@ class MonthDataFetcher(BaseCrawler):
             success = await self._save_json(data, file_path)
 
             if success:
-                # 解析内容项
-                content_items = self._parse_content_items(data)
-                return {
-                    "success": True,
-                    "month": month,
-                    "item_count": len(content_items),
-                    "items": content_items,
-                    "skipped": False
-                }
+                self.index.replace_month(month, data)
+                known = {(i.get("type"), i.get("id")): i for i in existing_data or [] if isinstance(i, dict)}
+                return self._month_result(month, data, skipped=False, known=known)
             else:
                 return {"success": False, "error": "保存数据失败"}
 
@@ -126,12 +144,48 @@ class MonthDataFetcher(BaseCrawler):
             crawler_logger.error(f"获取月份 {month} 数据失败: {e}")
             return {"success": False, "error": str(e)}
 
-    def _parse_content_items(self, data: List[Dict[str, Any]]) -> List[ContentItem]:
+    def _month_result(
+        self, month: str, data: List[Dict[str, Any]], skipped: bool,
+        known: Optional[Dict[tuple, Dict[str, Any]]] = None, **extra: Any
+    ) -> Dict[str, Any]:
+        """构造单个月份的结果：只保留计数与新增 / 有变化的内容项（known 为本地旧列表中的条目），不持有整月列表
+
+        新增项包括旧列表中没有的，以及索引中没有完整记录的（月份文件已被覆盖但内容抓取失败时，下次仍会重新抓取）。
+        """
+        entries = [i for i in data if isinstance(i, dict)]
+        new_items: List[ItemRecord] = []
+        changed_items: List[ItemRecord] = []
+        if known is not None:
+            fresh: List[Dict[str, Any]] = []
+            changed: List[Dict[str, Any]] = []
+            for entry in entries:
+                old = known.get((entry.get("type"), entry.get("id")))
+                if old is None or not self._indexed(entry):
+                    fresh.append(entry)
+                elif old != entry:
+                    changed.append(entry)
+            new_items = self._parse_content_items(fresh)
+            changed_items = self._parse_content_items(changed)
+        return {
+            "success": True,
+            "month": month,
+            "item_count": len(entries),
+            "skipped": skipped,
+            "new_items": new_items,
+            "changed_items": changed_items,
+            **extra,
+        }
+
+    def _indexed(self, entry: Dict[str, Any]) -> bool:
+        type_, id_ = entry.get("type"), entry.get("id")
+        return isinstance(type_, str) and isinstance(id_, int) and self.index.is_complete(type_, id_)
+
+    def _parse_content_items(self, data: Iterable[Dict[str, Any]]) -> List[ItemRecord]:
         """解析内容项"""
         items = []
         for item_data in data:
             try:
-                item = ContentItem(**item_data)
+                item = ItemRecord.from_dict(item_data)
                 items.append(item)
             except Exception as e:
                 crawler_logger.warning(f"解析内容项失败: {item_data} - 错误: {e}")
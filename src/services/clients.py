@@ -0,0 +1,51 @@
+import asyncio
+from typing import Optional
+
+from src.utils.http_client import AsyncHTTPClient, LocalHTTPClient, AbstractHTTPClient
+from src.utils.logger import crawler_logger
+
+
+class ClientRegistry:
+    """进程内共享的 HTTP 客户端
+
+    在线客户端（连接池、TLS 会话、限流状态）在应用启动时创建并在所有 API 请求与监控循环间复用，
+    应用关闭时统一释放；未经 start() 时在首次使用时按需创建。
+    """
+
+    def __init__(self) -> None:
+        self._online: Optional[AsyncHTTPClient] = None
+        self._offline: Optional[LocalHTTPClient] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        await self.get(offline=False)
+
+    async def get(self, offline: bool = False) -> AbstractHTTPClient:
+        if offline:
+            if self._offline is None:
+                self._offline = LocalHTTPClient()
+                await self._offline.__aenter__()
+            return self._offline
+
+        if self._online is None:
+            async with self._lock:
+                if self._online is None:
+                    client = AsyncHTTPClient()
+                    await client.__aenter__()
+                    self._online = client
+                    crawler_logger.info("共享 HTTP 客户端已创建")
+        return self._online
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._online is not None:
+                await self._online.__aexit__(None, None, None)
+                self._online = None
+                crawler_logger.info("共享 HTTP 客户端已关闭")
+            if self._offline is not None:
+                await self._offline.__aexit__(None, None, None)
+                self._offline = None
+
+
+# module-level singleton
+client_registry = ClientRegistry()
@@ -0,0 +1,116 @@
+"""
+抓取协调：进程内同一时间最多运行一个流水线，监控循环与 /crawl/run 的并发请求附加到正在运行的流水线
+
+同一内容/月份的并发抓取由 ContentFetcher / MonthDataFetcher 内的单飞合并，
+/crawl/item 的请求以高优先级排队等待 HTTP 并发额度。
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.crawler.content_fetcher import ContentFetcher
+from src.services.pipeline import run_pipeline
+from src.utils.http_client import AbstractHTTPClient
+from src.utils.logger import crawler_logger
+from src.utils.metrics import COALESCED
+from src.utils.models import ItemRecord
+from src.utils.rate_limit import PRIORITY_HIGH, prioritized
+
+
+# 这些选项为 True 的运行覆盖为 False 的请求（例如全量运行覆盖增量请求）
+COVERING_FLAGS = ("full", "refresh_stale", "revalidate", "crawl_content")
+DEFAULT_PARAMS = {
+    "full": False, "refresh_stale": False, "revalidate": False, "crawl_content": True, "resume": False, "hot_months": 0,
+}
+
+
+class CrawlCoordinator:
+    def __init__(self) -> None:
+        self._task: Optional["asyncio.Task[Dict[str, Any]]"] = None
+        self._params: Dict[str, Any] = {}
+        self._waiters = 0
+        self._item_listeners: List[Callable[[str, Dict[str, Any], float], None]] = []
+        self._stage_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def status(self) -> Dict[str, Any]:
+        return {"running": self.running, "params": self._params if self.running else None, "waiters": self._waiters}
+
+    async def run_pipeline(
+        self,
+        client: AbstractHTTPClient,
+        on_item: Optional[Callable[[str, Dict[str, Any], float], None]] = None,
+        on_stage: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        **params: Any,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """运行流水线，返回 (结果, 是否附加到已在运行的流水线)
+
+        已有流水线在运行且其选项覆盖本次请求时直接等待其结果；不能覆盖时（如运行中的是增量、请求的是全量）
+        先等它结束再启动新的运行。on_item / on_stage 在等待期间接收正在运行的流水线的回调。
+        """
+        params = {**DEFAULT_PARAMS, **params}
+        attached = False
+        while self.running:
+            if self.covers(self._params, params):
+                attached = True
+                COALESCED.inc(kind="pipeline")
+                crawler_logger.info(f"流水线正在运行，附加到当前运行: {self._params}")
+                break
+            crawler_logger.info(f"流水线正在运行且不满足本次请求，等待其结束: {params}")
+            await asyncio.gather(asyncio.shield(self._task), return_exceptions=True)  # type: ignore[arg-type]
+        if not attached:
+            self._params = params
+            self._task = asyncio.create_task(
+                run_pipeline(client, **params, on_item=self._emit_item, on_stage=self._emit_stage)
+            )
+
+        task = self._task
+        assert task is not None
+        if on_item is not None:
+            self._item_listeners.append(on_item)
+        if on_stage is not None:
+            self._stage_listeners.append(on_stage)
+        self._waiters += 1
+        try:
+            return await asyncio.shield(task), attached
+        except asyncio.CancelledError:
+            # 所有等待方都取消后才取消流水线本身
+            if self._waiters == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters -= 1
+            if on_item is not None:
+                self._item_listeners.remove(on_item)
+            if on_stage is not None:
+                self._stage_listeners.remove(on_stage)
+
+    async def fetch_item(self, client: AbstractHTTPClient, item: ItemRecord, force: bool = False) -> Dict[str, Any]:
+        """高优先级抓取单个内容：排在流水线的普通请求之前获得并发额度"""
+        fetcher = ContentFetcher()
+        fetcher.http_client = client
+        with prioritized(PRIORITY_HIGH):
+            return await fetcher._fetch_content_detail(item, force=force)
+
+    @staticmethod
+    def covers(running: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
+        """以 running 选项运行的流水线能否代替以 wanted 选项的请求（未给出的选项取默认值）"""
+        running, wanted = {**DEFAULT_PARAMS, **running}, {**DEFAULT_PARAMS, **wanted}
+        # 热点刷新只处理最近的月份，与普通运行互不覆盖
+        if running.get("hot_months") != wanted.get("hot_months"):
+            return False
+        return all(running.get(flag) or not wanted.get(flag) for flag in COVERING_FLAGS)
+
+    def _emit_item(self, key: str, result: Dict[str, Any], elapsed: float) -> None:
+        for listener in list(self._item_listeners):
+            listener(key, result, elapsed)
+
+    def _emit_stage(self, stage: str, info: Dict[str, Any]) -> None:
+        for listener in list(self._stage_listeners):
+            listener(stage, info)
+
+
+# module-level singleton
+crawl_coordinator = CrawlCoordinator()
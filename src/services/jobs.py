@@ -0,0 +1,214 @@
+"""
+后台抓取任务：/crawl/run 立即返回任务 ID，进度以事件流推送，结束后只保留紧凑摘要与失败项
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from config.settings import JOB_EVENT_BUFFER, JOB_HISTORY_LIMIT
+from src.services.coordinator import crawl_coordinator
+from src.services.pipeline import compact_result
+from src.utils.http_client import AbstractHTTPClient
+from src.utils.logger import crawler_logger
+
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+PROGRESS_INTERVAL = 0.5  # 进度事件最小间隔（秒）
+
+
+@dataclass
+class JobProgress:
+    stage: Optional[str] = None
+    total: Optional[int] = None  # 增量抓取时已知；全量遍历时为 None
+    done: int = 0
+    fetched: int = 0
+    refreshed: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+class CrawlJob:
+    """一次后台抓取；事件保存在有界缓冲区中，供多个订阅方按序号读取"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = "pending"
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.progress = JobProgress()
+        self.summary: Optional[Dict[str, Any]] = None
+        self.failures: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=JOB_EVENT_BUFFER)
+        self._seq = 0
+        self._changed = asyncio.Event()
+        self._last_progress = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": asdict(self.progress),
+            "summary": self.summary,
+            "error": self.error,
+            "failed_count": len(self.failures),
+            "events_url": f"/crawl/jobs/{self.id}/events",
+        }
+
+    # ---- 事件 ----
+
+    def publish(self, event: str, **data: Any) -> None:
+        self._seq += 1
+        self._events.append({"seq": self._seq, "event": event, "ts": datetime.now().isoformat(), **data})
+        # 唤醒当前所有等待者，后续等待者使用新的 Event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def events(self, since: int = 0, heartbeat: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """产出序号大于 since 的事件，任务结束后停止
+
+        订阅方落后超出缓冲区时先收到一次进度快照；heartbeat 秒内无新事件时产出 heartbeat 事件。
+        """
+        cursor = since
+        while True:
+            waiter = self._changed
+            if self._events and cursor < self._events[0]["seq"] - 1:
+                cursor = self._events[0]["seq"] - 1
+                yield {"seq": cursor, "event": "progress", "status": self.status, **asdict(self.progress)}
+            for event in list(self._events):
+                if event["seq"] > cursor:
+                    cursor = event["seq"]
+                    yield event
+            if self.finished and cursor >= self._seq:
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield {"seq": cursor, "event": "heartbeat"}
+
+    # ---- 流水线回调 ----
+
+    def on_stage(self, stage: str, info: Dict[str, Any]) -> None:
+        self.progress.stage = stage
+        if stage == "content":
+            self.progress.total = info.get("items")
+        self.publish("stage", stage=stage, **info)
+
+    def on_item(self, key: str, result: Dict[str, Any], elapsed: float) -> None:
+        progress = self.progress
+        progress.done += 1
+        if not result.get("success"):
+            progress.failed += 1
+            self.publish("failure", key=key, error=result.get("error"))
+        elif result.get("skipped"):
+            progress.skipped += 1
+        elif result.get("refreshed"):
+            progress.refreshed += 1
+        else:
+            progress.fetched += 1
+
+        now = time.monotonic()
+        if now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.publish("progress", **asdict(progress))
+
+
+class JobManager:
+    """后台抓取任务；未结束任务的选项覆盖新请求时返回该任务，否则新建任务，由抓取协调器排在正在运行的流水线之后"""
+
+    def __init__(self) -> None:
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def submit(self, client: AbstractHTTPClient, **params: Any) -> Tuple[CrawlJob, bool]:
+        """提交抓取任务，返回 (任务, 是否附加到已有的任务)"""
+        async with self._lock:
+            for active in self._jobs.values():
+                if not active.finished and crawl_coordinator.covers(active.params, params):
+                    return active, True
+            job = CrawlJob(params)
+            self._jobs[job.id] = job
+            self._prune()
+            job.task = asyncio.create_task(self._run(job, client))
+            job.task.add_done_callback(lambda _: self._ensure_finished(job))
+            crawler_logger.info(f"抓取任务 {job.id} 已创建: {params}")
+            return job, False
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    async def cancel(self, job_id: str) -> Optional[CrawlJob]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        return job
+
+    @staticmethod
+    def _ensure_finished(job: CrawlJob) -> None:
+        """任务在开始执行前被取消时 _run 没有机会记录结束状态，在此补上（先于其他等待者的回调执行）"""
+        if job.finished:
+            return
+        job.status = "cancelled"
+        job.finished_at = datetime.now().isoformat()
+        job.publish("done", status=job.status, summary=job.summary, error=job.error, failed_count=len(job.failures))
+
+    async def shutdown(self) -> None:
+        for job_id in [job_id for job_id, job in self._jobs.items() if not job.finished]:
+            await self.cancel(job_id)
+
+    async def _run(self, job: CrawlJob, client: AbstractHTTPClient) -> None:
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        job.publish("status", status=job.status)
+        try:
+            result, attached = await crawl_coordinator.run_pipeline(
+                client, on_item=job.on_item, on_stage=job.on_stage, **job.params
+            )
+            result = {**result, "http": client.stats()}
+            job.summary, job.failures = compact_result(result)
+            # attached: 提交时监控循环的流水线正在运行，本任务等待并共享了其结果
+            job.summary["attached"] = attached
+            job.status = "succeeded" if result.get("success") else "failed"
+            job.error = result.get("error")
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            crawler_logger.error(f"抓取任务 {job.id} 异常: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            job.publish("progress", **asdict(job.progress))
+            job.publish("done", status=job.status, summary=job.summary, error=job.error,
+                        failed_count=len(job.failures))
+            crawler_logger.info(f"抓取任务 {job.id} 结束: {job.status}")
+
+    def _prune(self) -> None:
+        """只保留最近 JOB_HISTORY_LIMIT 个已结束的任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self._jobs[job_id]
+
+
+# module-level singleton
+job_manager = JobManager()
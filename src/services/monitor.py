@@ -1,108 +1,417 @@
+"""
+定时监控：多个相互独立的任务，各自按自己的节奏运行
+
+任务种类：
+  pipeline  分类监控 + 增量抓取（默认任务 "default"，即原来的监控循环）
+  classify  只检查分类接口是否变化，不保存；检测到变化时立即唤醒 pipeline 任务
+  hot_months  只刷新最近几个月份的列表并抓取新增内容（默认任务 "hot"，间隔短，请求量小）
+  verify    定时校验本地数据（不自适应）
+
+每个任务的下一次运行时间由 AdaptiveSchedule 计算（固定速率、补偿漂移、按有无变化自适应、加抖动）。
+"""
 import asyncio
+import time
 from dataclasses import dataclass, asdict
-from datetime import datetime
-from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
 
-from src.crawler.classify_monitor import ClassifyMonitor
-from src.crawler.month_data_fetcher import MonthDataFetcher
-from src.crawler.content_fetcher import ContentFetcher
-from src.utils.http_client import AsyncHTTPClient, LocalHTTPClient, AbstractHTTPClient
+from src.services.clients import client_registry
+from src.services.coordinator import crawl_coordinator
+from src.services.pipeline import compact_result
+from src.services.scheduler import AdaptiveSchedule, Cadence
+from src.utils.http_client import AbstractHTTPClient
 from src.utils.logger import crawler_logger
-from config.settings import MONITOR_DEFAULT_INTERVAL
+from src.utils.metrics import MONITOR_CURRENT_INTERVAL, MONITOR_CYCLES, MONITOR_LAST_CYCLE, MONITOR_NEXT_RUN
+from config.settings import HOT_MONTHS, HOT_MONTHS_INTERVAL, MONITOR_DEFAULT_INTERVAL, VERIFY_JOB_INTERVAL
+
+
+JOB_KINDS = ("pipeline", "classify", "verify", "hot_months")
+DEFAULT_JOB = "default"
+HOT_JOB = "hot"
+
+# 运行结果：(是否检测到变化，出错时为 None；紧凑摘要；是否成功)
+JobOutcome = Tuple[Optional[bool], Dict[str, Any], bool]
 
 
 @dataclass
-class MonitorState:
-    running: bool = False
-    interval_seconds: int = MONITOR_DEFAULT_INTERVAL
-    offline: bool = False
-    crawl_on_update: bool = True
-    cycles: int = 0
+class JobState:
+    runs: int = 0
+    changes: int = 0
     last_run_started: Optional[str] = None
     last_run_finished: Optional[str] = None
+    last_changed: Optional[str] = None
     last_result: Optional[Dict[str, Any]] = None
 
 
+def _delay_until(start_at: str) -> float:
+    """距离下一个本地时间 "HH:MM" 的秒数"""
+    hour, minute = (int(part) for part in start_at.split(":"))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def _cadence(kind: str, interval_seconds: Optional[float], adaptive: Optional[bool], start_at: Optional[str] = None) -> Cadence:
+    """按任务类型补全默认节奏"""
+    options: Dict[str, Any] = {}
+    if kind == "verify":
+        interval_seconds = VERIFY_JOB_INTERVAL if interval_seconds is None else interval_seconds
+        adaptive = False if adaptive is None else adaptive
+    elif kind == "hot_months":
+        interval_seconds = HOT_MONTHS_INTERVAL if interval_seconds is None else interval_seconds
+        # 退避不超过常规监控间隔，否则不如按分类变化抓取及时
+        options["max_interval"] = MONITOR_DEFAULT_INTERVAL
+    if start_at:
+        # 指定了运行时间点的任务不加抖动
+        options["jitter"] = 0.0
+    return Cadence(
+        interval=MONITOR_DEFAULT_INTERVAL if interval_seconds is None else interval_seconds,
+        adaptive=True if adaptive is None else adaptive,
+        **options,
+    )
+
+
+class WatchJob:
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        cadence: Cadence,
+        offline: bool = False,
+        crawl_on_update: bool = True,
+        start_at: Optional[str] = None,
+        hot_months: int = HOT_MONTHS,
+    ):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}（可选 {', '.join(JOB_KINDS)}）")
+        if start_at is not None:
+            _delay_until(start_at)  # 格式校验
+        self.name = name
+        self.kind = kind
+        self.offline = offline
+        self.crawl_on_update = crawl_on_update
+        # hot_months 任务刷新的最近月份数
+        self.hot_months = hot_months
+        # 第一次运行的本地时间 "HH:MM"；为空时启动后立即运行
+        self.start_at = start_at
+        self.schedule = AdaptiveSchedule(cadence)
+        self.state = JobState()
+        self.task: Optional[asyncio.Task] = None
+        self.busy = False
+        # 唤醒等待中的任务：run_requested 为 True 时立即运行，否则只重新计算等待时间
+        self.wake = asyncio.Event()
+        self.run_requested = False
+        # classify 任务上一次检测到的（未保存的）差异，同一变化只触发一次
+        self.last_delta: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def poke(self, run: bool) -> None:
+        self.run_requested = self.run_requested or run
+        self.wake.set()
+
+    def status(self) -> Dict[str, Any]:
+        next_run = None
+        if self.running and not self.busy:
+            next_run = datetime.fromtimestamp(self.schedule.next_run_timestamp()).isoformat()
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "running": self.running,
+            "busy": self.busy,
+            "offline": self.offline,
+            "crawl_on_update": self.crawl_on_update,
+            "hot_months": self.hot_months if self.kind == "hot_months" else None,
+            "start_at": self.start_at,
+            "cadence": self.schedule.cadence.to_dict(),
+            **self.schedule.status(),
+            "next_run": next_run,
+            **asdict(self.state),
+        }
+
+
 class MonitorManager:
     def __init__(self) -> None:
-        self._state = MonitorState()
-        self._task: Optional[asyncio.Task] = None
+        self._jobs: Dict[str, WatchJob] = {}
+        self._running = False
         self._lock = asyncio.Lock()
 
-    def _make_client(self) -> AbstractHTTPClient:
-        return LocalHTTPClient() if self._state.offline else AsyncHTTPClient()
+    async def _get_client(self, offline: bool) -> AbstractHTTPClient:
+        return await client_registry.get(offline)
 
-    async def start(self, interval_seconds: int = MONITOR_DEFAULT_INTERVAL, offline: bool = False, crawl_on_update: bool = True) -> Dict[str, Any]:
+    async def start(
+        self,
+        interval_seconds: int = MONITOR_DEFAULT_INTERVAL,
+        offline: bool = False,
+        crawl_on_update: bool = True,
+        adaptive: bool = True,
+        hot_months: int = HOT_MONTHS,
+    ) -> Dict[str, Any]:
+        """启动监控：创建或更新默认任务（hot_months>0 时同时创建热点刷新任务 "hot"），并启动所有已定义的任务"""
         async with self._lock:
-            self._state.interval_seconds = max(1, int(interval_seconds))
-            self._state.offline = bool(offline)
-            self._state.crawl_on_update = bool(crawl_on_update)
+            cadence = Cadence(interval=interval_seconds, adaptive=adaptive)
+            job = self._jobs.get(DEFAULT_JOB)
+            if job is None:
+                self._jobs[DEFAULT_JOB] = WatchJob(DEFAULT_JOB, "pipeline", cadence, offline, crawl_on_update)
+            else:
+                job.offline = bool(offline)
+                job.crawl_on_update = bool(crawl_on_update)
+                self._reschedule(job, cadence)
 
-            if self._state.running and self._task and not self._task.done():
-                return self.status()
+            hot = self._jobs.get(HOT_JOB)
+            if hot_months > 0:
+                if hot is None:
+                    self._jobs[HOT_JOB] = WatchJob(
+                        HOT_JOB, "hot_months", _cadence("hot_months", None, None), offline, hot_months=hot_months
+                    )
+                else:
+                    hot.offline = bool(offline)
+                    hot.hot_months = hot_months
+            elif hot is not None:
+                if hot.task:
+                    hot.task.cancel()
+                del self._jobs[HOT_JOB]
 
-            self._state.running = True
-            self._task = asyncio.create_task(self._loop())
-            crawler_logger.info(f"监控已启动，间隔 {self._state.interval_seconds}s，offline={self._state.offline}, crawl_on_update={self._state.crawl_on_update}")
+            self._running = True
+            for job in self._jobs.values():
+                self._start_job(job)
+            crawler_logger.info(
+                f"监控已启动，间隔 {cadence.interval:g}s，adaptive={adaptive}, offline={offline}, "
+                f"crawl_on_update={crawl_on_update}，任务: {', '.join(self._jobs)}"
+            )
             return self.status()
 
     async def stop(self) -> Dict[str, Any]:
         async with self._lock:
-            self._state.running = False
-            if self._task:
-                self._task.cancel()
+            self._running = False
+            tasks = [job.task for job in self._jobs.values() if job.running]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             crawler_logger.info("监控已停止")
             return self.status()
 
-    async def set_interval(self, interval_seconds: int) -> Dict[str, Any]:
+    async def set_interval(self, interval_seconds: int, name: str = DEFAULT_JOB) -> Dict[str, Any]:
+        async with self._lock:
+            job = self._get_job(name)
+            cadence = Cadence(**{**job.schedule.cadence.to_dict(), "interval": interval_seconds})
+            self._reschedule(job, cadence)
+            crawler_logger.info(f"监控任务 {name} 间隔更新为 {cadence.interval:g}s")
+            return self.status()
+
+    async def add_job(
+        self,
+        name: str,
+        kind: str,
+        interval_seconds: Optional[float] = None,
+        adaptive: Optional[bool] = None,
+        offline: bool = False,
+        crawl_on_update: bool = True,
+        start_at: Optional[str] = None,
+        hot_months: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """添加或替换任务；监控运行中时立即启动"""
+        async with self._lock:
+            cadence = _cadence(kind, interval_seconds, adaptive, start_at)
+            job = WatchJob(
+                name, kind, cadence, offline, crawl_on_update, start_at,
+                hot_months=HOT_MONTHS if hot_months is None else hot_months,
+            )
+            previous = self._jobs.get(name)
+            if previous is not None and previous.task:
+                previous.task.cancel()
+            self._jobs[name] = job
+            if self._running:
+                self._start_job(job)
+            crawler_logger.info(f"监控任务已添加: {name}（{kind}，间隔 {job.schedule.cadence.interval:g}s）")
+            return job.status()
+
+    async def remove_job(self, name: str) -> Dict[str, Any]:
         async with self._lock:
-            self._state.interval_seconds = max(1, int(interval_seconds))
-            crawler_logger.info(f"监控间隔更新为 {self._state.interval_seconds}s")
+            job = self._get_job(name)
+            if job.task:
+                job.task.cancel()
+            del self._jobs[name]
+            crawler_logger.info(f"监控任务已删除: {name}")
             return self.status()
 
+    async def run_job(self, name: str) -> Dict[str, Any]:
+        """让任务立即运行一次（监控未运行时不生效）"""
+        job = self._get_job(name)
+        job.poke(run=True)
+        return job.status()
+
     def status(self) -> Dict[str, Any]:
-        return asdict(self._state)
+        default = self._jobs.get(DEFAULT_JOB)
+        state = default.state if default else JobState()
+        legacy = {
+            "running": self._running,
+            "interval_seconds": default.schedule.cadence.interval if default else MONITOR_DEFAULT_INTERVAL,
+            "offline": default.offline if default else False,
+            "crawl_on_update": default.crawl_on_update if default else True,
+            "cycles": state.runs,
+            "last_run_started": state.last_run_started,
+            "last_run_finished": state.last_run_finished,
+            "last_result": state.last_result,
+        }
+        return {
+            **legacy,
+            "jobs": {name: job.status() for name, job in self._jobs.items()},
+            "pipeline": crawl_coordinator.status(),
+        }
+
+    def _get_job(self, name: str) -> WatchJob:
+        job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        return job
 
-    async def _loop(self) -> None:
+    def _start_job(self, job: WatchJob) -> None:
+        if job.running:
+            return
+        job.schedule.start(_delay_until(job.start_at) if job.start_at else 0.0)
+        job.task = asyncio.create_task(self._job_loop(job))
+
+    def _reschedule(self, job: WatchJob, cadence: Cadence) -> None:
+        job.schedule.reschedule(cadence)
+        self._publish_schedule(job)
+        job.poke(run=False)
+
+    def _publish_schedule(self, job: WatchJob) -> None:
+        MONITOR_NEXT_RUN.set(job.schedule.next_run_timestamp(), job=job.name)
+        MONITOR_CURRENT_INTERVAL.set(job.schedule.current_interval, job=job.name)
+
+    async def _job_loop(self, job: WatchJob) -> None:
         try:
-            while self._state.running:
-                self._state.last_run_started = datetime.now().isoformat()
-                try:
-                    # 正确管理 HTTP 客户端生命周期
-                    async with self._make_client() as client:
-                        # 分类监控
-                        monitor = ClassifyMonitor()
-                        monitor.http_client = client
-                        classify_result = await monitor.crawl()
-                        updated = bool(classify_result.data and classify_result.data.get("updated"))
-
-                        months_result = None
-                        content_result = None
-                        if updated and self._state.crawl_on_update:
-                            # 月份数据
-                            mf = MonthDataFetcher(); mf.http_client = client
-                            months_result = await mf.crawl()
-                            # 内容详情
-                            cf = ContentFetcher(); cf.http_client = client
-                            content_result = await cf.crawl()
-
-                        self._state.last_result = {
-                            "classify": classify_result.model_dump() if hasattr(classify_result, "model_dump") else classify_result,
-                            "months": months_result.model_dump() if months_result and hasattr(months_result, "model_dump") else (months_result and months_result.__dict__),
-                            "content": content_result.model_dump() if content_result and hasattr(content_result, "model_dump") else (content_result and content_result.__dict__),
-                        }
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    crawler_logger.error(f"监控循环异常: {e}")
-                    self._state.last_result = {"error": str(e)}
-                finally:
-                    self._state.last_run_finished = datetime.now().isoformat()
-                    self._state.cycles += 1
-
-                await asyncio.sleep(self._state.interval_seconds)
+            while True:
+                self._publish_schedule(job)
+                await self._wait_until_due(job)
+                await self._run_job(job)
+        except asyncio.CancelledError:
+            pass
+
+    async def _wait_until_due(self, job: WatchJob) -> None:
+        while True:
+            delay = job.schedule.seconds_until_due()
+            if delay <= 0:
+                return
+            # 不用 wait_for：唤醒与取消同时发生时它会吞掉取消
+            waiter = asyncio.ensure_future(job.wake.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=delay)
+            finally:
+                waiter.cancel()
+            if not job.wake.is_set():
+                continue
+            job.wake.clear()
+            if job.run_requested:
+                job.run_requested = False
+                job.schedule.run_now()
+                return
+            # 节奏已更新：按新的计划时间重新等待
+
+    async def _run_job(self, job: WatchJob) -> None:
+        job.busy = True
+        job.state.last_run_started = datetime.now().isoformat()
+        changed: Optional[bool] = None
+        try:
+            runner = {
+                "pipeline": self._run_pipeline,
+                "hot_months": self._run_pipeline,
+                "classify": self._run_classify,
+                "verify": self._run_verify,
+            }[job.kind]
+            changed, job.state.last_result, ok = await runner(job)
+            MONITOR_CYCLES.inc(job=job.name, result="success" if ok else "failed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            crawler_logger.error(f"监控任务 {job.name} 异常: {e}")
+            job.state.last_result = {"error": str(e)}
+            MONITOR_CYCLES.inc(job=job.name, result="error")
         finally:
-            self._state.running = False
+            job.busy = False
+            job.state.last_run_finished = datetime.now().isoformat()
+            job.state.runs += 1
+            MONITOR_LAST_CYCLE.set(time.time(), job=job.name)
+        if changed:
+            job.state.changes += 1
+            job.state.last_changed = job.state.last_run_finished
+        job.schedule.record(changed)
+
+    async def _run_pipeline(self, job: WatchJob) -> JobOutcome:
+        # 复用共享 HTTP 客户端（生命周期由应用管理）
+        client = await self._get_client(job.offline)
+        # 分类监控 + 按月度计数差异增量抓取；hot_months 任务只刷新最近的月份
+        # 已有抓取任务在运行时附加到该运行，不重复抓取
+        if job.kind == "hot_months":
+            result, _ = await crawl_coordinator.run_pipeline(client, hot_months=job.hot_months)
+        else:
+            result, _ = await crawl_coordinator.run_pipeline(client, crawl_content=job.crawl_on_update)
+        result = {**result, "http": client.stats()}
+        # 只保留紧凑摘要，避免状态中常驻逐项结果
+        summary, _ = compact_result(result)
+        ok = bool(result.get("success"))
+        if not ok:
+            return None, summary, ok
+        if job.kind == "hot_months":
+            return bool((summary.get("plan") or {}).get("item_count")), summary, ok
+        # 只检测不抓取时快照不提交，同一变化每次都会报告，与上次相同的不再算作变化
+        classify = (result.get("classify") or {}).get("data") or {}
+        delta = classify.get("delta") if classify.get("updated") else None
+        changed = delta is not None and (job.crawl_on_update or delta != job.last_delta)
+        job.last_delta = delta
+        return changed, summary, ok
+
+    async def _run_classify(self, job: WatchJob) -> JobOutcome:
+        from src.crawler.classify_monitor import ClassifyMonitor
+
+        monitor = ClassifyMonitor()
+        monitor.http_client = await self._get_client(job.offline)
+        # 只检测不保存：变化由 pipeline 任务保存并抓取
+        monitor.save = False
+        result = await monitor.crawl()
+        if not result.success:
+            return None, {"success": False, "error": result.error}, False
+
+        data = result.data or {}
+        delta = data.get("delta") if data.get("updated") else None
+        changed = delta is not None and delta != job.last_delta
+        job.last_delta = delta
+        triggered = []
+        if changed:
+            for other in self._jobs.values():
+                if other.kind == "pipeline" and other.running:
+                    other.poke(run=True)
+                    triggered.append(other.name)
+            crawler_logger.info(f"监控任务 {job.name} 检测到分类变化，触发: {', '.join(triggered) or '无'}")
+        summary = {
+            "success": True,
+            "updated": bool(data.get("updated")),
+            "not_modified": data.get("not_modified", False),
+            "delta": delta,
+            "triggered": triggered,
+        }
+        return changed, summary, True
+
+    async def _run_verify(self, job: WatchJob) -> JobOutcome:
+        from src.services.verification import Verifier
+
+        outcome = await asyncio.to_thread(Verifier().verify)
+        summary = {
+            "ok": outcome["ok"],
+            "classify": outcome["classify"],
+            "missing_months": len(outcome["months"]["missing"]),
+            "content_ok": outcome["content"]["ok"],
+            "items": {k: v for k, v in outcome["items"].items() if k != "issues"},
+        }
+        if not outcome["ok"]:
+            crawler_logger.warning(f"监控任务 {job.name} 校验未通过: {summary}")
+        return False, summary, outcome["ok"]
 
 
 # module-level singleton
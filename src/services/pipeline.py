@@ -0,0 +1,436 @@
+"""
+抓取流水线：分类 → 月份 → 内容，按增量计划只处理有变化的部分
+
+每次运行都写入抓取日志（data/crawl_journal.jsonl），进程中断后可用 resume=True 从中断处继续。
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from config.settings import MONTH_DATA_DIR
+from src.crawler.classify_monitor import ClassifyMonitor
+from src.crawler.month_data_fetcher import MonthDataFetcher
+from src.crawler.content_fetcher import ContentFetcher
+from src.services.planner import plan_from_delta, plan_hot_months
+from src.utils.classify_state import ClassifyDelta
+from src.utils.crawl_journal import CrawlJournal, JournalRun
+from src.utils.http_client import AbstractHTTPClient
+from src.utils.logger import crawler_logger
+from src.utils.metrics import STAGE_DURATION
+from src.utils.models import CrawlResult, ItemRecord
+
+
+# 替代默认内容阶段的执行器（如分片抓取），参数为待抓取内容项（None 表示全部）与其中需要按 modified_time 检查的内容项
+ContentRunner = Callable[[Optional[List[ItemRecord]], Set[str]], Awaitable[CrawlResult]]
+
+
+async def run_pipeline(
+    client: AbstractHTTPClient,
+    full: bool = False,
+    revalidate: bool = False,
+    crawl_content: bool = True,
+    refresh_stale: bool = False,
+    resume: bool = False,
+    hot_months: int = 0,
+    on_item: Optional[Callable[[str, Dict[str, Any], float], None]] = None,
+    on_stage: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    content_runner: Optional[ContentRunner] = None,
+) -> Dict[str, Any]:
+    """执行一次抓取流程
+
+    full=True 时处理全部月份与内容（仍遵循本地跳过逻辑），否则按 classify 月度计数差异增量抓取：
+    只抓取刷新的月份列表中新增的内容项，以及条目有变化的内容项（按 modified_time 判断是否重新下载）；
+    分类快照在下游阶段全部完成后才提交，失败或只检查分类时变化保留到下次运行；
+    refresh_stale=True 时检查所有内容的 modified_time，只重新下载过期的内容；
+    resume=True 且上次运行未正常结束时，按抓取日志从中断处继续，而不是开始新的运行；不续跑时新运行接管其未完成的月份与内容项；
+    hot_months>0 时跳过分类监控，只重新请求本地分类数据中最近的 hot_months 个月份（条件请求），抓取其中新增的内容项
+    （忽略 full / refresh_stale）；crawl_content=False 时只执行分类检查；on_item 在每个内容处理完成后回调 (item_key, result, 耗时秒)，
+    on_stage 在每个阶段开始时回调 (阶段名, 附加信息)；content_runner 不为空时由它执行内容阶段。
+    """
+    notify = on_stage or (lambda stage, info: None)
+    journal = CrawlJournal()
+    if resume:
+        run = journal.resume_run()
+        if run is not None:
+            return await _resume_pipeline(client, journal, run, revalidate, on_item, notify, content_runner)
+
+    if hot_months > 0:
+        # 1. 热点刷新：按本地分类数据取最近的月份，不请求分类接口
+        full = refresh_stale = False
+        current = await ClassifyMonitor().get_classify_data() or {}
+        delta = ClassifyDelta()
+        plan = plan_hot_months(current.keys(), hot_months)
+        classify = None
+        monitor: Optional[ClassifyMonitor] = None
+    else:
+        # 1. 分类监控（只检测：快照在下游阶段完成后再提交）
+        notify("classify", {})
+        monitor = ClassifyMonitor()
+        monitor.http_client = client
+        monitor.save = False
+        with STAGE_DURATION.time(stage="classify"):
+            classify_result = await monitor.crawl()
+        if not classify_result.success:
+            return {"success": False, "stage": "classify", "error": classify_result.error}
+
+        current = (classify_result.data or {}).get("data") or {}
+        delta = monitor.delta or ClassifyDelta()
+        plan = plan_from_delta(delta, current.keys(), MONTH_DATA_DIR, full=full)
+        classify = classify_result.model_dump()
+    notify("plan", plan.to_dict())
+    result: Dict[str, Any] = {
+        "success": True,
+        "plan": plan.to_dict(),
+        "classify": classify,
+        "months": None,
+        "content": None,
+    }
+
+    def commit_classify() -> None:
+        if monitor is not None and not delta.is_empty:
+            monitor.detector.commit(current)
+
+    if not crawl_content:
+        return result
+    # 下游阶段读取本地 classify.json，先保存数据；快照仍在全部完成后才提交
+    if monitor is not None and not delta.is_empty and not await monitor.save_data(current):
+        return {**result, "success": False, "stage": "classify", "error": "保存分类数据失败"}
+
+    # 上次运行未正常结束且本次不续跑：接管其未完成的工作，而不是丢弃
+    carried = journal.unfinished_run()
+    carried_months: List[str] = []
+    carried_items: List[Dict[str, Any]] = []
+    if carried is not None:
+        carried_months = carried.outstanding_months
+        carried_items = carried.outstanding_items
+        if carried_months and carried.plan.get("full"):
+            # 全量 / 检查过期的运行没有逐项列表，本次按同样方式遍历全部内容
+            plan.full = True
+            refresh_stale = refresh_stale or bool(carried.plan.get("refresh_stale"))
+            result["plan"] = plan.to_dict()
+        crawler_logger.warning(
+            f"上次运行 {carried.run_id} 未正常结束，并入本次运行: {len(carried_months)} 个月份，{len(carried_items)} 个内容项"
+        )
+
+    if plan.is_empty and not refresh_stale and carried is None:
+        crawler_logger.info("增量计划为空，无需抓取月份与内容")
+        commit_classify()
+        return result
+
+    # 此后中断需要靠日志中的计划续跑（分类快照尚未提交，不续跑时下次运行也会重新计划这些月份）
+    run = journal.begin_run({
+        "full": plan.full or refresh_stale,
+        "months": plan.months_to_fetch,
+        "refresh_stale": refresh_stale,
+        "hot_months": hot_months,
+        **({"carried_from": carried.run_id, "carried_months": carried_months, "carried_items": carried_items}
+           if carried is not None else {}),
+    }, carried)
+    result["run_id"] = run.run_id
+    try:
+        # 2. 月份数据：全量时处理所有月份，增量时只刷新计划中的月份
+        notify("months", {"months": plan.months_to_fetch})
+        months = None if plan.full else plan.months_to_fetch
+        refresh = None if delta.first_run else plan.months_to_fetch
+        if (plan.full or refresh_stale) and content_runner is None:
+            # 3. 全量或检查过期时遍历所有月份：月份就绪后立即开始抓取其内容，两个阶段重叠执行
+            month_result, content_result = await _crawl_months_and_content(
+                client, journal, months, refresh, list(current.keys()), revalidate, refresh_stale, on_item, notify
+            )
+            result["months"] = month_result.model_dump()
+            result["content"] = content_result.model_dump()
+            if not month_result.success:
+                return {**result, "success": False, "stage": "months", "error": month_result.error}
+            if not content_result.success:
+                return {**result, "success": False, "stage": "content", "error": content_result.error}
+            partial = _partial_failure(month_result, content_result)
+            if partial is not None:
+                return {**result, **partial}
+            journal.end_run({"total_items": (content_result.data or {}).get("total_items", 0)})
+            commit_classify()
+            return result
+
+        month_result = await _crawl_months(client, months, refresh, revalidate)
+        result["months"] = month_result.model_dump()
+        if not month_result.success:
+            return {**result, "success": False, "stage": "months", "error": month_result.error}
+
+        # 3. 内容详情：增量时只抓取新增内容项；由 content_runner 执行时（全量）遍历所有月份文件
+        items: Optional[List[ItemRecord]] = None
+        refresh_keys: Set[str] = set()
+        if not (plan.full or refresh_stale):
+            new_items = _collect_items(month_result.data, "new_items")
+            changed_items = _collect_items(month_result.data, "changed_items")
+            items = new_items + changed_items
+            refresh_keys = {i.key for i in changed_items}
+            if carried is not None:
+                items = await _merge_carried(items, refresh_keys, carried_months, carried_items)
+            plan.items = [i.key for i in items]
+            result["plan"] = plan.to_dict()
+            journal.record_items(_item_dicts(items, refresh_keys))
+            crawler_logger.info(
+                f"增量计划: {len(plan.months_to_fetch)} 个月份，{len(new_items)} 个新增、{len(changed_items)} 个有变化的内容项"
+                + (f"，共 {len(items)} 个（含接管的内容项）" if carried is not None else "")
+            )
+
+        notify("content", {"items": len(items) if items is not None else None})
+        if content_runner is not None:
+            with STAGE_DURATION.time(stage="content"):
+                content_result = await content_runner(items, refresh_keys)
+        else:
+            content_result = await _crawl_content(client, journal, items, revalidate, refresh_stale, on_item, refresh_keys)
+        result["content"] = content_result.model_dump()
+        if not content_result.success:
+            return {**result, "success": False, "stage": "content", "error": content_result.error}
+        partial = _partial_failure(month_result, content_result)
+        if partial is not None:
+            return {**result, **partial}
+
+        journal.end_run({"total_items": (content_result.data or {}).get("total_items", 0)})
+        commit_classify()
+        return result
+    finally:
+        journal.close()
+
+
+async def _resume_pipeline(
+    client: AbstractHTTPClient,
+    journal: CrawlJournal,
+    run: JournalRun,
+    revalidate: bool,
+    on_item: Optional[Callable[[str, Dict[str, Any], float], None]],
+    notify: Callable[[str, Dict[str, Any]], None],
+    content_runner: Optional[ContentRunner] = None,
+) -> Dict[str, Any]:
+    """按日志续跑：已确定内容项时直接继续内容阶段，否则重新执行计划中的月份阶段"""
+    plan = run.plan
+    result: Dict[str, Any] = {"success": True, "resumed": True, "run_id": run.run_id, "plan": plan,
+                              "months": None, "content": None}
+    try:
+        items: Optional[List[ItemRecord]] = None
+        refresh_keys: Set[str] = set()
+        month_result: Optional[CrawlResult] = None
+        if run.items is not None:
+            items = [ItemRecord.from_dict(i) for i in run.items]
+            refresh_keys = {f"{i['type']}_{i['id']}" for i in run.items if i.get("refresh")}
+        else:
+            # 中断发生在月份阶段：旧列表可能已被覆盖，无法再求差集，改为抓取这些月份的全部内容项（已完成的会跳过）
+            months = plan.get("months") or []
+            notify("months", {"months": months})
+            month_result = await _crawl_months(client, None if plan.get("full") else months, months, revalidate)
+            result["months"] = month_result.model_dump()
+            if not month_result.success:
+                return {**result, "success": False, "stage": "months", "error": month_result.error}
+            if not plan.get("full"):
+                items = await _merge_carried([], refresh_keys, run.outstanding_months, run.outstanding_items)
+                journal.record_items(_item_dicts(items, refresh_keys))
+
+        notify("content", {"items": len(items) if items is not None else None, "resumed": True})
+        if content_runner is not None:
+            with STAGE_DURATION.time(stage="content"):
+                content_result = await content_runner(items, refresh_keys)
+        else:
+            content_result = await _crawl_content(
+                client, journal, items, revalidate, bool(plan.get("refresh_stale")), on_item, refresh_keys
+            )
+        result["content"] = content_result.model_dump()
+        if not content_result.success:
+            return {**result, "success": False, "stage": "content", "error": content_result.error}
+        partial = _partial_failure(month_result, content_result)
+        if partial is not None:
+            return {**result, **partial}
+
+        journal.end_run({"total_items": (content_result.data or {}).get("total_items", 0)})
+        return result
+    finally:
+        journal.close()
+
+
+async def _crawl_months(client: AbstractHTTPClient, months: Optional[List[str]], refresh: Optional[List[str]], revalidate: bool) -> CrawlResult:
+    month_fetcher = MonthDataFetcher()
+    month_fetcher.http_client = client
+    month_fetcher.revalidate = revalidate
+    with STAGE_DURATION.time(stage="months"):
+        return await month_fetcher.crawl(months=months, refresh=refresh)
+
+
+async def _crawl_content(
+    client: AbstractHTTPClient,
+    journal: CrawlJournal,
+    items: Optional[List[ItemRecord]],
+    revalidate: bool,
+    refresh_stale: bool,
+    on_item: Optional[Callable[[str, Dict[str, Any], float], None]] = None,
+    refresh_keys: Optional[Set[str]] = None,
+) -> CrawlResult:
+    content_fetcher = _content_fetcher(client, journal, revalidate, refresh_stale, on_item)
+    content_fetcher.refresh_keys = set(refresh_keys or ())
+    with STAGE_DURATION.time(stage="content"):
+        return await content_fetcher.crawl(items=items)
+
+
+async def _crawl_months_and_content(
+    client: AbstractHTTPClient,
+    journal: CrawlJournal,
+    months: Optional[List[str]],
+    refresh: Optional[List[str]],
+    all_months: List[str],
+    revalidate: bool,
+    refresh_stale: bool,
+    on_item: Optional[Callable[[str, Dict[str, Any], float], None]],
+    notify: Callable[[str, Dict[str, Any]], None],
+) -> Tuple[CrawlResult, CrawlResult]:
+    """月份与内容阶段重叠执行：内容阶段按月份完成顺序读取月份文件，月份阶段结束后再补齐其余月份"""
+    ready: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    content_fetcher = _content_fetcher(client, journal, revalidate, refresh_stale, on_item)
+
+    def on_month(month: str, month_result: Dict[str, Any]) -> None:
+        if month_result.get("success"):
+            # 条目有变化的内容项在其月份进入内容阶段之前登记
+            content_fetcher.refresh_keys.update(i.key for i in month_result.get("changed_items") or [])
+            ready.put_nowait(month)
+
+    month_fetcher = MonthDataFetcher()
+    month_fetcher.http_client = client
+    month_fetcher.revalidate = revalidate
+    month_fetcher.on_month = on_month
+
+    async def crawl_months() -> CrawlResult:
+        try:
+            with STAGE_DURATION.time(stage="months"):
+                return await month_fetcher.crawl(months=months, refresh=refresh)
+        finally:
+            ready.put_nowait(None)
+
+    async def ready_months() -> AsyncIterator[str]:
+        seen = set()
+        while (month := await ready.get()) is not None:
+            seen.add(month)
+            yield month
+        # 未在本次刷新的月份（增量检查过期时）与获取失败的月份读取本地已有文件
+        for month in all_months:
+            if month not in seen:
+                yield month
+
+    month_task = asyncio.create_task(crawl_months())
+    try:
+        notify("content", {"items": None})
+        with STAGE_DURATION.time(stage="content"):
+            content_result = await content_fetcher.crawl(items=content_fetcher._iter_content_items(ready_months()))
+        return await month_task, content_result
+    finally:
+        if not month_task.done():
+            month_task.cancel()
+            await asyncio.gather(month_task, return_exceptions=True)
+
+
+def _content_fetcher(
+    client: AbstractHTTPClient,
+    journal: CrawlJournal,
+    revalidate: bool,
+    refresh_stale: bool,
+    on_item: Optional[Callable[[str, Dict[str, Any], float], None]],
+) -> ContentFetcher:
+    content_fetcher = ContentFetcher()
+    content_fetcher.http_client = client
+    content_fetcher.revalidate = revalidate
+    content_fetcher.freshness = refresh_stale
+    content_fetcher.journal = journal
+    content_fetcher.on_result = on_item
+    return content_fetcher
+
+
+def _partial_failure(month_result: Optional[CrawlResult], content_result: CrawlResult) -> Optional[Dict[str, Any]]:
+    """月份或内容项部分失败（各阶段本身仍返回 success=True）时的失败结果；此时不结束日志中的运行、不提交分类快照，
+    下次运行重新计划这些月份并接管未提交的内容项"""
+    month_results = ((month_result.data if month_result is not None else None) or {}).get("results") or {}
+    failed_months = [month for month, r in month_results.items() if not r.get("success")]
+    if failed_months:
+        return {"success": False, "stage": "months", "error": f"{len(failed_months)} 个月份获取失败: {', '.join(failed_months[:5])}"}
+    failures = (content_result.data or {}).get("failures") or {}
+    if failures:
+        return {"success": False, "stage": "content", "error": f"{len(failures)} 个内容项获取失败"}
+    return None
+
+
+def _item_dicts(items: List[ItemRecord], refresh_keys: Set[str]) -> List[Dict[str, Any]]:
+    """写入抓取日志 / 租约账本的内容项；有变化的内容项带 refresh 标记"""
+    return [{**i._asdict(), "refresh": True} if i.key in refresh_keys else i._asdict() for i in items]
+
+
+async def _merge_carried(
+    items: List[ItemRecord], refresh_keys: Set[str], months: List[str], carried_items: List[Dict[str, Any]]
+) -> List[ItemRecord]:
+    """并入被接管运行的内容项：内容项未确定的月份读取其全部内容项（已完成的会跳过）；带 refresh 标记的加入 refresh_keys"""
+    merged = {i.key: i for i in items}
+    if months:
+        async for item in ContentFetcher()._iter_content_items(months):
+            merged.setdefault(item.key, item)
+    for data in carried_items:
+        item = ItemRecord.from_dict(data)
+        merged.setdefault(item.key, item)
+        if data.get("refresh"):
+            refresh_keys.add(item.key)
+    return list(merged.values())
+
+
+def _collect_items(month_data: Optional[Dict[str, Any]], field: str) -> List[ItemRecord]:
+    """从月份阶段结果中汇总内容项（月份结果只保留新增项 new_items 与有变化的 changed_items）"""
+    items: List[ItemRecord] = []
+    for month_result in (month_data or {}).get("results", {}).values():
+        items.extend(month_result.get(field) or [])
+    return items
+
+
+def compact_result(result: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """将流水线结果压缩为摘要（去掉逐月内容项列表与逐项结果），并单独返回失败项列表"""
+    summary = {k: v for k, v in result.items() if k not in ("classify", "months", "content")}
+    failures: List[Dict[str, Any]] = []
+
+    plan = result.get("plan")
+    if isinstance(plan, dict) and "items" in plan:
+        summary["plan"] = {k: v for k, v in plan.items() if k != "items"}
+        summary["plan"]["item_count"] = len(plan.get("items") or [])
+
+    classify = result.get("classify")
+    if classify is not None:
+        summary["classify"] = {
+            "success": classify.get("success"),
+            "error": classify.get("error"),
+            "updated": (classify.get("data") or {}).get("updated"),
+            "not_modified": (classify.get("data") or {}).get("not_modified", False),
+        }
+
+    months = result.get("months")
+    if months is not None:
+        data = months.get("data") or {}
+        month_results = data.get("results") or {}
+        summary["months"] = {
+            "success": months.get("success"),
+            "error": months.get("error"),
+            "total_months": data.get("total_months", 0),
+            "success_count": data.get("success_count", 0),
+            "skipped": sum(1 for r in month_results.values() if r.get("skipped")),
+            "not_modified": sum(1 for r in month_results.values() if r.get("not_modified")),
+            "new_items": sum(len(r.get("new_items") or []) for r in month_results.values()),
+            "changed_items": sum(len(r.get("changed_items") or []) for r in month_results.values()),
+        }
+        failures.extend(
+            {"kind": "month", "key": month, "error": r.get("error")}
+            for month, r in month_results.items() if not r.get("success")
+        )
+
+    content = result.get("content")
+    if content is not None:
+        data = content.get("data") or {}
+        summary["content"] = {
+            "success": content.get("success"),
+            "error": content.get("error"),
+            **{k: v for k, v in data.items() if k != "failures"},
+        }
+        failures.extend(
+            {"kind": "item", "key": key, "error": error} for key, error in (data.get("failures") or {}).items()
+        )
+        summary["content"]["failed_count"] = sum(1 for f in failures if f["kind"] == "item")
+
+    summary["failed_count"] = len(failures)
+    return summary, failures
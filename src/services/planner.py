@@ -0,0 +1,78 @@
+"""
+增量抓取计划：根据分类数据的逐月差异决定需要刷新的月份
+"""
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.classify_state import ClassifyDelta, diff_states, month_states
+
+
+@dataclass
+class CrawlPlan:
+    full: bool = False
+    months_added: List[str] = field(default_factory=list)
+    months_changed: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    months_removed: List[str] = field(default_factory=list)
+    months_missing: List[str] = field(default_factory=list)
+    # 热点刷新：分类数据没有变化也重新请求的最近月份
+    months_hot: List[str] = field(default_factory=list)
+    # 月份阶段完成后填充：需要抓取的新增内容 "{type}_{id}"
+    items: List[str] = field(default_factory=list)
+
+    @property
+    def months_to_fetch(self) -> List[str]:
+        months = set(self.months_added) | set(self.months_changed) | set(self.months_missing) | set(self.months_hot)
+        return sorted(months, reverse=True)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.full and not self.months_to_fetch
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["months_to_fetch"] = self.months_to_fetch
+        return data
+
+
+def plan_from_delta(
+    delta: ClassifyDelta,
+    months: Iterable[str],
+    month_data_dir: Optional[Path] = None,
+    full: bool = False,
+) -> CrawlPlan:
+    """由分类数据的逐月差异生成增量计划
+
+    首次运行（没有历史快照）时生成全量计划；full=True 时仍保留月份差异，但标记为全量。
+    传入 month_data_dir 时，本地缺失月份文件的月份（months 为当前全部月份）也会纳入计划。
+    """
+    if delta.first_run:
+        return CrawlPlan(full=True, months_added=list(delta.months_added))
+
+    plan = CrawlPlan(
+        full=full,
+        months_added=list(delta.months_added),
+        months_changed=dict(delta.months_changed),
+        months_removed=list(delta.months_removed),
+    )
+    if month_data_dir is not None:
+        existing = {p.stem for p in month_data_dir.glob("*.json")} if month_data_dir.exists() else set()
+        planned = set(plan.months_added) | set(plan.months_changed)
+        plan.months_missing = sorted((m for m in months if m not in existing and m not in planned), reverse=True)
+    return plan
+
+
+def plan_hot_months(months: Iterable[str], count: int) -> CrawlPlan:
+    """只刷新最近 count 个月份的计划（月份键为 YYYY-MM，按字符串倒序即为时间倒序）"""
+    return CrawlPlan(months_hot=sorted(months, reverse=True)[:max(0, count)])
+
+
+def build_plan(
+    previous: Optional[Dict[str, Any]],
+    current: Dict[str, Any],
+    month_data_dir: Optional[Path] = None,
+    full: bool = False,
+) -> CrawlPlan:
+    """对比新旧两份完整的分类数据生成增量计划；previous 为空时视为首次运行"""
+    delta = diff_states(month_states(previous) if previous else None, month_states(current))
+    return plan_from_delta(delta, current.keys(), month_data_dir, full)
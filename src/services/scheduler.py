@@ -0,0 +1,126 @@
+"""
+监控任务的调度：固定速率（补偿漂移）+ 自适应间隔 + 抖动
+
+下一次运行时间以上一次的计划时间（而不是结束时间）为基准累加间隔，运行耗时不会让周期逐渐后移；
+运行耗时超过间隔时跳过错过的时间点，不连续补跑。抖动只加在每次的实际触发时间上，不影响基准，因此不会累积。
+"""
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import (
+    MONITOR_BACKOFF_FACTOR,
+    MONITOR_IDLE_POLLS,
+    MONITOR_JITTER,
+    MONITOR_MAX_INTERVAL,
+    MONITOR_MIN_INTERVAL,
+)
+
+
+@dataclass
+class Cadence:
+    interval: float                          # 基础间隔（秒）
+    adaptive: bool = True                    # 是否按有无变化调整间隔
+    min_interval: float = MONITOR_MIN_INTERVAL
+    max_interval: float = MONITOR_MAX_INTERVAL
+    backoff: float = MONITOR_BACKOFF_FACTOR
+    idle_polls: int = MONITOR_IDLE_POLLS
+    jitter: float = MONITOR_JITTER
+
+    def __post_init__(self) -> None:
+        self.interval = max(1.0, float(self.interval))
+        self.min_interval = max(1.0, min(float(self.min_interval), self.interval))
+        self.max_interval = max(float(self.max_interval), self.interval)
+        self.backoff = max(1.0, float(self.backoff))
+        self.jitter = min(0.5, max(0.0, float(self.jitter)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AdaptiveSchedule:
+    """单个任务的调度状态
+
+    检测到变化后间隔降到 min_interval，之后每次无变化按 backoff 倍数恢复到基础间隔；
+    在基础间隔上连续 idle_polls 次无变化后继续按倍数退避，直到 max_interval。
+    """
+
+    def __init__(
+        self,
+        cadence: Cadence,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.cadence = cadence
+        self.clock = clock
+        self.rng = rng
+        self.current_interval = cadence.interval
+        self.idle_polls = 0
+        self._anchor = clock()     # 下一次运行的计划时间（不含抖动）
+        self._fire = self._anchor  # 下一次实际触发时间
+        self._previous: Optional[float] = None  # 上一次运行的计划时间
+        self._extra: Optional[float] = None     # 提前运行时被跳过的计划时间
+
+    def start(self, delay: float = 0.0) -> None:
+        """delay 秒后第一次运行（不加抖动）"""
+        self._extra = None
+        self._anchor = self._fire = self.clock() + max(0.0, delay)
+
+    def run_now(self) -> None:
+        """提前运行一次（手动触发或被其他任务唤醒），原计划的时间点保留"""
+        if self._extra is None:
+            self._extra = self._anchor
+        self._fire = self.clock()
+
+    def seconds_until_due(self) -> float:
+        return max(0.0, self._fire - self.clock())
+
+    def next_run_timestamp(self) -> float:
+        """下一次运行的 Unix 时间戳"""
+        return time.time() + self.seconds_until_due()
+
+    def record(self, changed: Optional[bool]) -> None:
+        """一次运行结束：changed 为 None（运行出错）时不调整间隔"""
+        cadence = self.cadence
+        if cadence.adaptive and changed is not None:
+            if changed:
+                self.idle_polls = 0
+                self.current_interval = cadence.min_interval
+            else:
+                self.idle_polls += 1
+                if self.current_interval < cadence.interval:
+                    self.current_interval = min(cadence.interval, self.current_interval * cadence.backoff)
+                elif self.idle_polls >= cadence.idle_polls:
+                    self.current_interval = min(cadence.max_interval, self.current_interval * cadence.backoff)
+        if self._extra is not None:
+            # 提前运行后：仍按原计划时间运行，除非新的间隔更早到期
+            planned, self._extra = self._extra, None
+            self._plan_from(min(planned - self.current_interval, self.clock()))
+        else:
+            self._plan_from(self._anchor)
+
+    def reschedule(self, cadence: Cadence) -> None:
+        """更换节奏：间隔回到新的基础间隔，下一次运行按上一次的计划时间重新计算（已过期时立即运行）"""
+        self.cadence = cadence
+        self.current_interval = cadence.interval
+        self.idle_polls = 0
+        if self._previous is not None:
+            self._plan_from(self._previous)
+
+    def _plan_from(self, previous: float) -> None:
+        now = self.clock()
+        self._previous = previous
+        self._anchor = previous + self.current_interval
+        if self._anchor < now:
+            # 运行耗时超过间隔：跳过错过的时间点
+            self._anchor = now
+        offset = (self.rng() * 2 - 1) * self.cadence.jitter * self.current_interval
+        self._fire = max(now, self._anchor + offset)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "current_interval": round(self.current_interval, 3),
+            "idle_polls": self.idle_polls,
+            "next_run_in": round(self.seconds_until_due(), 3),
+        }
@@ -0,0 +1,152 @@
+"""
+分片抓取：内容阶段按 (type, id) 的哈希拆分到多个进程，进程之间通过租约账本协调
+
+解析 JSON、计算哈希与正则提取图片都是 CPU 工作，单个事件循环里会与网络 I/O 争用同一个核；
+分片后每个进程各自运行一个 ContentFetcher。多台机器共享同一数据目录时，
+其他节点用 `python main.py crawl --shard-worker <i> --shards <n>` 加入当前运行。
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import AbstractSet, Any, AsyncIterator, Dict, List, Optional
+
+from config.settings import BASE_DIR, SHARD_CLAIM_BATCH, SHARD_LEASE_TTL, SHARD_POLL_INTERVAL
+from src.crawler.content_fetcher import ContentFetcher
+from src.utils.http_client import AbstractHTTPClient
+from src.utils.lease_ledger import LeaseLedger, default_owner
+from src.utils.logger import crawler_logger
+from src.utils.models import CrawlResult, ItemRecord
+
+
+async def run_shard(
+    client: AbstractHTTPClient,
+    shard: int,
+    shards: int,
+    run_id: Optional[str] = None,
+    ledger: Optional[LeaseLedger] = None,
+) -> Dict[str, Any]:
+    """以分片 shard 的身份领取并抓取内容项，直到账本中没有待处理或被持有的内容项
+
+    run_id 为空时加入账本中最近的一次运行。
+    """
+    ledger = ledger or LeaseLedger()
+    if run_id is None:
+        current = ledger.current_run()
+        if current is None:
+            return {"success": False, "error": "租约账本中没有分片运行"}
+        run_id, shards = current
+    owner = default_owner(shard)
+
+    fetcher = ContentFetcher()
+    fetcher.http_client = client
+
+    def on_result(key: str, result: Dict[str, Any], elapsed: float) -> None:
+        if result.get("success"):
+            ledger.complete(run_id, owner, key, ContentFetcher._outcome(result))
+        else:
+            ledger.fail(run_id, owner, key, result.get("error"))
+
+    fetcher.on_result = on_result
+
+    async def claimed_items() -> AsyncIterator[ItemRecord]:
+        while True:
+            batch = ledger.claim(run_id, owner, shard, SHARD_CLAIM_BATCH, SHARD_LEASE_TTL)
+            if not batch:
+                if ledger.outstanding(run_id) == 0:
+                    return
+                # 其他分片仍持有租约（或本分片队列中尚有未完成项），等待完成或过期后重新领取
+                await asyncio.sleep(SHARD_POLL_INTERVAL)
+                continue
+            for item in batch:
+                record = ItemRecord.from_dict(item)
+                if item.get("refresh"):
+                    fetcher.refresh_keys.add(record.key)
+                yield record
+
+    async def keep_alive() -> None:
+        while True:
+            await asyncio.sleep(SHARD_LEASE_TTL / 3)
+            ledger.renew(run_id, owner, SHARD_LEASE_TTL)
+
+    crawler_logger.info(f"分片 {shard}/{shards} 加入运行 {run_id}（{owner}）")
+    renewer = asyncio.create_task(keep_alive())
+    try:
+        result = await fetcher.crawl(items=claimed_items())
+    finally:
+        renewer.cancel()
+    data = result.data or {}
+    return {
+        "success": result.success,
+        "error": result.error,
+        "run_id": run_id,
+        "shard": shard,
+        **{k: v for k, v in data.items() if k != "failures"},
+    }
+
+
+class ShardedContentRunner:
+    """流水线内容阶段的分片执行器：登记内容项、启动分片进程并等待，最后回收崩溃分片遗留的内容项"""
+
+    def __init__(self, client: AbstractHTTPClient, shards: int, offline: bool = False, ledger: Optional[LeaseLedger] = None):
+        self.client = client
+        self.shards = max(1, shards)
+        self.offline = offline
+        self.ledger = ledger or LeaseLedger()
+
+    async def __call__(self, items: Optional[List[ItemRecord]], refresh_keys: AbstractSet[str] = frozenset()) -> CrawlResult:
+        started = time.perf_counter()
+        if items is None:
+            items = await self._all_items()
+        # 有变化的内容项带 refresh 标记，领取它的分片按 modified_time 判断是否重新下载
+        rows = [{**i._asdict(), "refresh": True} if i.key in refresh_keys else i._asdict() for i in items]
+        run_id = self.ledger.create_run(rows, self.shards)
+        crawler_logger.info(f"分片抓取 {run_id}: {len(items)} 个内容项，{self.shards} 个分片进程")
+
+        procs = [await self._spawn(shard, run_id) for shard in range(self.shards)]
+        exit_codes = await asyncio.gather(*(proc.wait() for proc in procs))
+        if any(code != 0 for code in exit_codes):
+            crawler_logger.warning(f"分片进程异常退出: {exit_codes}")
+
+        if self.ledger.outstanding(run_id):
+            # 崩溃分片持有的租约过期后由本进程领取
+            crawler_logger.warning(f"回收未完成的内容项: {self.ledger.counts(run_id)}")
+            await run_shard(self.client, 0, self.shards, run_id, self.ledger)
+
+        counts = self.ledger.counts(run_id)
+        outcomes = self.ledger.outcomes(run_id)
+        elapsed = time.perf_counter() - started
+        return CrawlResult(
+            success=counts["pending"] + counts["leased"] == 0,
+            data={
+                "run_id": run_id,
+                "shards": self.shards,
+                "exit_codes": exit_codes,
+                "total_items": len(items),
+                "success_count": counts["done"],
+                "skipped": outcomes.get("skipped", 0),
+                "refreshed": outcomes.get("refreshed", 0),
+                "elapsed_seconds": round(elapsed, 3),
+                "items_per_second": round(len(items) / elapsed, 2) if elapsed > 0 else 0.0,
+                "failures": {f["key"]: f["error"] for f in self.ledger.failures(run_id)},
+            },
+        )
+
+    async def _all_items(self) -> List[ItemRecord]:
+        seen = set()
+        items: List[ItemRecord] = []
+        async for item in ContentFetcher()._iter_content_items():
+            if item.key not in seen:
+                seen.add(item.key)
+                items.append(item)
+        return items
+
+    async def _spawn(self, shard: int, run_id: str) -> "asyncio.subprocess.Process":
+        args = [
+            sys.executable, str(Path(BASE_DIR) / "main.py"), "crawl",
+            "--shard-worker", str(shard), "--shards", str(self.shards), "--run-id", run_id,
+        ]
+        if self.offline:
+            args.append("--offline")
+        # 分片进程的摘要输出（标准输出）只供手动启动时查看，这里以账本统计为准
+        return await asyncio.create_subprocess_exec(*args, cwd=str(BASE_DIR), stdout=asyncio.subprocess.DEVNULL)
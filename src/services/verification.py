@@ -1,16 +1,126 @@
-﻿from pathlib import Path
-from typing import Dict, Any, List, Tuple, Set
+﻿import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Generic, List, Optional, Tuple, Set, TypeVar
 
-from config.settings import CLASSIFY_FILE, MONTH_DATA_DIR, CONTENT_DATA_DIR, IMAGES_DIR, MIN_MARKDOWN_BYTES, MIN_META_BYTES
+from config.settings import (
+    CLASSIFY_FILE,
+    MONTH_DATA_DIR,
+    CONTENT_DATA_DIR,
+    IMAGES_DIR,
+    MIN_MARKDOWN_BYTES,
+    MIN_META_BYTES,
+    VERIFY_WORKERS,
+)
+from src.utils.crawl_index import get_crawl_index
+
+
+# 正文中引用的本地图片，捕获文件名
+_IMAGE_REF = re.compile(r"!\[[^\]]*\]\(\./images/(?:[^)]*/)?([^)/]+)\)")
+
+# 文件名 -> (st_mtime_ns, st_size)
+FileStats = Dict[str, Tuple[int, int]]
+
+T = TypeVar("T")
+
+
+def _list_dir(directory: Path, suffix: str = "") -> FileStats:
+    """一次 scandir 列出目录中的文件及其 (mtime, size)"""
+    entries: FileStats = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    st = entry.stat()
+                    entries[entry.name] = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _scan_images(path: Path) -> Tuple[str, ...]:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    return tuple(_IMAGE_REF.findall(text))
+
+
+def _read_month_items(path: Path) -> Optional[Tuple[Tuple[str, int], ...]]:
+    """月份文件中的 (type, id)；读取失败时返回 None，内容无法解析时视为空"""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return ()
+    if not isinstance(data, list):
+        return ()
+    return tuple(
+        (item["type"], item["id"])
+        for item in data
+        if isinstance(item, dict) and isinstance(item.get("type"), str) and isinstance(item.get("id"), int)
+    )
+
+
+class _ScanCache(Generic[T]):
+    """按文件名缓存解析结果的进程内缓存，按 (mtime, size) 判断文件是否变化"""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[int, int], T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, stat: Tuple[int, int]) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(name)
+        return entry[1] if entry is not None and entry[0] == stat else None
+
+    def put(self, name: str, stat: Tuple[int, int], value: T) -> None:
+        with self._lock:
+            self._entries[name] = (stat, value)
+
+    def retain(self, names: Set[str]) -> None:
+        """清除已删除文件的缓存项"""
+        with self._lock:
+            for name in set(self._entries) - names:
+                del self._entries[name]
+
+
+# module-level singleton：markdown 引用的图片名
+scan_cache: "_ScanCache[Tuple[str, ...]]" = _ScanCache()
+# module-level singleton：月份文件中的内容项（索引尚未建立时使用）
+month_items_cache: "_ScanCache[Tuple[Tuple[str, int], ...]]" = _ScanCache()
 
 
 class Verifier:
+    """单次遍历数据目录完成校验：目录各 scandir 一次，markdown 图片引用在线程池中扫描并按 (mtime, size) 缓存
+
+    同步执行（含文件 I/O），在异步接口中应通过 asyncio.to_thread 调用。
+    """
+
+    def __init__(
+        self,
+        workers: int = VERIFY_WORKERS,
+        cache: "_ScanCache[Tuple[str, ...]]" = scan_cache,
+        month_cache: "_ScanCache[Tuple[Tuple[str, int], ...]]" = month_items_cache,
+    ):
+        self.workers = workers
+        self.cache = cache
+        self.month_cache = month_cache
+        self.rescanned = 0  # 本次重新扫描的 markdown 数（其余命中缓存）
+
     def verify(self, detail: bool = False) -> Dict[str, Any]:
-        classify = self._verify_classify()
-        months = self._verify_months(classify)
-        content = self._verify_content()
+        content_files = _list_dir(CONTENT_DATA_DIR)
+        month_files = _list_dir(MONTH_DATA_DIR, ".json")
+        image_names = set(_list_dir(IMAGES_DIR))
 
-        items_summary = self._verify_items(detail=detail)
+        classify, expected_months = self._verify_classify()
+        months = self._verify_months(expected_months, month_files)
+        refs = self._image_refs(content_files)
+        content = self._verify_content(content_files, refs, image_names)
+        items_summary = self._verify_items(content_files, month_files, refs, image_names, detail=detail)
 
         overall_ok = classify["exists"] and months["ok"] and content["ok"] and items_summary["ok"]
         return {
@@ -21,55 +131,70 @@ class Verifier:
             "items": items_summary,
         }
 
-    def _verify_classify(self) -> Dict[str, Any]:
+    def _verify_classify(self) -> Tuple[Dict[str, Any], Set[str]]:
         exists = CLASSIFY_FILE.exists()
-        count = 0
+        months: Set[str] = set()
         error = None
         if exists:
             try:
-                import json
                 data = json.loads(CLASSIFY_FILE.read_text(encoding="utf-8"))
                 if isinstance(data, dict):
-                    count = len(data.keys())
+                    months = set(data.keys())
             except Exception as e:
                 error = str(e)
-        return {"exists": exists, "month_count": count, "error": error}
+        return {"exists": exists, "month_count": len(months), "error": error}, months
 
-    def _verify_months(self, classify: Dict[str, Any]) -> Dict[str, Any]:
-        files: List[Path] = sorted(MONTH_DATA_DIR.glob("*.json"))
-        file_months = {f.stem for f in files}
-        missing: List[str] = []
-        if classify.get("month_count"):
-            try:
-                import json
-                data = json.loads(CLASSIFY_FILE.read_text(encoding="utf-8"))
-                expected_months = set(data.keys())
-                missing = sorted(list(expected_months - file_months))
-            except Exception:
-                pass
+    def _verify_months(self, expected_months: Set[str], month_files: FileStats) -> Dict[str, Any]:
+        files = sorted(month_files)
+        missing = sorted(expected_months - {name[:-len(".json")] for name in files})
         ok = len(missing) == 0 and len(files) > 0
-        return {"ok": ok, "files": [str(f) for f in files], "missing": missing}
+        return {"ok": ok, "files": [str(MONTH_DATA_DIR / name) for name in files], "missing": missing}
 
-    def _verify_content(self) -> Dict[str, Any]:
-        # 检查 content 下 .md 与 _meta.json 成对
-        md_files = {p.stem for p in CONTENT_DATA_DIR.glob("*.md")}
-        meta_files = {p.stem.replace("_meta", "") for p in CONTENT_DATA_DIR.glob("*_meta.json")}
-        missing_md = sorted(list(meta_files - md_files))
-        missing_meta = sorted(list(md_files - meta_files))
-
-        # 粗略检查 markdown 中图片是否存在
-        broken_images: List[str] = []
-        for md_path in CONTENT_DATA_DIR.glob("*.md"):
+    def _image_refs(self, content_files: FileStats) -> Dict[str, Tuple[str, ...]]:
+        """每个 markdown 引用的本地图片名；未变化的文件直接取缓存，其余在线程池中扫描"""
+        md_names = {name for name in content_files if name.endswith(".md")}
+        self.cache.retain(md_names)
+
+        refs: Dict[str, Tuple[str, ...]] = {}
+        stale: List[str] = []
+        for name in md_names:
+            cached = self.cache.get(name, content_files[name])
+            if cached is None:
+                stale.append(name)
+            else:
+                refs[name] = cached
+
+        def scan(name: str) -> Tuple[str, Optional[Tuple[str, ...]]]:
             try:
-                text = md_path.read_text(encoding="utf-8", errors="ignore")
-                import re
-                for _, url in re.findall(r"!\[[^\]]*\]\(([^)]+)\)", text):
-                    if url.startswith("./images/"):
-                        name = url.split("/")[-1]
-                        if not (IMAGES_DIR / name).exists():
-                            broken_images.append(f"{md_path.name}:{name}")
-            except Exception:
-                continue
+                return name, _scan_images(CONTENT_DATA_DIR / name)
+            except OSError:
+                return name, None
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(stale)))) as pool:
+                for name, found in pool.map(scan, stale):
+                    if found is not None:
+                        refs[name] = found
+                        self.cache.put(name, content_files[name], found)
+        self.rescanned = len(stale)
+        return refs
+
+    def _verify_content(
+        self, content_files: FileStats, refs: Dict[str, Tuple[str, ...]], image_names: Set[str]
+    ) -> Dict[str, Any]:
+        # 检查 content 下 .md 与 _meta.json 成对
+        md_files = {name[:-len(".md")] for name in content_files if name.endswith(".md")}
+        meta_files = {name[:-len("_meta.json")] for name in content_files if name.endswith("_meta.json")}
+        missing_md = sorted(meta_files - md_files)
+        missing_meta = sorted(md_files - meta_files)
+
+        # markdown 中引用的图片是否存在
+        broken_images = [
+            f"{md_name}:{name}"
+            for md_name in sorted(refs)
+            for name in refs[md_name]
+            if name not in image_names
+        ]
 
         ok = len(missing_md) == 0 and len(missing_meta) == 0
         return {
@@ -79,47 +204,46 @@ class Verifier:
             "broken_images": broken_images,
         }
 
-    def _collect_expected_items(self) -> List[Tuple[str, int]]:
+    def _collect_expected_items(self, month_files: FileStats) -> List[Tuple[str, int]]:
+        # 索引只在与磁盘上的月份文件一一对应时可信（增量 / 热点运行只为涉及的月份建立索引）
+        index = get_crawl_index()
+        if index.indexed_months() == {Path(name).stem for name in month_files}:
+            return index.expected_items()
+
+        # 否则回退为读取已列出的月份文件，未变化的文件直接取缓存
+        self.month_cache.retain(set(month_files))
         expected: Set[Tuple[str, int]] = set()
-        for f in sorted(MONTH_DATA_DIR.glob("*.json")):
-            try:
-                import json
-                data = json.loads(f.read_text(encoding="utf-8"))
-                if isinstance(data, list):
-                    for item in data:
-                        t = item.get("type")
-                        i = item.get("id")
-                        if isinstance(t, str) and isinstance(i, int):
-                            expected.add((t, i))
-            except Exception:
-                continue
-        return sorted(list(expected))
-
-    def _verify_items(self, detail: bool = False) -> Dict[str, Any]:
-        expected = self._collect_expected_items()
+        for name, stat in month_files.items():
+            items = self.month_cache.get(name, stat)
+            if items is None:
+                items = _read_month_items(MONTH_DATA_DIR / name)
+                if items is None:
+                    continue
+                self.month_cache.put(name, stat, items)
+            expected.update(items)
+        return sorted(expected)
+
+    def _verify_items(
+        self,
+        content_files: FileStats,
+        month_files: FileStats,
+        refs: Dict[str, Tuple[str, ...]],
+        image_names: Set[str],
+        detail: bool = False,
+    ) -> Dict[str, Any]:
+        expected = self._collect_expected_items(month_files)
         total_expected = len(expected)
 
         present = set()
         issues: List[Dict[str, Any]] = []
 
         for t, i in expected:
-            md = CONTENT_DATA_DIR / f"{t}_{i}.md"
-            meta = CONTENT_DATA_DIR / f"{t}_{i}_meta.json"
-            has_md = md.exists() and md.stat().st_size > MIN_MARKDOWN_BYTES
-            has_meta = meta.exists() and meta.stat().st_size > MIN_META_BYTES
-
-            broken: List[str] = []
-            if has_md:
-                try:
-                    text = md.read_text(encoding="utf-8", errors="ignore")
-                    import re
-                    for _, url in re.findall(r"!\[[^\]]*\]\(([^)]+)\)", text):
-                        if url.startswith("./images/"):
-                            name = url.split("/")[-1]
-                            if not (IMAGES_DIR / name).exists():
-                                broken.append(name)
-                except Exception:
-                    pass
+            md_name = f"{t}_{i}.md"
+            md = content_files.get(md_name)
+            meta = content_files.get(f"{t}_{i}_meta.json")
+            has_md = md is not None and md[1] > MIN_MARKDOWN_BYTES
+            has_meta = meta is not None and meta[1] > MIN_META_BYTES
+            broken = [name for name in refs.get(md_name, ()) if name not in image_names] if has_md else []
 
             if has_md and has_meta and not broken:
                 present.add((t, i))
@@ -138,8 +262,8 @@ class Verifier:
             "total_expected": total_expected,
             "complete_count": len(present),
             "incomplete_count": len(issues),
+            "rescanned": self.rescanned,
         }
         if detail:
             summary["issues"] = issues
         return summary
-
@@ -0,0 +1,165 @@
+"""
+分类数据的结构化变更检测
+
+按月份记录分类数据的摘要与计数（内存快照 + 小型状态文件 classify_state.json），
+新数据到达时逐月对比，得到新增 / 变化（附计数差值）/ 删除的月份，下游阶段直接使用这份差异，
+无需再读取并对比完整的 classify.json。
+
+快照只在下游阶段全部完成后提交；检测到但尚未提交的数据作为 pending 一并写入状态文件，
+其他进程之后收到 304 时仍以它与已提交的快照对比，变化不会因为中途失败或只检测不抓取而丢失。
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config.settings import CLASSIFY_FILE, CLASSIFY_STATE_FILE
+from src.utils.logger import crawler_logger
+from src.utils.models import MonthStats
+
+
+_STATE_VERSION = 1
+
+
+class MonthState(NamedTuple):
+    """单个月份的摘要与计数；计数无法解析时为 None"""
+    digest: str
+    article: Optional[int]
+    section: Optional[int]
+
+
+@dataclass
+class ClassifyDelta:
+    first_run: bool = False
+    months_added: List[str] = field(default_factory=list)
+    # 月份 -> {"article": 差值, "section": 差值}
+    months_changed: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    months_removed: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.first_run or self.months_added or self.months_changed or self.months_removed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def month_state(month: str, value: Any) -> MonthState:
+    digest = hashlib.blake2b(
+        json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), digest_size=8
+    ).hexdigest()
+    try:
+        stats = MonthStats(month=month, **value)
+        return MonthState(digest, stats.article, stats.section)
+    except Exception as e:
+        crawler_logger.warning(f"解析月份统计失败: {month} - 错误: {e}")
+        return MonthState(digest, None, None)
+
+
+def month_states(classify: Dict[str, Any]) -> Dict[str, MonthState]:
+    return {month: month_state(month, value) for month, value in classify.items()}
+
+
+def diff_states(previous: Optional[Dict[str, MonthState]], current: Dict[str, MonthState]) -> ClassifyDelta:
+    """逐月对比摘要；previous 为 None（没有历史记录）时所有月份视为新增"""
+    if previous is None:
+        return ClassifyDelta(first_run=True, months_added=sorted(current, reverse=True))
+
+    delta = ClassifyDelta()
+    for month, new in current.items():
+        old = previous.get(month)
+        if old is None:
+            delta.months_added.append(month)
+        elif old.digest != new.digest:
+            if None in (old.article, old.section, new.article, new.section):
+                delta.months_changed[month] = {"article": 0, "section": 0}
+            else:
+                delta.months_changed[month] = {
+                    "article": new.article - old.article,
+                    "section": new.section - old.section,
+                }
+    delta.months_added.sort(reverse=True)
+    delta.months_removed = sorted((m for m in previous if m not in current), reverse=True)
+    return delta
+
+
+class ClassifyChangeDetector:
+    """保存上次提交的分类数据快照；首次使用时从状态文件加载，没有状态文件时由已有的 classify.json 生成"""
+
+    def __init__(self, path: Path = CLASSIFY_STATE_FILE, classify_file: Path = CLASSIFY_FILE):
+        self.path = path
+        self.classify_file = classify_file
+        # 上次提交的完整分类数据（仅内存），304 时直接复用
+        self.data: Optional[Dict[str, Any]] = None
+        # 只检测、尚未提交的最新数据
+        self.pending: Optional[Dict[str, Any]] = None
+        self._months: Optional[Dict[str, MonthState]] = None
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if self.path.exists():
+                state = json.loads(self.path.read_text(encoding="utf-8"))
+                if state.get("version") == _STATE_VERSION:
+                    months = state.get("months")
+                    self._months = None if months is None else {m: MonthState(*v) for m, v in months.items()}
+                    self.pending = state.get("pending")
+                    return
+            if self.classify_file.exists():
+                # 升级前的数据目录只有 classify.json
+                self.data = json.loads(self.classify_file.read_text(encoding="utf-8"))
+                self._months = month_states(self.data)
+        except Exception as e:
+            crawler_logger.warning(f"加载分类状态失败，视为首次运行: {self.path} - 错误: {e}")
+            self._months = None
+
+    def diff(self, current: Dict[str, Any]) -> ClassifyDelta:
+        self._ensure_loaded()
+        return diff_states(self._months, month_states(current))
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """最近见到的完整分类数据（可能尚未提交）；进程内没有时为 None"""
+        return self.pending if self.pending is not None else self.data
+
+    def observe(self, current: Dict[str, Any], delta: ClassifyDelta) -> None:
+        """记录最近见到但不提交的数据（delta 为其相对已提交快照的差异）：有差异时写入状态文件，
+        服务端随后返回 304 时（包括其他进程）仍以它与已提交的快照对比"""
+        self._ensure_loaded()
+        if delta.is_empty:
+            if self.data is None:
+                self.data = current
+            if self.pending is not None:
+                self.pending = None
+                self._write()
+        elif current != self.pending:
+            self.pending = current
+            self._write()
+
+    def commit(self, current: Dict[str, Any]) -> None:
+        """classify.json 保存成功后记录新快照并写回状态文件"""
+        self._loaded = True
+        self.data = current
+        self.pending = None
+        self._months = month_states(current)
+        self._write()
+
+    def _write(self) -> None:
+        """写回状态文件（临时文件 + 重命名）"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            months = None if self._months is None else {m: list(s) for m, s in self._months.items()}
+            state = {"version": _STATE_VERSION, "months": months, "pending": self.pending}
+            tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            crawler_logger.error(f"保存分类状态失败: {self.path} - 错误: {e}")
+
+
+# module-level singleton
+classify_detector = ClassifyChangeDetector()
@@ -0,0 +1,225 @@
+"""
+本地抓取状态索引（SQLite）
+
+按 (type, id) 记录每个内容的抓取时间、上游 modified_time、正文哈希、文件大小与引用的图片，
+以及每个月份列表中的内容项，使跳过/校验判断成为索引查询而不是逐文件 stat；
+图片按 URL 记录内容摘要（SHA-256）与本地文件名，供内容寻址的图片存储使用。
+"""
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import CRAWL_INDEX_FILE, MIN_MARKDOWN_BYTES, MIN_META_BYTES
+from src.utils.logger import crawler_logger
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    fetched_at TEXT,
+    modified_time TEXT,
+    body_hash TEXT,
+    md_size INTEGER NOT NULL DEFAULT 0,
+    meta_size INTEGER NOT NULL DEFAULT 0,
+    images TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (type, id)
+);
+CREATE TABLE IF NOT EXISTS month_items (
+    month TEXT NOT NULL,
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT,
+    created_time TEXT,
+    PRIMARY KEY (month, type, id)
+);
+CREATE INDEX IF NOT EXISTS idx_month_items_item ON month_items (type, id);
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_digest ON images (digest);
+"""
+
+
+@dataclass
+class ItemState:
+    type: str
+    id: int
+    title: Optional[str]
+    fetched_at: Optional[str]
+    modified_time: Optional[str]
+    body_hash: Optional[str]
+    md_size: int
+    meta_size: int
+    images: List[str]
+
+    @property
+    def is_complete(self) -> bool:
+        return self.md_size > MIN_MARKDOWN_BYTES and self.meta_size > MIN_META_BYTES
+
+
+class CrawlIndex:
+    """抓取状态索引，单连接 + 锁，写操作均在事务中完成"""
+
+    def __init__(self, path: Path = CRAWL_INDEX_FILE):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # 分片抓取时多个进程共用索引，写锁冲突时最多等待 30 秒
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---- 内容项 ----
+
+    def get(self, type: str, id: int) -> Optional[ItemState]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT type, id, title, fetched_at, modified_time, body_hash, md_size, meta_size, images "
+                "FROM items WHERE type = ? AND id = ?",
+                (type, id),
+            ).fetchone()
+        if row is None:
+            return None
+        return ItemState(*row[:8], images=json.loads(row[8] or "[]"))
+
+    def is_complete(self, type: str, id: int) -> bool:
+        state = self.get(type, id)
+        return state is not None and state.is_complete
+
+    def record_item(
+        self,
+        type: str,
+        id: int,
+        title: Optional[str] = None,
+        modified_time: Optional[str] = None,
+        body_hash: Optional[str] = None,
+        md_size: int = 0,
+        meta_size: int = 0,
+        images: Iterable[str] = (),
+        fetched_at: Optional[str] = None,
+    ) -> None:
+        """写入（覆盖）单个内容的抓取状态"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO items "
+                "(type, id, title, fetched_at, modified_time, body_hash, md_size, meta_size, images) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    type, id, title, fetched_at or datetime.now().isoformat(), modified_time,
+                    body_hash, md_size, meta_size, json.dumps(sorted(set(images))),
+                ),
+            )
+
+    def forget(self, type: str, id: int) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM items WHERE type = ? AND id = ?", (type, id))
+
+    def complete_keys(self) -> Set[Tuple[str, int]]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT type, id FROM items WHERE md_size > ? AND meta_size > ?",
+                (MIN_MARKDOWN_BYTES, MIN_META_BYTES),
+            ).fetchall()
+        return {(t, i) for t, i in rows}
+
+    def item_states(self) -> Dict[Tuple[str, int], ItemState]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT type, id, title, fetched_at, modified_time, body_hash, md_size, meta_size, images FROM items"
+            ).fetchall()
+        return {(r[0], r[1]): ItemState(*r[:8], images=json.loads(r[8] or "[]")) for r in rows}
+
+    # ---- 图片 ----
+
+    def image(self, url: str) -> Optional[Tuple[str, str, int]]:
+        """URL 对应的 (摘要, 文件名, 字节数)"""
+        with self._lock:
+            row = self.conn.execute("SELECT digest, name, size FROM images WHERE url = ?", (url,)).fetchone()
+        return (row[0], row[1], int(row[2])) if row else None
+
+    def image_by_digest(self, digest: str) -> Optional[Tuple[str, int]]:
+        """已保存的同内容图片的 (文件名, 字节数)"""
+        with self._lock:
+            row = self.conn.execute("SELECT name, size FROM images WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        return (row[0], int(row[1])) if row else None
+
+    def record_image(self, url: str, digest: str, name: str, size: int) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images (url, digest, name, size, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, name, size, datetime.now().isoformat()),
+            )
+
+    def forget_image(self, url: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM images WHERE url = ?", (url,))
+
+    # ---- 月份列表 ----
+
+    def has_month(self, month: str) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM month_items WHERE month = ? LIMIT 1", (month,)).fetchone()
+        return row is not None
+
+    def replace_month(self, month: str, items: Iterable[Dict[str, Any]]) -> None:
+        """用最新的月份列表替换该月份的内容项"""
+        rows = [
+            (month, i.get("type"), i.get("id"), i.get("title"), i.get("created_time"))
+            for i in items
+            if isinstance(i, dict) and isinstance(i.get("type"), str) and isinstance(i.get("id"), int)
+        ]
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM month_items WHERE month = ?", (month,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO month_items (month, type, id, title, created_time) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def indexed_months(self) -> Set[str]:
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT month FROM month_items").fetchall()
+        return {row[0] for row in rows}
+
+    def expected_items(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT type, id FROM month_items ORDER BY type, id").fetchall()
+        return [(t, i) for t, i in rows]
+
+
+_indexes: Dict[Path, CrawlIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_crawl_index(path: Path = CRAWL_INDEX_FILE) -> CrawlIndex:
+    """按路径返回进程内共享的索引实例"""
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = CrawlIndex(path)
+            _indexes[path] = index
+            crawler_logger.debug(f"打开抓取状态索引: {path}")
+        return index
@@ -0,0 +1,160 @@
+"""
+抓取日志（追加写 JSON Lines），用于中断后续跑
+
+每次流水线运行写入：
+  run_start  {run, plan}          运行开始及计划（是否全量、需刷新的月份）
+  items      {run, items}         月份阶段完成后确定的待抓取内容项
+  start      {run, key}           单个内容开始抓取
+  commit     {run, key}           单个内容的 markdown 与 meta 均已落盘并写入索引
+  fail       {run, key, error}    单个内容抓取失败
+  run_end    {run, summary}       运行正常结束
+
+上次运行未正常结束时，新运行不截断日志而是接管它：计划中记录接管的月份（carried_months）与
+尚未提交的内容项（carried_items），写了一半的内容在新运行中重新记为 start；直到某次运行正常结束，
+下一次运行才截断日志。
+"""
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from config.settings import CRAWL_JOURNAL_FILE
+from src.utils.logger import crawler_logger
+
+
+@dataclass
+class JournalRun:
+    """一次运行在日志中的状态"""
+    run_id: str
+    plan: Dict[str, Any] = field(default_factory=dict)
+    items: Optional[List[Dict[str, Any]]] = None
+    committed: Set[str] = field(default_factory=set)
+    started: Set[str] = field(default_factory=set)
+    finished: bool = False
+
+    @property
+    def pending(self) -> Set[str]:
+        """已开始但未提交的内容（可能写了一半）"""
+        return self.started - self.committed
+
+    @property
+    def outstanding_items(self) -> List[Dict[str, Any]]:
+        """已确定但尚未提交的内容项（含从更早运行接管的）"""
+        items = self.items if self.items is not None else self.plan.get("carried_items") or []
+        return [i for i in items if f"{i['type']}_{i['id']}" not in self.committed]
+
+    @property
+    def outstanding_months(self) -> List[str]:
+        """内容项尚未确定的月份（中断发生在月份阶段），需要读取其全部内容项"""
+        if self.items is not None:
+            return []
+        return list(dict.fromkeys((self.plan.get("months") or []) + (self.plan.get("carried_months") or [])))
+
+
+class CrawlJournal:
+    def __init__(self, path: Path = CRAWL_JOURNAL_FILE):
+        self.path = path
+        self.run: Optional[JournalRun] = None
+        self._fh = None
+
+    def unfinished_run(self) -> Optional[JournalRun]:
+        """最后一次运行未正常结束时返回它"""
+        run = self.load_last_run()
+        return run if run is not None and not run.finished else None
+
+    def begin_run(self, plan: Dict[str, Any], carried: Optional[JournalRun] = None) -> JournalRun:
+        """开始新的运行：上次运行已正常结束时截断日志，否则保留其记录继续追加；
+        carried 为被接管的运行时，其写了一半的内容在新运行中重新记为 start（续跑时强制重新下载）"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        keep = carried is not None or self.unfinished_run() is not None
+        self._fh = open(self.path, "a" if keep else "w", encoding="utf-8")
+        self.run = JournalRun(run_id=uuid.uuid4().hex[:12], plan=plan)
+        self._append("run_start", plan=plan)
+        for key in sorted(carried.pending if carried is not None else ()):
+            self.start(key)
+        return self.run
+
+    def resume_run(self) -> Optional[JournalRun]:
+        """加载最后一次未正常结束的运行并继续向日志追加；没有则返回 None"""
+        run = self.load_last_run()
+        if run is None or run.finished:
+            return None
+        self.close()
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self.run = run
+        crawler_logger.info(
+            f"续跑抓取 {run.run_id}: 已提交 {len(run.committed)} 个，未完成 {len(run.pending)} 个"
+        )
+        return run
+
+    def load_last_run(self) -> Optional[JournalRun]:
+        if not self.path.exists():
+            return None
+        runs: Dict[str, JournalRun] = {}
+        last: Optional[JournalRun] = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中断可能留下半行
+                    continue
+                run_id = record.get("run")
+                event = record.get("event")
+                if event == "run_start":
+                    last = runs[run_id] = JournalRun(run_id=run_id, plan=record.get("plan") or {})
+                    continue
+                run = runs.get(run_id)
+                if run is None:
+                    continue
+                if event == "items":
+                    run.items = record.get("items") or []
+                elif event == "start":
+                    run.started.add(record["key"])
+                elif event == "commit":
+                    run.committed.add(record["key"])
+                elif event == "run_end":
+                    run.finished = True
+        return last
+
+    def record_items(self, items: List[Dict[str, Any]]) -> None:
+        if self.run is not None:
+            self.run.items = items
+        self._append("items", items=items)
+
+    def start(self, key: str) -> None:
+        if self.run is not None:
+            self.run.started.add(key)
+        self._append("start", key=key)
+
+    def commit(self, key: str) -> None:
+        if self.run is not None:
+            self.run.committed.add(key)
+        self._append("commit", key=key)
+
+    def fail(self, key: str, error: Optional[str]) -> None:
+        self._append("fail", key=key, error=error)
+
+    def end_run(self, summary: Optional[Dict[str, Any]] = None) -> None:
+        if self.run is not None:
+            self.run.finished = True
+        self._append("run_end", summary=summary or {})
+        self.close()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _append(self, event: str, **fields: Any) -> None:
+        if self._fh is None or self.run is None:
+            return
+        record = {"run": self.run.run_id, "event": event, "ts": datetime.now().isoformat(), **fields}
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        if event in ("run_start", "items", "run_end"):
+            os.fsync(self._fh.fileno())
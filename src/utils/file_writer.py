@@ -0,0 +1,144 @@
+"""
+后台批量文件写入
+
+抓取 worker 把待写文件提交到有界队列，由一个专用线程成批落盘：先写临时文件再重命名（一组文件全部写好后才重命名），
+目录只创建一次；同一批次中路径完全相同的多个写入组只落盘最后一次（部分重叠的组各自完整写入，不拆开成对的文件）。
+队列满时提交方等待，内存占用随队列上限有界。
+"""
+import asyncio
+import os
+import queue
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+from config.settings import WRITER_BATCH_SIZE, WRITER_QUEUE_SIZE
+from src.utils.metrics import WRITER_BATCHES, WRITER_PENDING
+
+
+FileContent = Union[str, bytes]
+
+
+@dataclass
+class _WriteJob:
+    files: List[Tuple[Path, bytes]]
+    loop: asyncio.AbstractEventLoop
+    future: "asyncio.Future[None]"
+
+
+class WriteBehindWriter:
+    def __init__(self, max_pending: int = WRITER_QUEUE_SIZE, batch_size: int = WRITER_BATCH_SIZE):
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.SimpleQueue[_WriteJob]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._created_dirs: Set[Path] = set()
+        # 每个事件循环一个信号量，限制已提交未落盘的写入组数
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    async def write(self, files: Sequence[Tuple[Path, FileContent]]) -> None:
+        """提交一组文件并等待其全部落盘（重命名完成）；任一文件写入失败时整组不生效并抛出异常"""
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_pending)
+
+        encoded = [(path, content.encode("utf-8") if isinstance(content, str) else content) for path, content in files]
+        async with slots:
+            future: "asyncio.Future[None]" = loop.create_future()
+            self._ensure_thread()
+            WRITER_PENDING.inc()
+            self._queue.put(_WriteJob(encoded, loop, future))
+            await future
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    # ---- 写线程 ----
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[_WriteJob]) -> None:
+        # 路径集合完全相同的组只写最后一次提交的内容，被覆盖的提交与最新一次共享结果；
+        # 只部分重叠的组按提交顺序各自完整写入，每组（如 markdown 与 meta）仍是全部生效或全部不生效
+        keys = [frozenset(path for path, _ in job.files) for job in batch]
+        latest: Dict[FrozenSet[Path], int] = {key: index for index, key in enumerate(keys)}
+
+        errors: List[Optional[BaseException]] = []
+        for index, job in enumerate(batch):
+            if latest[keys[index]] != index:
+                errors.append(None)
+                continue
+            try:
+                self._write_group(job.files)
+                errors.append(None)
+            except BaseException as e:  # 交给提交方处理
+                errors.append(e)
+
+        for index, job in enumerate(batch):
+            error = errors[latest[keys[index]]]
+            try:
+                job.loop.call_soon_threadsafe(self._resolve, job.future, error)
+            except RuntimeError:
+                # 提交方的事件循环已关闭
+                pass
+        WRITER_PENDING.dec(len(batch))
+        WRITER_BATCHES.inc()
+
+    def _write_group(self, files: List[Tuple[Path, bytes]]) -> None:
+        staged: List[Tuple[Path, Path]] = []
+        try:
+            for path, data in files:
+                # 临时文件名唯一：多个进程（分片）同时写同一路径时互不覆盖
+                tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:12]}.part")
+                with self._open_temp(tmp_path) as f:
+                    f.write(data)
+                staged.append((tmp_path, path))
+            for tmp_path, path in staged:
+                os.replace(tmp_path, path)
+        except BaseException:
+            for tmp_path, _ in staged:
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+    def _open_temp(self, tmp_path: Path) -> BinaryIO:
+        directory = tmp_path.parent
+        if directory not in self._created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(directory)
+        try:
+            return open(tmp_path, "wb")
+        except FileNotFoundError:
+            # 目录在运行期间被删除
+            directory.mkdir(parents=True, exist_ok=True)
+            return open(tmp_path, "wb")
+
+    @staticmethod
+    def _resolve(future: "asyncio.Future[None]", error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+# module-level singleton
+file_writer = WriteBehindWriter()
@@ -2,9 +2,13 @@
 HTTP 客户端抽象与实现
 """
 import asyncio
+import hashlib
 import json
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, Protocol, runtime_checkable
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Protocol, TypeVar, runtime_checkable
+from urllib.parse import urlparse
 
 import aiohttp
 
@@ -12,10 +16,46 @@ from config.settings import (
     HEADERS,
     IMAGE_HEADERS,
     REQUEST_TIMEOUT,
-    MAX_CONCURRENT_REQUESTS,
+    HTTP_POOLS,
+    IMAGE_HOSTS,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_RETRY_AFTER_MAX,
     BASE_DIR,
+    HTTP_VALIDATORS_FILE,
 )
+from src.utils import json_codec
 from src.utils.logger import crawler_logger
+from src.utils.metrics import (
+    HTTP_CONCURRENCY_LIMIT,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_RESPONSE_BYTES,
+    HTTP_RETRIES,
+    HTTP_THROTTLED,
+    endpoint_label,
+)
+from src.utils.rate_limit import AIMDLimiter, TokenBucket, backoff_delay, parse_retry_after
+from src.utils.validator_store import ValidatorStore
+
+
+T = TypeVar("T")
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUSES = {429, 503}
+
+
+class NotModified:
+    """条件请求命中 304 时返回的哨兵结果，使用 `is NOT_MODIFIED` 判断"""
+
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = NotModified()
 
 
 @runtime_checkable
@@ -26,7 +66,8 @@ class AbstractHTTPClient(Protocol):
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         ...
 
-    async def get(self, url: str, **kwargs) -> Dict[str, Any]:
+    async def get(self, url: str, conditional: bool = False, **kwargs) -> Dict[str, Any]:
+        """conditional=True 时携带已记录的校验器，304 返回 NOT_MODIFIED"""
         ...
 
     async def post(self, url: str, data: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
@@ -35,50 +76,258 @@ class AbstractHTTPClient(Protocol):
     async def download_file(self, url: str, save_path: str) -> bool:
         ...
 
+    async def content_length(self, url: str) -> Optional[int]:
+        """资源的字节数（HEAD），无法确定时返回 None"""
+        ...
 
-class AsyncHTTPClient:
-    """基于 aiohttp 的异步 HTTP 客户端"""
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        ...
 
-    def __init__(self):
-        self.headers = HEADERS
-        self.image_headers = IMAGE_HEADERS
-        self.timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
-        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-        self.session: Optional[aiohttp.ClientSession] = None
 
-    async def __aenter__(self):
-        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
+class HostPool:
+    """单个主机组的连接池：独立的连接上限、自适应并发额度、速率限制、keepalive 与 DNS 缓存设置"""
+
+    def __init__(
+        self,
+        name: str,
+        headers: Dict[str, str],
+        timeout: aiohttp.ClientTimeout,
+        concurrency: int,
+        limit: int,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15,
+        ttl_dns_cache: Optional[int] = 10,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+    ):
+        self.name = name
+        self.headers = headers
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        # 并发额度从 concurrency 起步，健康时逐步升至 max_concurrency，遇 429/503 减半
+        self.limiter = AIMDLimiter(concurrency, maximum=max_concurrency or concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.session: Optional[aiohttp.ClientSession] = None
+        HTTP_CONCURRENCY_LIMIT.set(self.limiter.current_limit, pool=name)
+
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.bytes_received = 0
+
+    async def open(self) -> None:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
         self.session = aiohttp.ClientSession(
             headers=self.headers,
             timeout=self.timeout,
             connector=connector
         )
-        return self
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
+    async def close(self) -> None:
         if self.session:
             await self.session.close()
+            self.session = None
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """等待并发额度与令牌，返回该池的 session
 
-    async def _make_request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
-        async with self.semaphore:
+        先按优先级排队取得并发额度再取令牌：令牌桶不区分优先级，只在已取得额度的少数请求之间竞争。
+        """
+        await self.limiter.acquire()
+        try:
+            await self.bucket.acquire()
+            assert self.session is not None, "HTTP session not initialized"
+            self.requests += 1
+            self.in_flight += 1
+            HTTP_IN_FLIGHT.inc(pool=self.name)
             try:
-                crawler_logger.debug(f"发起请求: {method} {url}")
-                assert self.session is not None, "HTTP session not initialized"
-                async with self.session.request(method, url, **kwargs) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    crawler_logger.debug(f"请求成功: {method} {url} - 状态码: {response.status}")
-                    return data
-
-            except aiohttp.ClientError as e:
-                crawler_logger.error(f"请求失败: {method} {url} - 错误: {e}")
-                raise
-            except Exception as e:
-                crawler_logger.error(f"未知错误: {method} {url} - 错误: {e}")
+                yield self.session
+            except BaseException:
+                self.errors += 1
                 raise
+            finally:
+                self.in_flight -= 1
+                HTTP_IN_FLIGHT.dec(pool=self.name)
+        finally:
+            self.limiter.release()
+
+    def record_status(self, status: int, retry_after: Optional[float]) -> None:
+        """根据响应状态调整并发额度：过载时乘性减少并按 Retry-After 暂停（不超过 HTTP_RETRY_AFTER_MAX），
+        只有 2xx/3xx 计入成功（4xx 不代表服务端健康，不用于提升并发）"""
+        if status in OVERLOAD_STATUSES:
+            self.throttled += 1
+            HTTP_THROTTLED.inc(pool=self.name)
+            self.limiter.on_overload()
+            self.bucket.pause(min(retry_after or 0, HTTP_RETRY_AFTER_MAX))
+        elif status < 400:
+            self.limiter.on_success()
+        HTTP_CONCURRENCY_LIMIT.set(self.limiter.current_limit, pool=self.name)
+
+    def record_request(self, url: str, endpoint: str, status: Any, elapsed: float, size: int = 0) -> None:
+        """记录单次请求的耗时、状态与响应字节数（按主机与归一化后的路径）"""
+        host = urlparse(url).hostname or ""
+        HTTP_REQUEST_DURATION.observe(elapsed, host=host, endpoint=endpoint)
+        HTTP_REQUESTS.inc(host=host, endpoint=endpoint, status=status)
+        if size:
+            self.bytes_received += size
+            HTTP_RESPONSE_BYTES.inc(size, host=host)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.limiter.current_limit,
+            "max_concurrency": self.limiter.maximum,
+            "connection_limit": self.limit,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "bytes_received": self.bytes_received,
+        }
+
+
+def _share_limits(options: Dict[str, Any], shares: int) -> Dict[str, Any]:
+    """按进程数均分连接池的并发额度与令牌桶（每个进程至少 1 个并发）"""
+    if shares <= 1:
+        return options
+    shared = dict(options)
+    for key in ("concurrency", "max_concurrency"):
+        if shared.get(key):
+            shared[key] = max(1, shared[key] // shares)
+    if shared.get("rate"):
+        shared["rate"] = shared["rate"] / shares
+    if shared.get("burst"):
+        shared["burst"] = max(1.0, shared["burst"] / shares)
+    return shared
+
+
+class AsyncHTTPClient:
+    """基于 aiohttp 的异步 HTTP 客户端
+
+    API 请求与图片 CDN 下载分别使用独立的连接池（见 HTTP_POOLS），互不抢占连接与并发额度。
+    shares>1 时（分片进程）每个进程只使用各主机并发额度与速率的 1/shares，所有分片合计不超过单进程的限制。
+    """
+
+    def __init__(self, shares: int = 1):
+        self.headers = HEADERS
+        self.image_headers = IMAGE_HEADERS
+        self.timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        self.pools: Dict[str, HostPool] = {
+            name: HostPool(
+                name,
+                self.image_headers if name == "image" else self.headers,
+                self.timeout,
+                **_share_limits(options, shares),
+            )
+            for name, options in HTTP_POOLS.items()
+        }
+        self.validators = ValidatorStore(HTTP_VALIDATORS_FILE)
 
-    async def get(self, url: str, **kwargs) -> Dict[str, Any]:
-        return await self._make_request("GET", url, **kwargs)
+    async def __aenter__(self):
+        for pool in self.pools.values():
+            await pool.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for pool in self.pools.values():
+            await pool.close()
+        crawler_logger.debug(f"HTTP 连接池统计: {self.stats()}")
+        self.validators.save()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各连接池的请求统计"""
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    async def _with_retries(self, pool: HostPool, method: str, url: str, attempt: Callable[[], Awaitable[T]]) -> T:
+        """执行请求；幂等请求遇到连接错误、超时、429 或 5xx 时按抖动指数退避重试"""
+        retries = 0
+        while True:
+            try:
+                return await attempt()
+            except (aiohttp.ClientResponseError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                status = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+                retryable = method in IDEMPOTENT_METHODS and (status is None or status in RETRY_STATUSES)
+                if not retryable or retries >= HTTP_MAX_RETRIES:
+                    raise
+                retry_after = None
+                if isinstance(e, aiohttp.ClientResponseError) and e.headers:
+                    retry_after = parse_retry_after(e.headers.get("Retry-After"))
+                delay = backoff_delay(retries, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, retry_after, HTTP_RETRY_AFTER_MAX)
+                if delay is None:
+                    crawler_logger.warning(
+                        f"Retry-After {retry_after:.0f}s 超过上限 {HTTP_RETRY_AFTER_MAX}s，放弃重试: {method} {url}"
+                    )
+                    raise
+                retries += 1
+                pool.retries += 1
+                HTTP_RETRIES.inc(pool=pool.name)
+                crawler_logger.warning(
+                    f"请求重试 {retries}/{HTTP_MAX_RETRIES}: {method} {url} - {status or type(e).__name__}，{delay:.2f}s 后重试"
+                )
+                await asyncio.sleep(delay)
+
+    async def _make_request(self, method: str, url: str, conditional: bool = False, **kwargs) -> Dict[str, Any]:
+        pool = self._get_pool_for_url(url)
+        if conditional:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers.update(self.validators.conditional_headers(url))
+            kwargs["headers"] = headers
+
+        endpoint = endpoint_label(urlparse(url).path)
+
+        async def attempt() -> Dict[str, Any]:
+            async with pool.slot() as session:
+                crawler_logger.debug(f"发起请求: {method} {url} [{pool.name}]")
+                started = time.perf_counter()
+                status: Any = "error"
+                size = 0
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        status = response.status
+                        pool.record_status(response.status, parse_retry_after(response.headers.get("Retry-After")))
+                        if conditional and response.status == 304:
+                            crawler_logger.debug(f"资源未修改: {method} {url}")
+                            return NOT_MODIFIED  # type: ignore[return-value]
+                        response.raise_for_status()
+                        # 只读取一次响应体：解析与统计字节数共用同一份数据
+                        raw = await response.read()
+                        data = json_codec.loads(raw)
+                        size = len(raw)
+                        if conditional:
+                            self.validators.update(
+                                url,
+                                response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"),
+                            )
+                        crawler_logger.debug(f"请求成功: {method} {url} - 状态码: {response.status}")
+                        return data
+                finally:
+                    pool.record_request(url, endpoint, status, time.perf_counter() - started, size)
+
+        try:
+            return await self._with_retries(pool, method, url, attempt)
+        except aiohttp.ClientError as e:
+            crawler_logger.error(f"请求失败: {method} {url} - 错误: {e}")
+            raise
+        except Exception as e:
+            crawler_logger.error(f"未知错误: {method} {url} - 错误: {e}")
+            raise
+
+    async def get(self, url: str, conditional: bool = False, **kwargs) -> Dict[str, Any]:
+        return await self._make_request("GET", url, conditional=conditional, **kwargs)
 
     async def post(self, url: str, data: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
         if data:
@@ -86,33 +335,86 @@ class AsyncHTTPClient:
         return await self._make_request("POST", url, **kwargs)
 
     async def download_file(self, url: str, save_path: str) -> bool:
-        async with self.semaphore:
-            try:
-                crawler_logger.debug(f"开始下载文件 {url}")
+        pool = self._get_pool_for_url(url)
+
+        async def attempt() -> bool:
+            async with pool.slot() as session:
+                crawler_logger.debug(f"开始下载文件 {url} [{pool.name}]")
 
                 # 根据URL类型选择不同的headers
                 headers = self._get_headers_for_url(url)
-                assert self.session is not None, "HTTP session not initialized"
-                async with self.session.get(url, headers=headers) as response:
-                    crawler_logger.debug(f"响应状态 {response.status}, 响应头 {dict(response.headers)}")
-                    response.raise_for_status()
+                started = time.perf_counter()
+                status: Any = "error"
+                size = 0
+                try:
+                    async with session.get(url, headers=headers) as response:
+                        status = response.status
+                        crawler_logger.debug(f"响应状态 {response.status}, 响应头 {dict(response.headers)}")
+                        pool.record_status(response.status, parse_retry_after(response.headers.get("Retry-After")))
+                        response.raise_for_status()
+
+                        with open(save_path, 'wb') as f:
+                            async for chunk in response.content.iter_chunked(8192):
+                                f.write(chunk)
+                                size += len(chunk)
+
+                        # 未压缩传输时按 Content-Length 检查是否截断，截断按响应体错误重试
+                        expected = response.content_length
+                        if expected is not None and not response.headers.get("Content-Encoding") and size != expected:
+                            raise aiohttp.ClientPayloadError(f"响应体不完整: 已接收 {size}/{expected} 字节")
+
+                        crawler_logger.debug(f"文件下载成功: {url} -> {save_path}")
+                        return True
+                finally:
+                    # 图片路径各不相同，统一记为 download 端点
+                    pool.record_request(url, "download", status, time.perf_counter() - started, size)
+
+        try:
+            return await self._with_retries(pool, "GET", url, attempt)
+        except aiohttp.ClientError as e:
+            crawler_logger.error(f"文件下载失败: {url} - 错误: {e}")
+            return False
+        except Exception as e:
+            crawler_logger.error(f"文件下载异常: {url} - 错误: {e}")
+            return False
 
-                    with open(save_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            f.write(chunk)
+    async def content_length(self, url: str) -> Optional[int]:
+        """HEAD 请求获取资源的字节数，用于校验本地已有文件；压缩传输、缺少 Content-Length 或请求失败时返回 None"""
+        pool = self._get_pool_for_url(url)
+
+        async def attempt() -> Optional[int]:
+            async with pool.slot() as session:
+                started = time.perf_counter()
+                status: Any = "error"
+                try:
+                    async with session.head(url, headers=self._get_headers_for_url(url), allow_redirects=True) as response:
+                        status = response.status
+                        pool.record_status(response.status, parse_retry_after(response.headers.get("Retry-After")))
+                        response.raise_for_status()
+                        if response.headers.get("Content-Encoding"):
+                            return None
+                        return response.content_length
+                finally:
+                    pool.record_request(url, "head", status, time.perf_counter() - started)
 
-                    crawler_logger.debug(f"文件下载成功: {url} -> {save_path}")
-                    return True
+        try:
+            return await self._with_retries(pool, "HEAD", url, attempt)
+        except Exception as e:
+            crawler_logger.warning(f"获取资源大小失败: {url} - 错误: {e}")
+            return None
 
-            except aiohttp.ClientError as e:
-                crawler_logger.error(f"文件下载失败: {url} - 错误: {e}")
-                return False
-            except Exception as e:
-                crawler_logger.error(f"文件下载异常: {url} - 错误: {e}")
-                return False
+    def _get_pool_name_for_url(self, url: str) -> str:
+        host = urlparse(url).hostname or ""
+        if any(host == h or host.endswith("." + h) for h in IMAGE_HOSTS):
+            # 图片等静态资源
+            return "image"
+        return "api"
+
+    def _get_pool_for_url(self, url: str) -> HostPool:
+        return self.pools[self._get_pool_name_for_url(url)]
 
     def _get_headers_for_url(self, url: str) -> Dict[str, str]:
-        if 'cdn.nlark.com' in url or 'yuque.com' in url:
+        if self._get_pool_name_for_url(url) == "image":
             # 图片等静态资源使用图片专用headers
             return self.image_headers
         else:
@@ -121,10 +423,16 @@ class AsyncHTTPClient:
 
 
 class LocalHTTPClient:
-    """本地桩实现：用于无网络的离线调试"""
+    """本地桩实现：用于无网络的离线调试
+
+    以样例文件内容的 MD5 作为 ETag；conditional=True 且 ETag 与上次一致时返回 NOT_MODIFIED，
+    用于离线验证条件请求流程。simulate_not_modified=False 时始终返回完整数据。
+    """
 
-    def __init__(self):
+    def __init__(self, simulate_not_modified: bool = True):
         self.response_dir = BASE_DIR / 'design' / 'response'
+        self.simulate_not_modified = simulate_not_modified
+        self.validators = ValidatorStore()
 
     async def __aenter__(self) -> 'LocalHTTPClient':
         return self
@@ -132,25 +440,42 @@ class LocalHTTPClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         return None
 
-    async def get(self, url: str, **kwargs) -> Dict[str, Any]:
+    async def get(self, url: str, conditional: bool = False, **kwargs) -> Dict[str, Any]:
         try:
-            if url.endswith('/classify'):
-                return self._load_json('classify.json')
+            name = self._resolve(url)
+            if name is None:
+                crawler_logger.warning(f'本地桩未匹配 URL: {url}')
+                return {}
+
+            if conditional and self.simulate_not_modified:
+                etag = self._etag(name)
+                validators = self.validators.get(url)
+                if validators and validators.get("etag") == etag:
+                    return NOT_MODIFIED  # type: ignore[return-value]
+                self.validators.update(url, etag, None)
+
+            return self._load_json(name)
+        except Exception as e:
+            crawler_logger.error(f'本地桩读取失败: {url} - 错误: {e}')
+            return {}
 
-            if '/classify/' in url and 'month=' in url:
-                return self._load_json('classify_month.json')
+    def _resolve(self, url: str) -> Optional[str]:
+        if url.endswith('/classify'):
+            return 'classify.json'
 
-            if '/article/' in url:
-                return self._load_json('article.json')
+        if '/classify/' in url and 'month=' in url:
+            return 'classify_month.json'
 
-            if '/section/' in url:
-                return self._load_json('section.json')
+        if '/article/' in url:
+            return 'article.json'
 
-            crawler_logger.warning(f'本地桩未匹配 URL: {url}')
-            return {}
-        except Exception as e:
-            crawler_logger.error(f'本地桩读取失败: {url} - 错误: {e}')
-            return {}
+        if '/section/' in url:
+            return 'section.json'
+
+        return None
+
+    def _etag(self, name: str) -> str:
+        return '"%s"' % hashlib.md5((self.response_dir / name).read_bytes()).hexdigest()
 
     async def post(self, url: str, data: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
         return {"ok": True}
@@ -158,12 +483,19 @@ class LocalHTTPClient:
     async def download_file(self, url: str, save_path: str) -> bool:
         try:
             Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-            Path(save_path).write_bytes(b"")
+            # 占位内容：按 URL 区分，空文件会被图片存储视为下载中断
+            Path(save_path).write_bytes(f"offline placeholder: {url}".encode())
             return True
         except Exception as e:
             crawler_logger.error(f'本地桩下载失败: {url} - 错误: {e}')
             return False
 
+    async def content_length(self, url: str) -> Optional[int]:
+        return len(f"offline placeholder: {url}".encode())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
     def _load_json(self, name: str) -> Dict[str, Any]:
         file_path = self.response_dir / name
         with open(file_path, 'r', encoding='utf-8') as f:
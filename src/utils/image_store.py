@@ -0,0 +1,127 @@
+"""
+内容寻址的图片存储
+
+图片以内容的 SHA-256 命名（`<digest><ext>`），URL → 摘要 记录在抓取索引中：
+同一 URL 再次出现时直接查索引，不同 URL 的相同内容只保存一份。
+下载先写入临时文件，校验大小并计算摘要后再原子重命名，不会留下被当作完整图片的半截文件。
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from src.utils.crawl_index import CrawlIndex, get_crawl_index
+from src.utils.logger import crawler_logger
+
+
+INCOMING_DIR = ".incoming"  # 下载中的临时文件目录（与图片目录同一文件系统，保证重命名是原子的）
+
+
+def hash_file(path: Path) -> Tuple[str, int]:
+    """文件的 (SHA-256 摘要, 字节数)"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class ImageStore:
+    def __init__(self, images_dir: Path, index: Optional[CrawlIndex] = None):
+        self.images_dir = images_dir
+        self.index = index or get_crawl_index()
+
+    async def lookup(self, url: str) -> Optional[Path]:
+        """索引中该 URL 对应的本地文件；大小与记录不符时重新计算摘要，内容确实变化（或文件缺失）时清除记录，
+        返回 None 以便重新下载"""
+        record = self.index.image(url)
+        if record is None:
+            return None
+        digest, name, size = record
+        path = self.images_dir / name
+        actual = self._size(path)
+        if actual == size:
+            return path
+        if actual is not None and (await asyncio.to_thread(hash_file, path))[0] == digest:
+            # 内容未变，只是记录的大小有误
+            self.index.record_image(url, digest, name, actual)
+            return path
+        crawler_logger.warning(f"图片文件缺失或内容不符，重新下载: {url} -> {path}")
+        self.index.forget_image(url)
+        return None
+
+    async def adopt(self, url: str, path: Path, expected_size: Optional[int]) -> Optional[Path]:
+        """登记按旧规则（URL 哈希）命名的已有文件
+
+        只登记可信的文件：expected_size 为服务端给出的大小（HEAD Content-Length），与文件大小一致时才登记，
+        未知或不符时返回 None 重新下载。保留原文件名（已有正文引用它）；相同内容已以其他文件保存时，
+        将其替换为指向该文件的硬链接以释放空间。空文件视为下载中断的残留，删除后返回 None。
+        """
+        local_size = self._size(path)
+        if local_size == 0:
+            path.unlink(missing_ok=True)
+            return None
+        if expected_size is None or local_size != expected_size:
+            crawler_logger.info(f"旧图片文件无法确认完整（本地 {local_size} / 服务端 {expected_size} 字节），重新下载: {url}")
+            return None
+        digest, size = await asyncio.to_thread(hash_file, path)
+        existing = self._existing(digest, size)
+        if existing is not None and existing != path and not existing.samefile(path):
+            self._link_over(existing, path)
+        self.index.record_image(url, digest, path.name, size)
+        return path
+
+    async def store(
+        self, url: str, ext: str, fetch: Callable[[Path], Awaitable[bool]]
+    ) -> Tuple[Optional[Path], bool]:
+        """调用 fetch(临时路径) 下载并保存，返回 (本地文件, 是否与已有内容重复)"""
+        incoming = self.images_dir / INCOMING_DIR
+        incoming.mkdir(parents=True, exist_ok=True)
+        tmp_path = incoming / f"{uuid.uuid4().hex}.part"
+        try:
+            if not await fetch(tmp_path) or not tmp_path.exists():
+                return None, False
+            digest, size = await asyncio.to_thread(hash_file, tmp_path)
+            if size == 0:
+                crawler_logger.error(f"图片下载结果为空: {url}")
+                return None, False
+
+            existing = self._existing(digest, size)
+            if existing is not None:
+                self.index.record_image(url, digest, existing.name, size)
+                return existing, True
+
+            path = self.images_dir / f"{digest}{ext}"
+            os.replace(tmp_path, path)
+            self.index.record_image(url, digest, path.name, size)
+            return path, False
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _existing(self, digest: str, size: int) -> Optional[Path]:
+        record = self.index.image_by_digest(digest)
+        if record is None:
+            return None
+        path = self.images_dir / record[0]
+        return path if self._size(path) == size else None
+
+    def _link_over(self, source: Path, target: Path) -> None:
+        """以指向 source 的硬链接原子替换 target；文件系统不支持硬链接时保留 target"""
+        tmp_path = target.with_name(target.name + ".link")
+        try:
+            os.link(source, tmp_path)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            crawler_logger.debug(f"硬链接去重失败: {target} -> {source} - 错误: {e}")
+
+    @staticmethod
+    def _size(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return None
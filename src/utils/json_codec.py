@@ -0,0 +1,33 @@
+"""
+JSON 编解码：安装了 orjson 时使用它（解析与序列化快数倍），否则回退到标准库 json
+
+序列化结果统一为 UTF-8 字节，非 ASCII 字符原样保留（等同 ensure_ascii=False）。
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    # 可选依赖：pip install "blog-crawl[fast]"
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节；indent=True 时缩进两格（与原有文件格式一致）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            # orjson 不支持的类型（如非字符串键）回退标准库
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
@@ -0,0 +1,212 @@
+"""
+分片抓取的租约账本（SQLite）
+
+每次分片运行把待抓取内容项写入账本，按 (type, id) 的稳定哈希分配到各分片。
+分片进程（可在共享同一文件系统的多台机器上）以租约方式领取内容项并定期续约；
+进程崩溃后租约过期，其他分片会重新领取，保证每个内容项同一时间只被一个分片抓取。
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import CRAWL_LEASES_FILE, SHARD_MAX_ATTEMPTS
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    shards INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_leases_claim ON leases (run_id, state, shard);
+"""
+
+
+def shard_for(type: str, id: int, shards: int) -> int:
+    """(type, id) 的稳定分片号（不使用进程随机化的 hash()）"""
+    return zlib.crc32(f"{type}_{id}".encode()) % max(1, shards)
+
+
+def default_owner(shard: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{shard}"
+
+
+class LeaseLedger:
+    """租约账本；每个进程单连接 + 锁，多进程之间依靠 SQLite 的写锁（BEGIN IMMEDIATE）互斥"""
+
+    def __init__(self, path: Path = CRAWL_LEASES_FILE, max_attempts: int = SHARD_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None：手动控制事务，领取时用 BEGIN IMMEDIATE 立即拿到写锁
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务：BEGIN IMMEDIATE 在开始时即获取数据库写锁，避免多个进程领取到同一批内容项"""
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # ---- 运行 ----
+
+    def create_run(self, items: Iterable[Dict[str, Any]], shards: int) -> str:
+        """登记一次分片运行及其全部内容项，返回 run_id；已结束（没有待处理或被持有内容项）的旧运行一并清除，
+        仍在进行的运行（其他节点可能仍在抓取）保留"""
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        rows = [
+            (run_id, f"{i['type']}_{i['id']}", shard_for(i["type"], i["id"], shards),
+             json.dumps(i, ensure_ascii=False), now)
+            for i in items
+        ]
+        with self._transaction() as conn:
+            finished = (
+                "SELECT run_id FROM runs WHERE NOT EXISTS ("
+                "SELECT 1 FROM leases WHERE leases.run_id = runs.run_id AND state IN ('pending', 'leased'))"
+            )
+            conn.execute(f"DELETE FROM leases WHERE run_id IN ({finished})")
+            conn.execute(f"DELETE FROM runs WHERE run_id IN ({finished})")
+            conn.execute("INSERT INTO runs (run_id, shards, created_at) VALUES (?, ?, ?)", (run_id, shards, now))
+            conn.executemany(
+                "INSERT OR IGNORE INTO leases (run_id, key, shard, item, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        return run_id
+
+    def current_run(self) -> Optional[Tuple[str, int]]:
+        """最近一次运行的 (run_id, 分片数)，供其他节点加入"""
+        with self._lock:
+            row = self.conn.execute("SELECT run_id, shards FROM runs ORDER BY created_at DESC LIMIT 1").fetchone()
+        return (row[0], int(row[1])) if row else None
+
+    # ---- 租约 ----
+
+    def claim(self, run_id: str, owner: str, shard: int, limit: int, ttl: float, steal: bool = True) -> List[Dict[str, Any]]:
+        """领取最多 limit 个内容项：优先本分片的待处理项与已过期的租约，本分片空闲时（steal）领取其他分片的待处理项
+
+        过期租约重新领取时累计尝试次数，超过 max_attempts 的内容项（反复导致进程崩溃）标记为失败。
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE leases SET state = 'failed', owner = NULL, error = 'lease expired too many times', updated_at = ? "
+                "WHERE run_id = ? AND state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, run_id, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT key, item FROM leases WHERE run_id = ? AND "
+                "((state = 'pending' AND shard = ?) OR (state = 'leased' AND lease_until < ?)) LIMIT ?",
+                (run_id, shard, now, limit),
+            ).fetchall()
+            if not rows and steal:
+                rows = conn.execute(
+                    "SELECT key, item FROM leases WHERE run_id = ? AND state = 'pending' LIMIT ?",
+                    (run_id, limit),
+                ).fetchall()
+            conn.executemany(
+                "UPDATE leases SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE run_id = ? AND key = ?",
+                [(owner, now + ttl, now, run_id, key) for key, _ in rows],
+            )
+        return [json.loads(item) for _, item in rows]
+
+    def renew(self, run_id: str, owner: str, ttl: float) -> int:
+        """为 owner 持有的所有租约续期，返回续期数量"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE leases SET lease_until = ?, updated_at = ? WHERE run_id = ? AND owner = ? AND state = 'leased'",
+                (now + ttl, now, run_id, owner),
+            )
+        return cursor.rowcount
+
+    def complete(self, run_id: str, owner: str, key: str, outcome: str = "fetched") -> None:
+        """标记完成；outcome 为 fetched / refreshed / skipped"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE leases SET state = 'done', outcome = ?, owner = NULL, error = NULL, updated_at = ? "
+                "WHERE run_id = ? AND key = ? AND owner = ?",
+                (outcome, time.time(), run_id, key, owner),
+            )
+
+    def fail(self, run_id: str, owner: str, key: str, error: Optional[str]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE leases SET state = 'failed', owner = NULL, error = ?, updated_at = ? "
+                "WHERE run_id = ? AND key = ? AND owner = ?",
+                (error, time.time(), run_id, key, owner),
+            )
+
+    # ---- 统计 ----
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM leases WHERE run_id = ? GROUP BY state", (run_id,)
+            ).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update({state: int(n) for state, n in rows})
+        return counts
+
+    def outcomes(self, run_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT outcome, COUNT(*) FROM leases WHERE run_id = ? AND state = 'done' GROUP BY outcome", (run_id,)
+            ).fetchall()
+        return {outcome: int(n) for outcome, n in rows}
+
+    def outstanding(self, run_id: str) -> int:
+        counts = self.counts(run_id)
+        return counts["pending"] + counts["leased"]
+
+    def failures(self, run_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, error FROM leases WHERE run_id = ? AND state = 'failed' ORDER BY key", (run_id,)
+            ).fetchall()
+        return [{"key": key, "error": error} for key, error in rows]
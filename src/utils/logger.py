@@ -1,13 +1,23 @@
 """
 日志管理器
+
+导入本模块不产生副作用：首次使用 crawler_logger 时才导入 loguru 并添加输出，
+日志文件（及 logs 目录）在写入第一条日志时才创建。
 """
 import sys
-from loguru import logger
+from typing import Any
+
 from config.settings import LOGS_DIR, LOG_LEVEL, LOG_MAX_SIZE, LOG_BACKUP_COUNT
 
 
+# 控制台日志的输出流；命令行以 JSON lines 占用标准输出时改为标准错误
+_console_stream: Any = sys.stdout
+
+
 def setup_logger():
     """设置日志配置"""
+    from loguru import logger
+
     # 移除默认的handler
     logger.remove()
 
@@ -16,7 +26,7 @@ def setup_logger():
 
     # 控制台日志
     logger.add(
-        sys.stdout,
+        _console_stream,
         level=LOG_LEVEL,
         format=loguru_format,
         colorize=True
@@ -30,11 +40,32 @@ def setup_logger():
         format=loguru_format,
         rotation=LOG_MAX_SIZE,
         retention=LOG_BACKUP_COUNT,
-        encoding="utf-8"
+        encoding="utf-8",
+        delay=True
     )
 
     return logger
 
 
+class _LazyLogger:
+    """首次访问任意属性（info / warning / remove / add ...）时完成配置，之后直接转发给 loguru"""
+
+    def __init__(self) -> None:
+        self._logger: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._logger is None:
+            self._logger = setup_logger()
+        return getattr(self._logger, name)
+
+
 # 创建全局logger实例
-crawler_logger = setup_logger()
+crawler_logger: Any = _LazyLogger()
+
+
+def set_console_stream(stream: Any) -> None:
+    """切换控制台日志的输出流（已配置时重新配置）"""
+    global _console_stream
+    _console_stream = stream
+    if crawler_logger._logger is not None:
+        crawler_logger._logger = setup_logger()
@@ -0,0 +1,214 @@
+"""
+进程内指标（Counter / Gauge / Histogram），以 Prometheus 文本格式导出
+
+不依赖 prometheus_client；指标在模块导入时注册到全局 registry，/metrics 接口调用 registry.render()。
+"""
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+LabelValues = Tuple[str, ...]
+
+# 请求级延迟（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 阶段级耗时（秒）
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> (各桶计数（非累积，最后一个为 +Inf）, 总和)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """观测 with 块的耗时（秒），异常退出同样计入"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        counts, _ = self._values.get(self._key(labels)) or ([0], 0.0)
+        return sum(counts)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines: List[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标重复注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """将 URL 路径中的数字 ID 归一为 :id，避免标签基数随内容数增长"""
+    return _ID_SEGMENT.sub("/:id", path.rstrip("/") or "/")
+
+
+# module-level singleton
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "blog_http_request_duration_seconds", "HTTP 请求耗时（含读取响应体）", ("host", "endpoint")
+)
+HTTP_REQUESTS = registry.counter(
+    "blog_http_requests_total", "HTTP 请求数（按状态码，连接错误与超时记为 error）", ("host", "endpoint", "status")
+)
+HTTP_RESPONSE_BYTES = registry.counter("blog_http_response_bytes_total", "已接收的响应体字节数", ("host",))
+HTTP_IN_FLIGHT = registry.gauge("blog_http_in_flight_requests", "正在进行的请求数", ("pool",))
+HTTP_CONCURRENCY_LIMIT = registry.gauge("blog_http_concurrency_limit", "AIMD 当前并发上限", ("pool",))
+HTTP_RETRIES = registry.counter("blog_http_retries_total", "请求重试次数", ("pool",))
+HTTP_THROTTLED = registry.counter("blog_http_throttled_total", "429/503 响应次数", ("pool",))
+
+STAGE_DURATION = registry.histogram(
+    "blog_crawl_stage_duration_seconds",
+    "抓取阶段耗时：classify/months/content 为整个阶段，images 为单篇正文的图片处理",
+    ("stage",),
+    buckets=STAGE_BUCKETS,
+)
+ITEMS = registry.counter("blog_crawl_items_total", "处理的内容数（fetched/refreshed/skipped/failed）", ("type", "outcome"))
+IMAGES = registry.counter("blog_crawl_images_total", "正文图片（downloaded/deduplicated/cached/shared/failed）", ("outcome",))
+QUEUE_DEPTH = registry.gauge("blog_crawl_queue_depth", "内容抓取队列中等待的任务数")
+WORKERS_BUSY = registry.gauge("blog_crawl_workers_busy", "正在处理内容的 worker 数")
+COALESCED = registry.counter("blog_crawl_coalesced_total", "合并到进行中抓取的重复请求数（pipeline/month/item）", ("kind",))
+WRITER_PENDING = registry.gauge("blog_writer_pending_groups", "已提交、尚未落盘的写入组数（一组为一篇内容的正文与元数据等）")
+WRITER_BATCHES = registry.counter("blog_writer_batches_total", "写线程落盘的批次数")
+MONITOR_CYCLES = registry.counter("blog_monitor_cycles_total", "监控任务运行次数", ("job", "result"))
+MONITOR_LAST_CYCLE = registry.gauge("blog_monitor_last_cycle_timestamp_seconds", "监控任务最近一次运行结束时间（Unix 时间戳）", ("job",))
+MONITOR_NEXT_RUN = registry.gauge("blog_monitor_next_run_timestamp_seconds", "监控任务下一次运行时间（Unix 时间戳）", ("job",))
+MONITOR_CURRENT_INTERVAL = registry.gauge("blog_monitor_interval_seconds", "监控任务当前的（自适应）间隔", ("job",))
@@ -1,7 +1,7 @@
 """
 数据模型定义
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, NamedTuple, Optional, Any
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -19,6 +19,41 @@ class ContentItem(BaseModel):
     id: int
     title: str
     created_time: str
+    modified_time: Optional[str] = None  # 列表接口若提供则用于判断本地内容是否过期
+
+
+class ItemRecord(NamedTuple):
+    """内容项的内部表示（元组，无校验开销），用于月份列表 → 内容抓取的热路径
+
+    pydantic 的 ContentItem 只在 API 边界使用；from_dict 只检查抓取所需的字段类型。
+    """
+    type: str
+    id: int
+    title: str
+    created_time: str
+    modified_time: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.type}_{self.id}"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ItemRecord":
+        type_, id_ = data.get("type"), data.get("id")
+        if not isinstance(type_, str) or not isinstance(id_, int) or isinstance(id_, bool):
+            raise ValueError(f"无效的内容项: type={type_!r}, id={id_!r}")
+        modified_time = data.get("modified_time")
+        return cls(
+            type_,
+            id_,
+            str(data.get("title") or ""),
+            str(data.get("created_time") or ""),
+            str(modified_time) if modified_time is not None else None,
+        )
+
+    @classmethod
+    def from_model(cls, item: ContentItem) -> "ItemRecord":
+        return cls(item.type, item.id, item.title, item.created_time, item.modified_time)
 
 
 class ArticleDetail(BaseModel):
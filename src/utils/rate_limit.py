@@ -0,0 +1,167 @@
+"""
+自适应限流：令牌桶 + AIMD 并发控制 + 退避计算
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Optional, Tuple
+
+
+# 请求优先级（数值越小越优先），通过 contextvar 传递到同一任务及其创建的子任务中的所有请求
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def prioritized(priority: int = PRIORITY_HIGH) -> Iterator[None]:
+    """在 with 块内发起的请求按 priority 排队等待并发额度"""
+    token = request_priority.set(priority)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """令牌桶：限制平均请求速率，并支持按 Retry-After 暂停发放
+
+    rate 为 None 时不限速，只处理暂停。
+    """
+
+    def __init__(self, rate: Optional[float] = None, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.rate is None:
+                return
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """在 seconds 秒内暂停发放令牌（如服务端返回 Retry-After）"""
+        if seconds > 0:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AIMDLimiter:
+    """AIMD 并发控制：连续成功一轮（达到当前上限次数）后上限 +1，过载时上限乘以 decrease_factor
+
+    额度不足时按优先级（见 request_priority）、同优先级按先后顺序分配。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum if maximum is not None else initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_use = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        if self.in_use < self.current_limit and not self._waiters:
+            self.in_use += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (request_priority.get() if priority is None else priority, next(self._order), fut))
+        # 队列中可能只剩已取消的等待者，先尝试分配
+        self._wake()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 已分配额度但调用方被取消，归还额度
+                self.release()
+            # 未分配时 fut 已取消，_wake 会跳过
+            raise
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.current_limit and self.limit < self.maximum:
+            self._successes = 0
+            self.limit = min(self.maximum, self.limit + 1)
+            self._wake()
+
+    def on_overload(self) -> None:
+        now = time.monotonic()
+        # 同一波并发请求同时被限流时只降一次
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < self.current_limit:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self.in_use += 1
+                fut.set_result(None)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, retry_after: Optional[float] = None, retry_after_max: Optional[float] = None
+) -> Optional[float]:
+    """指数退避 + 全抖动；服务端给出 Retry-After 时至少等待该时长，超过 retry_after_max 时返回 None（不再重试）"""
+    if retry_after is not None and retry_after_max is not None and retry_after > retry_after_max:
+        return None
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
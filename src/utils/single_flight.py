@@ -0,0 +1,62 @@
+"""
+单飞（single-flight）：同一 key 的并发调用合并为一次执行
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from src.utils.metrics import COALESCED
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: "asyncio.Future", fresh: bool):
+        self.task = task
+        self.fresh = fresh
+        self.waiters = 0
+
+
+class SingleFlight:
+    """key 相同的调用在第一次调用完成前共享同一个任务与结果
+
+    调用方被取消时不影响其他等待者；所有等待者都取消后才取消底层任务。
+    fresh=True 的调用（如强制重新下载）只合并到同样 fresh 的执行；遇到普通执行时先等它结束，再自行执行。
+    kind 用于指标 blog_crawl_coalesced_total 的标签。
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]], fresh: bool = False) -> T:
+        while True:
+            call = self._calls.get(key)
+            if call is not None and call.task.done():
+                call = None
+            if call is None or not fresh or call.fresh:
+                break
+            # 不计入等待者：本调用方被取消时不影响这次普通执行
+            await asyncio.wait({call.task})
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()), fresh)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            COALESCED.inc(kind=self.kind)
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,90 @@
+"""
+HTTP 条件请求校验器存储（ETag / Last-Modified）
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.logger import crawler_logger
+
+
+class ValidatorStore:
+    """按 URL 记录 ETag / Last-Modified，用于 If-None-Match / If-Modified-Since 重新校验
+
+    path 为 None 时仅保存在内存中（离线桩使用）。长期存活的客户端每隔 autosave_interval 秒
+    在更新时自动写回一次，退出时再完整保存。
+    """
+
+    def __init__(self, path: Optional[Path] = None, autosave_interval: float = 60.0):
+        self.path = path
+        self.autosave_interval = autosave_interval
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict):
+                self._validators = data
+        except Exception as e:
+            crawler_logger.warning(f"加载 HTTP 校验器失败: {self.path} - 错误: {e}")
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        self._ensure_loaded()
+        return self._validators.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """根据已记录的校验器生成条件请求头"""
+        validators = self.get(url) or {}
+        headers: Dict[str, str] = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def update(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self._ensure_loaded()
+        if not etag and not last_modified:
+            # 服务端不再提供校验器时丢弃旧值，避免发送过期条件头
+            if self._validators.pop(url, None) is not None:
+                self._dirty = True
+            return
+        entry: Dict[str, str] = {}
+        if etag:
+            entry["etag"] = etag
+        if last_modified:
+            entry["last_modified"] = last_modified
+        if self._validators.get(url) != entry:
+            self._validators[url] = entry
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.autosave_interval:
+                self.save()
+
+    def forget(self, url: str) -> None:
+        self._ensure_loaded()
+        if self._validators.pop(url, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        """将变更写回磁盘（临时文件 + 重命名）"""
+        if self.path is None or not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_path.write_text(json.dumps(self._validators, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        except Exception as e:
+            crawler_logger.error(f"保存 HTTP 校验器失败: {self.path} - 错误: {e}")
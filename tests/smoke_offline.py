@@ -1,10 +1,31 @@
 import asyncio
-from typing import Tuple
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Set, Tuple
+from urllib.parse import urlparse
 
+import aiohttp
+
+from benchmarks.stub_client import SyntheticHTTPClient, SyntheticHTTPError
+from benchmarks.synthetic import BlogSpec, SyntheticBlog
+from config.settings import BASE_DIR, CONTENT_DATA_DIR, DATA_DIR, MONTH_DATA_DIR
 from src.crawler.classify_monitor import ClassifyMonitor
 from src.crawler.month_data_fetcher import MonthDataFetcher
 from src.crawler.content_fetcher import ContentFetcher
-from src.utils.http_client import LocalHTTPClient
+from src.services.jobs import JobManager
+from src.services.pipeline import run_pipeline
+from src.services.planner import build_plan
+from src.services.scheduler import AdaptiveSchedule, Cadence
+from src.services.verification import Verifier
+from src.utils.http_client import HostPool, LocalHTTPClient
+from src.utils.file_writer import WriteBehindWriter
+from src.utils.lease_ledger import LeaseLedger
+from src.utils.rate_limit import prioritized
 
 
 async def run_once() -> Tuple[int, int]:
@@ -30,11 +51,264 @@ async def run_once() -> Tuple[int, int]:
     content = await cf.crawl()
     assert content.success, f"content failed: {content.error}"
     total_items = content.data.get("total_items", 0) # pyright: ignore[reportOptionalMemberAccess]
-    skipped = sum(1 for v in content.data.get("results", {}).values() if v.get("skipped")) # pyright: ignore[reportOptionalMemberAccess]
+    skipped = content.data.get("skipped", 0) # pyright: ignore[reportOptionalMemberAccess]
     print(f"content total: {total_items}, skipped: {skipped}")
     return total_items, skipped
 
 
+async def check_not_modified() -> None:
+    client = LocalHTTPClient()
+    m = ClassifyMonitor()
+    m.http_client = client
+    first = await m.crawl()
+    second = await m.crawl()
+    assert first.success and second.success
+    assert not (first.data or {}).get("not_modified"), "first conditional request should return data"
+    assert (second.data or {}).get("not_modified"), "second conditional request should be 304"
+
+    mf = MonthDataFetcher()
+    mf.http_client = client
+    mf.revalidate = True
+    await mf.crawl()
+    months = await mf.crawl()
+    results = months.data.get("results", {}).values()  # pyright: ignore[reportOptionalMemberAccess]
+    assert all(r.get("not_modified") for r in results), "revalidated months should be 304"
+    print("OK: conditional requests verified")
+
+
+async def check_incremental_plan() -> None:
+    old = {"2025-08": {"article": 0, "section": 16}, "2025-07": {"article": 0, "section": 24}}
+    new = {"2025-09": {"article": 1, "section": 0}, "2025-08": {"article": 0, "section": 17}, "2025-07": {"article": 0, "section": 24}}
+    plan = build_plan(old, new)
+    assert plan.months_added == ["2025-09"]
+    assert plan.months_changed == {"2025-08": {"article": 0, "section": 1}}
+    assert plan.months_to_fetch == ["2025-09", "2025-08"]
+
+    result = await run_pipeline(LocalHTTPClient())
+    assert result["success"], result
+    assert result["plan"]["months_to_fetch"] == [], "unchanged classify should plan nothing"
+    assert result["months"] is None and result["content"] is None
+    print("OK: incremental plan verified")
+
+
+async def check_job_submit() -> None:
+    # A pending incremental job covers another incremental request but not a full one, which queues behind it
+    jobs = JobManager()
+    incremental, attached = await jobs.submit(LocalHTTPClient())
+    assert not attached
+    full, attached = await jobs.submit(LocalHTTPClient(), full=True)
+    assert not attached and full is not incremental, "a full request must not attach to an incremental job"
+    again, attached = await jobs.submit(LocalHTTPClient())
+    assert attached and again is incremental
+    await asyncio.wait({incremental.task, full.task})  # pyright: ignore[reportArgumentType]
+    assert incremental.status == full.status == "succeeded", (incremental.error, full.error)
+    assert full.summary and not full.summary["attached"], "the full job should run its own pipeline"
+    print("OK: job submit verified")
+
+
+def check_lease_reclaim() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = LeaseLedger(Path(tmp) / "leases.sqlite3", max_attempts=2)
+        items = [{"type": "article", "id": i, "title": "", "created_time": ""} for i in range(4)]
+        older = ledger.create_run(items[:1], 1)
+        run = ledger.create_run(items, 2)
+        assert ledger.outstanding(older) == 1, "an unfinished run must survive a new run"
+
+        # Shard 0 claims its own items, steals shard 1's, then crashes holding every lease
+        while ledger.claim(run, "crashed", 0, 10, ttl=0.2):
+            pass
+        assert ledger.counts(run)["leased"] == 4
+        time.sleep(0.3)
+        reclaimed = ledger.claim(run, "survivor", 1, 10, ttl=0.2)
+        assert len(reclaimed) == 4, "expired leases should be reclaimed by another shard"
+        for item in reclaimed[:3]:
+            ledger.complete(run, "survivor", f"article_{item['id']}")
+        # The survivor crashes too: the last item has now expired max_attempts times
+        time.sleep(0.3)
+        assert ledger.claim(run, "third", 0, 10, ttl=0.2) == []
+        assert ledger.counts(run) == {"pending": 0, "leased": 0, "done": 3, "failed": 1}, ledger.counts(run)
+
+        ledger.create_run(items, 2)
+        assert ledger.counts(run)["done"] == 0, "finished runs should be cleaned up"
+        assert ledger.outstanding(older) == 1
+        ledger.close()
+    print("OK: lease reclaim verified")
+
+
+async def check_pool_priority() -> None:
+    # With one slot and a rate-limited bucket, a high-priority request queued last is served next
+    pool = HostPool("smoke", {}, aiohttp.ClientTimeout(total=5), concurrency=1, limit=1, rate=50, burst=1)
+    await pool.open()
+    order = []
+
+    async def request(name: str) -> None:
+        async with pool.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def urgent() -> None:
+        with prioritized():
+            await request("high")
+
+    tasks = [asyncio.create_task(request(f"normal{i}")) for i in range(5)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(urgent()))
+    await asyncio.gather(*tasks)
+    await pool.close()
+    assert order.index("high") <= 1, order
+    print("OK: pool priority verified")
+
+
+async def check_file_writer() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+
+        # Back-pressure: until their submitters resume, at most max_pending groups reach the writer thread
+        writer = WriteBehindWriter(max_pending=2)
+        tasks = [asyncio.create_task(writer.write([(root / f"{i}.md", "x")])) for i in range(5)]
+        await asyncio.sleep(0)
+        time.sleep(0.2)  # block the event loop; the writer thread drains everything it has accepted
+        written = sorted(path.name for path in root.glob("*.md"))
+        assert len(written) == 2, written
+        await asyncio.gather(*tasks)
+        assert all((root / f"{i}.md").exists() for i in range(5))
+
+        # Failure propagation: a failed file fails the submitter and the whole group is not applied
+        blocker = root / "blocker"
+        blocker.write_text("not a directory")
+        try:
+            await WriteBehindWriter().write([(root / "pair.md", "md"), (blocker / "pair_meta.json", "{}")])
+            raise AssertionError("write into a file path should fail")
+        except OSError:
+            pass
+        assert not (root / "pair.md").exists(), "a failed group must not be partially applied"
+
+        # Coalescing: groups submitted together land in submission order; a group that only partly overlaps a later one
+        # is still written whole, and every submitter completes
+        writer = WriteBehindWriter()
+        await asyncio.gather(
+            writer.write([(root / "a.md", "1"), (root / "a_meta.json", "1")]),
+            writer.write([(root / "a.md", "2")]),
+            writer.write([(root / "b.md", "1")]),
+            writer.write([(root / "b.md", "2")]),
+        )
+        assert (root / "a.md").read_text() == "2" and (root / "a_meta.json").read_text() == "1"
+        assert (root / "b.md").read_text() == "2"
+        assert not list(root.glob("*.part")), "temporary files should be renamed or removed"
+    print("OK: file writer verified")
+
+
+class FlakyClient(SyntheticHTTPClient):
+    """Synthetic upstream whose detail requests fail for the item keys in `failing`"""
+
+    def __init__(self, blog: SyntheticBlog):
+        super().__init__(blog, latency_ms=0, jitter_ms=0, distribution="fixed")
+        self.failing: Set[str] = set()
+
+    async def get(self, url: str, conditional: bool = False, **kwargs):
+        parts = urlparse(url).path.rstrip("/").split("/")
+        if f"{parts[-2]}_{parts[-1]}" in self.failing:
+            raise SyntheticHTTPError(url)
+        return await super().get(url, conditional, **kwargs)
+
+
+def _keys(published) -> Set[str]:
+    return {f"{item_type}_{item_id}" for item_type, item_id in published}
+
+
+async def check_verify_partial_index(blog: SyntheticBlog, client: FlakyClient) -> None:
+    # Month files saved before the index existed; refreshing one month indexes only that month
+    MONTH_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    for month in blog.months:
+        (MONTH_DATA_DIR / f"{month}.json").write_text(json.dumps(blog.month_listing(month)), encoding="utf-8")
+    blog.publish(1)
+    mf = MonthDataFetcher()
+    mf.http_client = client
+    await mf.crawl([blog.months[0]], refresh=[blog.months[0]])
+    expected = Verifier().verify()["items"]["total_expected"]
+    assert expected == len(blog.items), f"expected {len(blog.items)} items, verify counted {expected}"
+    print("OK: verify with a partial index verified")
+
+
+async def check_deferred_commit(blog: SyntheticBlog, client: FlakyClient) -> None:
+    # A classify-only run must not commit the snapshot; the next full pipeline run still plans the month
+    latest = blog.months[0]
+    blog.publish(1)
+    peek = await run_pipeline(client, crawl_content=False)
+    assert peek["plan"]["months_to_fetch"] == [latest], peek["plan"]
+    result = await run_pipeline(client)
+    assert result["success"] and result["plan"]["months_to_fetch"] == [latest], result["plan"]
+    result = await run_pipeline(client)
+    assert result["plan"]["months_to_fetch"] == [], "snapshot should be committed after a successful run"
+    print("OK: deferred classify commit verified")
+
+
+async def check_failed_incremental(blog: SyntheticBlog, client: FlakyClient) -> None:
+    # New posts whose details fail must fail the run and be fetched by the next one
+    new = _keys(blog.publish(2))
+    client.failing |= new
+    failed = await run_pipeline(client)
+    assert not failed["success"] and failed["stage"] == "content", failed.get("error")
+    client.failing.clear()
+    retry = await run_pipeline(client)
+    assert retry["success"], retry.get("error")
+    assert new <= set(retry["plan"]["items"]), retry["plan"]
+    assert all((CONTENT_DATA_DIR / f"{key}.md").exists() for key in new)
+    settled = await run_pipeline(client)
+    assert settled["plan"]["months_to_fetch"] == [], "snapshot should be committed once the retry succeeds"
+    print("OK: failed incremental run verified")
+
+
+async def check_hot_months(blog: SyntheticBlog, client: FlakyClient) -> None:
+    # Without checking classify, the hot refresh should queue exactly the newly published item
+    latest = blog.months[0]
+    new = _keys(blog.publish(1))
+    result = await run_pipeline(client, hot_months=1)
+    assert result["success"], result.get("error")
+    assert result["classify"] is None
+    assert result["plan"]["months_to_fetch"] == [latest]
+    assert set(result["plan"]["items"]) == new, result["plan"]["items"]
+    print("OK: hot months verified")
+
+
+async def check_failed_hot(blog: SyntheticBlog, client: FlakyClient) -> None:
+    # The hot refresh saves the month listing before fetching details; failed items must still be picked up later
+    latest = blog.months[0]
+    new = _keys(blog.publish(2))
+    client.failing |= new
+    failed = await run_pipeline(client, hot_months=1)
+    assert not failed["success"] and failed["stage"] == "content", failed.get("error")
+    client.failing.clear()
+
+    mf = MonthDataFetcher()
+    mf.http_client = client
+    months = await mf.crawl([latest], refresh=[latest])
+    month = months.data["results"][latest]  # pyright: ignore[reportOptionalSubscript]
+    assert month.get("not_modified"), "the listing was already saved by the failed run"
+    assert new <= {item.key for item in month["new_items"]}, "unfetched items in a saved listing should count as new"
+
+    retry = await run_pipeline(client, hot_months=1)
+    assert retry["success"] and new <= set(retry["plan"]["items"]), retry["plan"]
+    assert all((CONTENT_DATA_DIR / f"{key}.md").exists() for key in new)
+    print("OK: failed hot refresh verified")
+
+
+def check_schedule() -> None:
+    now = [0.0]
+    schedule = AdaptiveSchedule(
+        Cadence(interval=100, min_interval=10, max_interval=400, backoff=2, idle_polls=2, jitter=0), clock=lambda: now[0]
+    )
+    schedule.start()
+    anchors = []
+    for changed in (False, False, True, False, None):
+        now[0] = schedule.seconds_until_due() + now[0] + 7  # each run takes 7s
+        schedule.record(changed)
+        anchors.append((schedule.current_interval, schedule.seconds_until_due() + now[0]))
+    # Anchored on planned times (no drift); idle polls back off, a change shortens, errors keep the interval
+    assert anchors == [(100, 100), (200, 300), (10, 310), (20, 330), (20, 350)], anchors
+    print("OK: schedule verified")
+
+
 async def main():
     total1, skipped1 = await run_once()
     # Run again to validate skip logic
@@ -42,8 +316,36 @@ async def main():
     assert total2 == total1, "total items changed between runs"
     assert skipped2 >= skipped1, "second run should skip more or equal"
     print("OK: skip logic verified")
+    await check_not_modified()
+    await check_incremental_plan()
+    await check_job_submit()
+    check_lease_reclaim()
+    await check_pool_priority()
+    await check_file_writer()
+    check_schedule()
+    run_synthetic()
+
+
+def run_synthetic() -> None:
+    # Synthetic-upstream checks mutate their data directory, so they run in a child process with a temporary one
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "BLOG_CRAWL_DATA_DIR": tmp}
+        subprocess.run([sys.executable, "-m", "tests.smoke_offline", "synthetic"], cwd=BASE_DIR, env=env, check=True)
+
+
+async def synthetic_main():
+    assert DATA_DIR != BASE_DIR / "data", "synthetic checks must run with BLOG_CRAWL_DATA_DIR set (see run_synthetic)"
+    blog = SyntheticBlog(BlogSpec(months=3, items_per_month=4, images_per_body=0, body_bytes=200))
+    client = FlakyClient(blog)
+    await check_verify_partial_index(blog, client)
+    first = await run_pipeline(client, full=True)
+    assert first["success"], first.get("error")
+    await check_deferred_commit(blog, client)
+    await check_failed_incremental(blog, client)
+    await check_hot_months(blog, client)
+    await check_failed_hot(blog, client)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(synthetic_main() if sys.argv[1:] == ["synthetic"] else main())
 